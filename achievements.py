@@ -84,8 +84,8 @@ def load_achievements():
 def save_achievements(achievements):
     save_data("achievements.json", achievements)
 
-def check_achievements(player_id, match_data):
-    achievements = load_achievements()
+def evaluate_achievements(achievements, player_id, match_data):
+    """Unlock achievements for one match in an already loaded achievements dict"""
     if str(player_id) not in achievements:
         achievements[str(player_id)] = {"unlocked": [], "progress": {}}
     
@@ -140,6 +140,11 @@ def check_achievements(player_id, match_data):
             player_achievements["unlocked"].append("comeback_kid")
             new_achievements.append("comeback_kid")
     
+    return new_achievements
+
+def check_achievements(player_id, match_data):
+    achievements = load_achievements()
+    new_achievements = evaluate_achievements(achievements, player_id, match_data)
     save_achievements(achievements)
     return new_achievements
 
@@ -32,19 +32,17 @@ class AdminDashboardView(discord.ui.View):
             await interaction.response.send_message("❌ Admin only access!", ephemeral=True)
             return
         
-        queue = load_queue()
+        from queue_state import get_queue_state
+        queue_state = get_queue_state(interaction.guild_id)
         settings = load_admin_settings()
         
         embed = discord.Embed(title="🎮 Queue Management", color=0x00ffcc)
         embed.add_field(name="Queue Status", value="🟢 Enabled" if settings["allow_queue"] else "🔴 Disabled", inline=True)
-        embed.add_field(name="Players in Queue", value=str(len(queue)), inline=True)
+        embed.add_field(name="Players in Queue", value=str(queue_state.players()), inline=True)
         embed.add_field(name="Auto-MMR Updates", value="✅" if settings["auto_mmr_updates"] else "❌", inline=True)
         
         # Queue breakdown
-        queue_counts = {"1v1": 0, "2v2": 0, "3v3": 0}
-        for player in queue:
-            if player["status"] == "searching":
-                queue_counts[player["format"]] += 1
+        queue_counts = {fmt: queue_state.count(fmt) for fmt in ["1v1", "2v2", "3v3"]}
         
         embed.add_field(name="Queue Breakdown", value=f"1v1: {queue_counts['1v1']}\n2v2: {queue_counts['2v2']}\n3v3: {queue_counts['3v3']}", inline=False)
         
@@ -57,7 +55,7 @@ class AdminDashboardView(discord.ui.View):
             await interaction.response.send_message("❌ Admin only access!", ephemeral=True)
             return
         
-        tournaments = load_tournaments()
+        tournaments = guild_records("tournaments.json", load_tournaments(interaction.guild_id), interaction.guild_id)
         settings = load_admin_settings()
         
         active_tournaments = [t for t in tournaments if t["status"] in ["registration", "active"]]
@@ -80,16 +78,19 @@ class AdminDashboardView(discord.ui.View):
             await interaction.response.send_message("❌ Admin only access!", ephemeral=True)
             return
         
+        from retention import load_archive_summary
+        
         stats = load_stats()
         history = load_match_history()
         mvp_votes = load_mvp_votes()
-        tournaments = load_tournaments()
+        tournaments = guild_records("tournaments.json", load_tournaments(interaction.guild_id), interaction.guild_id)
+        archived_matches = load_archive_summary().get("match_history", {}).get("archived", 0)
         
         embed = discord.Embed(title="📊 Server Analytics", color=0x9b59b6)
         
         # Basic stats
         embed.add_field(name="👥 Registered Players", value=str(len(stats)), inline=True)
-        embed.add_field(name="🎮 Total Matches", value=str(len(history)), inline=True)
+        embed.add_field(name="🎮 Total Matches", value=str(len(history) + archived_matches), inline=True)
         embed.add_field(name="🏆 Total Tournaments", value=str(len(tournaments)), inline=True)
         
         # Calculate activity metrics
@@ -98,17 +99,19 @@ class AdminDashboardView(discord.ui.View):
         
         # Most active players
         if stats:
-            top_players = sorted(stats.items(), key=lambda x: x[1]["matches_played"], reverse=True)[:3]
+            import leaderboards
+
+            top_players = leaderboards.top("matches_played", 3)
             top_player_names = []
-            for player_id, player_stats in top_players:
+            for player_id, matches_played in top_players:
                 try:
-                    user = interaction.client.get_user(int(player_id))
+                    user = interaction.client.get_user(leaderboards.board_user_id("matches_played", player_id))
                     if user:
-                        top_player_names.append(f"{user.display_name} ({player_stats['matches_played']} matches)")
+                        top_player_names.append(f"{user.display_name} ({matches_played} matches)")
                     else:
-                        top_player_names.append(f"Player {player_id} ({player_stats['matches_played']} matches)")
+                        top_player_names.append(f"Player {player_id} ({matches_played} matches)")
                 except:
-                    top_player_names.append(f"Player {player_id} ({player_stats['matches_played']} matches)")
+                    top_player_names.append(f"Player {player_id} ({matches_played} matches)")
             
             embed.add_field(name="🔥 Most Active Players", value="\n".join(top_player_names), inline=False)
         
@@ -313,7 +316,9 @@ class QueueManagementView(discord.ui.View):
         
         async def confirm_clear(confirm_interaction):
             from main import log_to_channel
-            save_queue([])
+            # Only this server's entries; a SQLite queue is shared by every server
+            queue = load_queue(confirm_interaction.guild_id)
+            save_queue([p for p in queue if not in_guild("queue.json", p, confirm_interaction.guild_id)], confirm_interaction.guild_id)
             await log_to_channel(f"🗑️ Queue cleared by admin {confirm_interaction.user.display_name}", "WARNING")
             await confirm_interaction.response.send_message("✅ Queue cleared successfully!", ephemeral=True)
         
@@ -352,15 +357,19 @@ class AnalyticsView(discord.ui.View):
     
     @discord.ui.button(label="📈 Detailed Analytics", style=discord.ButtonStyle.primary)
     async def detailed_analytics(self, interaction: discord.Interaction, button: discord.ui.Button):
+        from retention import load_archive_summary
+        
         stats = load_stats()
         history = load_match_history()
+        archived = load_archive_summary().get("match_history", {})
+        total_matches = len(history) + archived.get("archived", 0)
         
         # Calculate more detailed metrics
         total_goals = sum(player["goals"] for player in stats.values())
         total_saves = sum(player["saves"] for player in stats.values())
         total_assists = sum(player["assists"] for player in stats.values())
         
-        avg_goals_per_match = total_goals / len(history) if history else 0
+        avg_goals_per_match = total_goals / total_matches if total_matches else 0
         
         embed = discord.Embed(title="📈 Detailed Server Analytics", color=0x9b59b6)
         embed.add_field(name="⚽ Total Goals", value=str(total_goals), inline=True)
@@ -368,8 +377,8 @@ class AnalyticsView(discord.ui.View):
         embed.add_field(name="🤝 Total Assists", value=str(total_assists), inline=True)
         embed.add_field(name="📊 Avg Goals/Match", value=f"{avg_goals_per_match:.1f}", inline=True)
         
-        # Most popular format
-        format_counts = {}
+        # Most popular format, counting archived matches too
+        format_counts = dict(archived.get("by_format", {}))
         for match in history:
             format_type = match.get("format", "Unknown")
             format_counts[format_type] = format_counts.get(format_type, 0) + 1
@@ -105,9 +105,10 @@ class BotInfoView(discord.ui.View):
         
         # Database stats
         stats = load_stats()
-        matches = load_matches()
-        tournaments = load_tournaments()
-        queue = load_queue()
+        matches = load_all_matches()
+        tournaments = load_all_tournaments()
+        from queue_state import all_queue_states
+        queued_players = sum(state.players() for state in all_queue_states())
         
         embed = discord.Embed(title="📊 Bot Statistics", color=0x00ff00)
         
@@ -123,7 +124,7 @@ class BotInfoView(discord.ui.View):
         embed.add_field(name="⚔️ Total Matches", value=f"**{len(matches):,}**", inline=True)
         embed.add_field(name="🏆 Tournaments", value=f"**{len(tournaments):,}**", inline=True)
         
-        embed.add_field(name="🔍 Active Queue", value=f"**{len(queue)}** players", inline=True)
+        embed.add_field(name="🔍 Active Queue", value=f"**{queued_players}** players", inline=True)
         embed.add_field(name="🎯 Commands Used", value="**500k+** times", inline=True)
         embed.add_field(name="📈 Success Rate", value="**99.9%**", inline=True)
         
@@ -180,10 +181,10 @@ class ServerInfoView(discord.ui.View):
     async def server_analytics(self, interaction: discord.Interaction, button: discord.ui.Button):
         # Get server-specific bot stats
         stats = load_stats()
-        matches = load_matches()
-        tournaments = load_tournaments()
+        matches = guild_records("matches.json", load_matches(interaction.guild_id), interaction.guild_id)
+        tournaments = guild_records("tournaments.json", load_tournaments(interaction.guild_id), interaction.guild_id)
         
-        # Filter for this server (simplified - in real implementation you'd track server IDs)
+        # Matches and tournaments are per server, players are still shared
         server_players = len(stats)
         server_matches = len(matches)
         server_tournaments = len(tournaments)
@@ -4,6 +4,7 @@ from discord.ext import commands
 import json
 from datetime import datetime
 from data import load_data, save_data
+from ranks import rank_for
 from PIL import Image, ImageDraw, ImageFont
 import io
 
@@ -47,24 +48,36 @@ def get_player_profile(player_id):
         "created_at": datetime.now().isoformat()
     })
 
-def unlock_banner(player_id, banner_id):
-    profiles = load_player_profiles()
+def grant_banner(profiles, player_id, banner_id):
+    """Unlock a banner in an already loaded profiles dict"""
     if str(player_id) not in profiles:
         profiles[str(player_id)] = get_player_profile(player_id)
     
     if banner_id not in profiles[str(player_id)]["unlocked_banners"]:
         profiles[str(player_id)]["unlocked_banners"].append(banner_id)
-        save_player_profiles(profiles)
         return True
     return False
 
-def unlock_badge(player_id, badge_id):
-    profiles = load_player_profiles()
+def grant_badge(profiles, player_id, badge_id):
+    """Unlock a badge in an already loaded profiles dict"""
     if str(player_id) not in profiles:
         profiles[str(player_id)] = get_player_profile(player_id)
     
     if badge_id not in profiles[str(player_id)]["unlocked_badges"]:
         profiles[str(player_id)]["unlocked_badges"].append(badge_id)
+        return True
+    return False
+
+def unlock_banner(player_id, banner_id):
+    profiles = load_player_profiles()
+    if grant_banner(profiles, player_id, banner_id):
+        save_player_profiles(profiles)
+        return True
+    return False
+
+def unlock_badge(player_id, badge_id):
+    profiles = load_player_profiles()
+    if grant_badge(profiles, player_id, badge_id):
         save_player_profiles(profiles)
         return True
     return False
@@ -95,7 +108,7 @@ def generate_profile_card(player_id, username, stats):
     draw.text((20, 20), username, fill='white', font=font_large)
     
     # Rank and MMR
-    rank = stats.get("rank", "Unranked")
+    rank = rank_for(stats["mmr"]) if "mmr" in stats else "Unranked"
     mmr = stats.get("mmr", 0)
     draw.text((20, 120), f"Rank: {rank}", fill='white', font=font_medium)
     draw.text((20, 150), f"MMR: {mmr}", fill='white', font=font_medium)
@@ -237,12 +250,11 @@ class ProfileCustomizationView(discord.ui.View):
 
     @discord.ui.button(label="🖼️ Generate Profile Card", style=discord.ButtonStyle.success, emoji="🎯")
     async def generate_card(self, interaction: discord.Interaction, button: discord.ui.Button):
-        from main import load_stats
+        from utils import aload_player_stats
         
         await interaction.response.defer()
         
-        stats = load_stats()
-        player_stats = stats.get(str(self.user_id), {})
+        player_stats = await aload_player_stats(self.user_id) or {}
         
         try:
             img_bytes = generate_profile_card(self.user_id, interaction.user.display_name, player_stats)
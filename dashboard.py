@@ -3,6 +3,7 @@ from discord.ext import commands
 import json
 import asyncio
 from datetime import datetime, timedelta
+from ranks import rank_for, rank_for_many, rank_progress
 
 class DashboardView(discord.ui.View):
     def __init__(self):
@@ -14,13 +15,9 @@ class DashboardView(discord.ui.View):
         embed = discord.Embed(title="⚡ Quick Queue", description="Jump into the fastest available match!", color=0x00ffcc)
 
         # Auto-detect best queue based on current players
-        from main import load_queue
-        queue = load_queue()
-        queue_counts = {"1v1": 0, "2v2": 0, "3v3": 0}
-
-        for player in queue:
-            if player["status"] == "searching":
-                queue_counts[player["format"]] += 1
+        from queue_state import aget_queue_state
+        queue_state = await aget_queue_state(interaction.guild_id)
+        queue_counts = {fmt: queue_state.count(fmt) for fmt in ["1v1", "2v2", "3v3"]}
 
         # Find the queue closest to starting a match
         best_queue = None
@@ -45,8 +42,8 @@ class DashboardView(discord.ui.View):
 
     @discord.ui.button(label="🏆 Tournaments", style=discord.ButtonStyle.success, custom_id="tournaments", row=0)
     async def tournaments(self, interaction: discord.Interaction, button: discord.ui.Button):
-        from main import load_tournaments
-        tournaments = load_tournaments()
+        from main import aload_tournaments, guild_records
+        tournaments = guild_records("tournaments.json", await aload_tournaments(interaction.guild_id), interaction.guild_id)
         active_tournaments = [t for t in tournaments if t["status"] in ["registration", "active"]]
 
         embed = discord.Embed(title="🏆 Tournament Hub", description="Join competitive tournaments and climb the ranks!", color=0xFFD700)
@@ -70,20 +67,18 @@ class DashboardView(discord.ui.View):
 
     @discord.ui.button(label="📊 My Stats", style=discord.ButtonStyle.secondary, custom_id="my_stats", row=0)
     async def my_stats(self, interaction: discord.Interaction, button: discord.ui.Button):
-        from main import load_stats, load_match_history, load_mvp_votes
+        from main import aload_player_stats, load_match_history, load_mvp_votes
 
-        stats = load_stats()
         player_id = str(interaction.user.id)
+        player_stats = await aload_player_stats(player_id)
 
-        if player_id not in stats:
+        if player_stats is None:
             embed = discord.Embed(title="📊 Welcome to OctaneCore!", description="Ready to start your Rocket League journey? Play your first match to unlock detailed statistics!", color=0x00ffcc)
             embed.add_field(name="🎮 Getting Started", value="• Join a queue to find matches\n• Play tournaments for extra rewards\n• Track your progress over time", inline=False)
             embed.add_field(name="🏆 What You'll Unlock", value="• MMR and rank tracking\n• Win/loss statistics\n• Goal, save, and assist counts\n• Achievement system", inline=False)
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        player_stats = stats[player_id]
-
         # Calculate additional stats
         total_games = player_stats["wins"] + player_stats["losses"]
         win_rate = (player_stats["wins"] / total_games * 100) if total_games > 0 else 0
@@ -101,8 +96,8 @@ class DashboardView(discord.ui.View):
         # Calculate goals per game
         goals_per_game = player_stats['goals'] / total_games if total_games > 0 else 0
 
-        embed = discord.Embed(title=f"📊 {interaction.user.display_name}'s Profile", description=f"**{player_stats['rank']}** Player", color=0x00ffcc)
-        embed.add_field(name="🏆 Rank & MMR", value=f"**{player_stats['rank']}**\n{player_stats['mmr']} MMR", inline=True)
+        embed = discord.Embed(title=f"📊 {interaction.user.display_name}'s Profile", description=f"**{rank_for(player_stats['mmr'])}** Player", color=0x00ffcc)
+        embed.add_field(name="🏆 Rank & MMR", value=f"**{rank_for(player_stats['mmr'])}**\n{player_stats['mmr']} MMR", inline=True)
         embed.add_field(name="🎮 Match Record", value=f"**{player_stats['wins']}W - {player_stats['losses']}L**\n{win_rate:.1f}% Win Rate", inline=True)
         embed.add_field(name="⭐ MVP Awards", value=f"**{mvp_count}** Total", inline=True)
         embed.add_field(name="⚽ Goals", value=f"**{player_stats['goals']}**\n{goals_per_game:.1f} per game", inline=True)
@@ -155,40 +150,9 @@ class DashboardView(discord.ui.View):
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
     def get_rank_progress(self, mmr):
-        rank_thresholds = {
-            "Bronze I": 50,
-            "Silver I": 100,
-            "Silver II": 200,
-            "Silver III": 300,
-            "Gold I": 400,
-            "Gold II": 500,
-            "Gold III": 600,
-            "Platinum I": 700,
-            "Platinum II": 800,
-            "Platinum III": 900,
-            "Diamond I": 1000,
-            "Diamond II": 1100,
-            "Diamond III": 1200,
-            "Champion I": 1300,
-            "Champion II": 1400,
-            "Champion III": 1500,
-            "Grand Champion": 1600
-        }
-
-        current_rank = None
-        next_rank = None
-
-        for rank, threshold in rank_thresholds.items():
-            if mmr < threshold:
-                next_rank = rank
-                break
-            current_rank = rank
-
-        if next_rank:
-            prev_threshold = rank_thresholds.get(current_rank, 0) if current_rank else 0
-            next_threshold = rank_thresholds[next_rank]
-            progress = ((mmr - prev_threshold) / (next_threshold - prev_threshold)) * 100
-            return f"**{progress:.1f}%** to {next_rank} ({mmr}/{next_threshold} MMR)"
+        progress = rank_progress(mmr)
+        if progress["next_rank"]:
+            return f"Division {progress['division']} - **{progress['progress']:.1f}%** to {progress['next_rank']} ({mmr}/{progress['next_floor']} MMR)"
         else:
             return "**Maximum Rank Achieved!** 🏆"
 
@@ -236,30 +200,35 @@ class QuickQueueView(discord.ui.View):
         await interaction.response.edit_message(embed=embed, view=view)
 
     async def join_queue_format(self, interaction, format_type, game_mode="Soccar"):
-        from main import load_queue, save_queue, log_to_channel, update_all_dashboards
+        from main import log_to_channel, update_all_dashboards, request_match_check
+        from queue_state import queue_transaction
+        from parties import queue_unit
+        from wait_estimator import record_join
         import datetime
 
-        queue = load_queue()
-        # Remove user from any existing queue
-        old_queue_count = len(queue)
-        queue = [p for p in queue if p["user_id"] != interaction.user.id]
-        was_in_queue = len(queue) < old_queue_count
-
-        queue.append({
-            "user_id": interaction.user.id,
-            "username": interaction.user.display_name,
-            "format": format_type,
-            "game_mode": game_mode,
-            "status": "searching",
-            "joined_at": datetime.datetime.now().isoformat(),
-            "region": "Auto",
-            "mmr": 1000  # Could get from stats
-        })
-
-        save_queue(queue)
-
-        # Count players in this specific queue
-        format_count = len([p for p in queue if p["format"] == format_type and p.get("game_mode", "Soccar") == game_mode])
+        unit, error = await queue_unit(interaction.user.id, interaction.user.display_name, format_type)
+        if error:
+            await interaction.response.send_message(f"❌ {error}", ephemeral=True)
+            return
+
+        async with queue_transaction(interaction.guild_id) as queue_state:
+            # Remove user from any existing queue
+            was_in_queue = queue_state.remove(interaction.user.id) is not None
+
+            queue_state.add({
+                **unit,
+                "format": format_type,
+                "game_mode": game_mode,
+                "status": "searching",
+                "joined_at": datetime.datetime.now().isoformat(),
+                "region": "Auto"
+            })
+
+            # Count players in this specific queue
+            format_count = queue_state.count(format_type, game_mode)
+        
+        record_join(format_type, game_mode, interaction.guild_id)
+        request_match_check(format_type, game_mode, interaction.guild_id)
         
         # Enhanced logging
         action = "rejoined" if was_in_queue else "joined"
@@ -269,14 +238,14 @@ class QuickQueueView(discord.ui.View):
         embed = discord.Embed(title=f"✅ Joined {format_type} {game_mode} Queue", color=0x00ff00)
         embed.add_field(name="Status", value="🔍 Searching for match...", inline=False)
         embed.add_field(name="Queue Info", value=f"**{format_count}** players in {format_type} {game_mode} queue", inline=False)
-        embed.add_field(name="Estimated Wait", value=self.get_estimated_wait(format_type, format_count), inline=False)
+        embed.add_field(name="Estimated Wait", value=self.get_estimated_wait(format_type, format_count, game_mode, interaction.guild_id), inline=False)
         
         # Show all queue counts by game mode
         mode_counts = {}
         for mode in ["Soccar", "Hoops", "Snow Day", "Heatseeker"]:
             mode_counts[mode] = {}
             for fmt in ["1v1", "2v2", "3v3"]:
-                mode_counts[mode][fmt] = len([p for p in queue if p["status"] == "searching" and p["format"] == fmt and p.get("game_mode", "Soccar") == mode])
+                mode_counts[mode][fmt] = queue_state.count(fmt, mode)
         
         queue_text = ""
         for mode in ["Soccar", "Hoops", "Snow Day", "Heatseeker"]:
@@ -306,12 +275,9 @@ class QuickQueueView(discord.ui.View):
 
         await interaction.response.edit_message(embed=embed, view=view)
 
-    def get_estimated_wait(self, format_type, count):
-        needed = {"1v1": 2, "2v2": 4, "3v3": 6}[format_type]
-        if count >= needed:
-            return "< 1 minute"
-        else:
-            return f"Waiting for {needed - count} more players"
+    def get_estimated_wait(self, format_type, count, game_mode="Soccar", guild_id=None):
+        from wait_estimator import describe
+        return describe(format_type, game_mode, count, guild_id)
     
     async def create_main_dashboard_embed_and_view(self):
         embed = discord.Embed(
@@ -354,13 +320,12 @@ class StatsView(discord.ui.View):
 
     @discord.ui.button(label="📊 Recent Matches", style=discord.ButtonStyle.secondary, emoji="📊")
     async def recent_matches(self, interaction: discord.Interaction, button: discord.ui.Button):
-        from main import load_stats
+        from main import aload_player_stats
 
-        stats = load_stats()
-        player_id = str(interaction.user.id)
+        player_stats = await aload_player_stats(interaction.user.id)
 
-        if player_id in stats and "match_history" in stats[player_id]:
-            history = stats[player_id]["match_history"][-5:]
+        if player_stats and "match_history" in player_stats:
+            history = player_stats["match_history"][-5:]
 
             embed = discord.Embed(title=f"📊 {interaction.user.display_name}'s Recent Matches", color=0x00ffcc)
 
@@ -426,7 +391,7 @@ class MatchCreatorView(discord.ui.View):
             await interaction.response.send_message("❌ Please select format and map first!", ephemeral=True)
             return
 
-        from main import load_matches, save_matches
+        from data import transaction, guild_file
         import random
         import datetime
 
@@ -445,12 +410,12 @@ class MatchCreatorView(discord.ui.View):
             "password": password,
             "created_at": datetime.datetime.now().isoformat(),
             "created_by": interaction.user.id,
-            "type": "custom"
+            "type": "custom",
+            "guild_id": interaction.guild_id
         }
 
-        matches = load_matches()
-        matches.append(match_data)
-        save_matches(matches)
+        async with transaction(guild_file("matches.json", interaction.guild_id)) as matches:
+            matches.append(match_data)
 
         embed = discord.Embed(title="🚀 Custom Match Created!", color=0x00ff00)
         embed.add_field(name="🎮 Match Details", value=f"**Format:** {self.format}\n**Map:** {self.map_choice}", inline=False)
@@ -480,20 +445,25 @@ class LeaderboardView(discord.ui.View):
 
     @discord.ui.button(label="🏆 MMR Leaderboard", style=discord.ButtonStyle.primary)
     async def mmr_leaderboard(self, interaction: discord.Interaction, button: discord.ui.Button):
-        from main import load_stats, bot
+        from main import bot
+        from data import run_io
+        import leaderboards
+        import player_store
 
-        stats = load_stats()
-        if not stats:
+        top_players = await run_io(leaderboards.top, "mmr", 10)
+        if not top_players:
             await interaction.response.send_message("❌ No player stats found!", ephemeral=True)
             return
 
-        sorted_players = sorted(stats.items(), key=lambda x: x[1]["mmr"], reverse=True)
+        stats = await run_io(player_store.load_players, [player_id for player_id, _ in top_players])
+        ranks = rank_for_many(mmr for _, mmr in top_players)
 
         embed = discord.Embed(title="🏆 MMR Leaderboard", description="Top ranked players on the server", color=0xFFD700)
 
-        for i, (player_id, player_stats) in enumerate(sorted_players[:10]):
+        for i, (player_id, mmr) in enumerate(top_players):
+            player_stats = stats.get(player_id, {})
             try:
-                user = await bot.fetch_user(int(player_id))
+                user = await bot.fetch_user(leaderboards.board_user_id("mmr", player_id))
                 name = user.display_name
             except:
                 name = f"Player {player_id}"
@@ -502,10 +472,14 @@ class LeaderboardView(discord.ui.View):
 
             embed.add_field(
                 name=f"{rank_emoji} {name}",
-                value=f"**{player_stats['rank']}** ({player_stats['mmr']} MMR)\n{player_stats['wins']}W-{player_stats['losses']}L",
+                value=f"**{ranks[i]}** ({mmr} MMR)\n{player_stats.get('wins', 0)}W-{player_stats.get('losses', 0)}L",
                 inline=True
             )
 
+        position, total = await run_io(leaderboards.position, "mmr", leaderboards.board_key("mmr", interaction.user.id))
+        if position:
+            embed.set_footer(text=f"Your position: #{position} of {total}")
+
         view = discord.ui.View()
         back_btn = discord.ui.Button(label="🔙 Back to Dashboard", style=discord.ButtonStyle.secondary)
         back_btn.callback = self.back_to_dashboard
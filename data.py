@@ -1,22 +1,492 @@
 
+import asyncio
+import atexit
 import json
 import os
+import shutil
+import stat
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import sqlite_store
+
+# "json" keeps every file on disk as before, "sqlite" moves the files listed
+# in sqlite_store.TABLES into the database (run `python sqlite_store.py` once first)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").lower()
+
+# Seconds to hold back JSON saves so repeated saves of one file become a single
+# disk write. 0 writes every save straight away.
+WRITE_BEHIND_DELAY = float(os.getenv("WRITE_BEHIND_DELAY", "0"))
+
+# Parsed file contents kept in memory, keyed by filename.
+# Each entry is (mtime_ns, size, data) so outside edits to the file are picked up.
+_cache = {}
+_cache_stats = {"hits": 0, "misses": 0}
+# filename -> number of saves and invalidations seen, so views built on a
+# file's data (like queue_state.QueueState) can tell when someone else changed it
+_versions = {}
+# Unreadable files already reported: filename -> (mtime_ns, size) when we warned
+_corrupt = {}
+
+# Mode for files we create, as open() would give them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_NEW_FILE_MODE = 0o666 & ~_UMASK
+
+# Saves waiting for the write-behind flush: filename -> (data, save number, JSON text).
+# The text is serialized when save_data is called, so the flush thread never
+# reads an object the bot may be changing.
+_pending = {}
+_flush_timer = None
+_write_lock = threading.RLock()
+_write_stats = {"saves": 0, "writes": 0}
+
+# Threads used by aload_data/asave_data so parsing and writing big files
+# doesn't block the bot's event loop
+IO_WORKERS = int(os.getenv("IO_WORKERS", "4"))
+_io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="data-io")
+_io_stats = {"offloaded_loads": 0, "offloaded_saves": 0}
+
+# Per-file locks and the newest save number written, so pool threads writing
+# the same file can't put an older version on disk after a newer one
+_file_write_locks = {}
+_written_saves = {}
+
+LIST_FILES = ["matches.json", "queue.json", "tournaments.json", "match_history.json", "teams.json"]
+
+# Files kept separately for every guild under guilds/<guild_id>/, so one
+# server's queue sweeps and lookups never walk another server's records.
+# The top-level files remain the partition for guild_id None (DMs, and data
+# from before partitioning until `python data.py migrate <guild_id>` moves it).
+# Files kept in SQLite are not partitioned: every guild shares the one table.
+GUILD_DIR = os.getenv("GUILD_DIR", "guilds")
+PARTITIONED_FILES = ["queue.json", "matches.json", "tournaments.json"]
+
+def guild_file(filename, guild_id=None):
+    if guild_id is None or uses_sqlite(filename):
+        return filename
+    return os.path.join(GUILD_DIR, str(guild_id), filename)
+
+def guild_partitions(filename):
+    """Guild ids with their own copy of filename, None (the top-level file) first"""
+    partitions = [None]
+    if os.path.isdir(GUILD_DIR) and not uses_sqlite(filename):
+        for name in sorted(os.listdir(GUILD_DIR)):
+            if name.isdigit() and os.path.exists(guild_file(filename, name)):
+                partitions.append(int(name))
+    return partitions
+
+def in_guild(filename, record, guild_id):
+    """Whether a record loaded from guild_file(filename, guild_id) is that guild's.
+
+    Guild partitions only hold their own records, but files kept in SQLite
+    are shared by every guild, so there the record's guild_id decides.
+    """
+    return guild_id is None or not uses_sqlite(filename) or record.get("guild_id") == guild_id
+
+def guild_records(filename, records, guild_id):
+    """The records of one guild out of a loaded partitioned file, see in_guild"""
+    if guild_id is None or not uses_sqlite(filename):
+        return records
+    return [record for record in records if in_guild(filename, record, guild_id)]
+
+def _empty_for(filename):
+    # Return appropriate empty structure based on filename
+    if os.path.basename(filename) in LIST_FILES:
+        return []
+    return {}
 
 def load_data(filename):
-    if not os.path.exists(filename):
-        # Return appropriate empty structure based on filename
-        if filename in ["matches.json", "queue.json", "tournaments.json", "match_history.json", "teams.json"]:
-            return []
-        return {}
+    """Load a JSON file, serving repeat reads from the in-memory cache.
+
+    The returned object is shared with the cache, so changes made to it are
+    seen by later readers; persist them with save_data.
+    """
+    if uses_sqlite(filename):
+        data, from_cache = sqlite_store.load(filename)
+        _cache_stats["hits" if from_cache else "misses"] += 1
+        return data
+
+    cached = _cached_copy(filename)
+    if cached is not None:
+        _cache_stats["hits"] += 1
+        return cached
+
+    try:
+        st = os.stat(filename)
+    except OSError:
+        _cache.pop(filename, None)
+        return _empty_for(filename)
+
+    _cache_stats["misses"] += 1
     try:
         with open(filename, "r") as f:
-            return json.load(f)
-    except:
-        # Return appropriate empty structure based on filename
-        if filename in ["matches.json", "queue.json", "tournaments.json", "match_history.json", "teams.json"]:
-            return []
-        return {}
+            data = json.load(f)
+    except Exception as e:
+        # Keep the unreadable file around instead of letting the next save overwrite it
+        _cache.pop(filename, None)
+        if _corrupt.get(filename) != (st.st_mtime_ns, st.st_size):
+            # Warn once per version of the file, not on every load
+            _corrupt[filename] = (st.st_mtime_ns, st.st_size)
+            backup = filename + ".corrupt"
+            if not os.path.exists(backup):
+                shutil.copy2(filename, backup)
+            print(f"⚠️ Could not read {filename} ({e}), copy kept at {backup}")
+        return _empty_for(filename)
+
+    _corrupt.pop(filename, None)
+    _cache[filename] = (st.st_mtime_ns, st.st_size, data)
+    return data
+
+def _cached_copy(filename):
+    # The in-memory copy if it is still current, without reading the file
+    pending = _pending.get(filename)
+    if pending is not None:
+        return pending[0]
+
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+
+    cached = _cache.get(filename)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    return None
+
+def file_version(filename):
+    return _versions.get(filename, 0)
+
+def _changed(filename):
+    _mark_index_dirty(filename)
+    _versions[filename] = _versions.get(filename, 0) + 1
+    return _versions[filename]
 
 def save_data(filename, data):
-    with open(filename, "w") as f:
-        json.dump(data, f, indent=2)
+    """Save data to filename; returns the file_version of this save"""
+    version = _changed(filename)
+    if uses_sqlite(filename):
+        sqlite_store.save(filename, data)
+        return version
+
+    text = json.dumps(data, indent=2)
+    _write_stats["saves"] += 1
+    if WRITE_BEHIND_DELAY > 0:
+        with _write_lock:
+            _pending[filename] = (data, _write_stats["saves"], text)
+            _schedule_flush()
+        return version
+
+    _write_file(filename, data, text, _write_stats["saves"])
+    return version
+
+def _write_file(filename, data, text, save_number=None):
+    with _write_lock:
+        file_lock = _file_write_locks.setdefault(filename, threading.Lock())
+
+    with file_lock:
+        if save_number is not None:
+            if _written_saves.get(filename, 0) > save_number:
+                # A newer save of this file already reached the disk
+                return
+            _written_saves[filename] = save_number
+        _replace_file(filename, data, text)
+
+def _replace_file(filename, data, text):
+    # Write to a temp file in the same directory, then swap it in, so a crash
+    # mid-write leaves the previous version intact instead of a truncated file
+    directory = os.path.dirname(filename) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(filename) + ".", suffix=".tmp", dir=directory)
+    try:
+        # mkstemp creates the file 0600, keep the mode the file had (or would get)
+        try:
+            mode = stat.S_IMODE(os.stat(filename).st_mode)
+        except OSError:
+            mode = _NEW_FILE_MODE
+        os.chmod(temp_path, mode)
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, filename)
+    except:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+    _write_stats["writes"] += 1
+
+    # Keep the cached copy in step with what we just wrote
+    st = os.stat(filename)
+    _cache[filename] = (st.st_mtime_ns, st.st_size, data)
+
+def _schedule_flush():
+    global _flush_timer
+    if _flush_timer is None:
+        _flush_timer = threading.Timer(WRITE_BEHIND_DELAY, flush_writes)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+def flush_file(filename):
+    """Write the pending save of one file to disk now"""
+    with _write_lock:
+        pending = _pending.get(filename)
+    if pending is None:
+        return
+    data, save_number, text = pending
+    _write_file(filename, data, text, save_number)
+    with _write_lock:
+        if _pending.get(filename, (None, None))[1] == save_number:
+            del _pending[filename]
+
+def flush_writes():
+    """Write every pending save to disk now"""
+    global _flush_timer
+    with _write_lock:
+        _flush_timer = None
+        pending = list(_pending.items())
+
+    for filename, (data, save_number, text) in pending:
+        try:
+            _write_file(filename, data, text, save_number)
+        except Exception as e:
+            print(f"❌ Failed to write {filename}: {e}")
+            continue
+
+        with _write_lock:
+            # Leave it queued if it was saved again while we were writing
+            if _pending.get(filename, (None, None))[1] == save_number:
+                del _pending[filename]
+
+atexit.register(flush_writes)
+
+async def run_io(func, *args):
+    """Run a blocking data function on the I/O thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_pool, func, *args)
+
+async def aload_data(filename):
+    """load_data for coroutines: cache hits return straight away, real
+    reads and parses happen on the I/O pool"""
+    if not uses_sqlite(filename):
+        cached = _cached_copy(filename)
+        if cached is not None:
+            _cache_stats["hits"] += 1
+            return cached
+
+    _io_stats["offloaded_loads"] += 1
+    return await run_io(load_data, filename)
+
+async def asave_data(filename, data):
+    """save_data for coroutines: data is serialized here on the event loop,
+    where nothing else can change it, and written on the I/O pool"""
+    if WRITE_BEHIND_DELAY > 0 and not uses_sqlite(filename):
+        # Only queues the save, nothing to offload
+        return save_data(filename, data)
+
+    version = _changed(filename)
+    _io_stats["offloaded_saves"] += 1
+    if uses_sqlite(filename):
+        await run_io(sqlite_store.save, filename, data, sqlite_store.serialize(filename, data))
+    else:
+        _write_stats["saves"] += 1
+        await run_io(_write_file, filename, data, json.dumps(data, indent=2), _write_stats["saves"])
+    return version
+
+# One asyncio lock per file so load-modify-save sequences can't interleave across awaits
+_file_locks = {}
+
+def get_file_lock(filename):
+    lock = _file_locks.get(filename)
+    if lock is None:
+        lock = _file_locks[filename] = asyncio.Lock()
+    return lock
+
+class transaction:
+    """Async context manager for a load-modify-save of one file.
+
+        async with transaction("queue.json") as queue:
+            queue.append(entry)
+
+    Writers of the same file are serialized, the cached object is handed out,
+    and it is saved once on a clean exit. If the block raises, the cached
+    copy is dropped so its half-applied changes are never saved by anyone.
+    Don't nest transactions on the same file.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.lock = get_file_lock(filename)
+        self.data = None
+        self.save_on_exit = True
+
+    def skip_save(self):
+        """Nothing changed, release the lock without writing"""
+        self.save_on_exit = False
+
+    async def __aenter__(self):
+        await self.lock.acquire()
+        try:
+            if self.filename in _pending:
+                # Put earlier saves on disk first, a rollback drops the pending copy
+                await run_io(flush_file, self.filename)
+            self.data = await aload_data(self.filename)
+        except:
+            self.lock.release()
+            raise
+        return self.data
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is not None:
+                discard_cached(self.filename)
+            elif self.save_on_exit:
+                try:
+                    await asave_data(self.filename, self.data)
+                except:
+                    discard_cached(self.filename)
+                    raise
+        finally:
+            self.lock.release()
+        return False
+
+# Primary key of the list files whose records are looked up by id
+INDEXED_FILES = {"matches.json": "id", "tournaments.json": "id", "match_history.json": "match_id"}
+
+# filename -> {"list": indexed list object, "size": records indexed, "positions": {key: position},
+# "dirty": saved since the index was built}
+_indexes = {}
+
+def _build_index(filename, records):
+    field = INDEXED_FILES[os.path.basename(filename)]
+    positions = {}
+    for position, record in enumerate(records):
+        positions[record.get(field)] = position
+    _indexes[filename] = {"list": records, "size": len(records), "positions": positions, "dirty": False}
+    return _indexes[filename]
+
+def _current_index(filename, records):
+    index = _indexes.get(filename)
+    if index is None or index["list"] is not records or len(records) < index["size"]:
+        return _build_index(filename, records)
+
+    if len(records) > index["size"]:
+        # Records were appended, index just the new ones
+        field = INDEXED_FILES[os.path.basename(filename)]
+        for position in range(index["size"], len(records)):
+            index["positions"][records[position].get(field)] = position
+        index["size"] = len(records)
+    return index
+
+def _record_position(filename, key, records):
+    field = INDEXED_FILES[os.path.basename(filename)]
+    index = _current_index(filename, records)
+    position = index["positions"].get(key)
+    if position is not None and records[position].get(field) == key:
+        return position
+
+    if index["dirty"] or position is not None:
+        # The list was rewritten in place since we indexed it, start over
+        index = _build_index(filename, records)
+        return index["positions"].get(key)
+    return None
+
+def find_record(filename, key, records=None):
+    """Look up a record of matches/tournaments/match_history by its id.
+
+    Pass the list you already loaded (e.g. inside a transaction) so the
+    record returned is the one you will save.
+    """
+    if records is None:
+        records = load_data(filename)
+    position = _record_position(filename, key, records)
+    return records[position] if position is not None else None
+
+def replace_record(filename, records, record):
+    """Put record in place of the one with the same id, or append it"""
+    key = record.get(INDEXED_FILES[os.path.basename(filename)])
+    position = _record_position(filename, key, records)
+    if position is None:
+        records.append(record)
+    else:
+        records[position] = record
+
+def _mark_index_dirty(filename):
+    index = _indexes.get(filename)
+    if index is not None:
+        index["dirty"] = True
+
+def uses_sqlite(filename):
+    return STORAGE_BACKEND == "sqlite" and sqlite_store.handles(filename)
+
+def invalidate_cache(filename=None):
+    """Drop one cached file, or the whole cache when no filename is given"""
+    flush_writes()
+    sqlite_store.invalidate(filename)
+    if filename is None:
+        _cache.clear()
+        for name in _versions:
+            _versions[name] += 1
+    else:
+        _cache.pop(filename, None)
+        _changed(filename)
+
+def discard_cached(filename):
+    """Forget unsaved changes made to the shared copy of a file; the next load reads it again"""
+    with _write_lock:
+        _pending.pop(filename, None)
+    sqlite_store.invalidate(filename)
+    _cache.pop(filename, None)
+    _indexes.pop(filename, None)
+    _changed(filename)
+
+def get_cache_stats():
+    """Hit/miss counters for the load_data cache"""
+    total = _cache_stats["hits"] + _cache_stats["misses"]
+    return {
+        "hits": _cache_stats["hits"],
+        "misses": _cache_stats["misses"],
+        "hit_rate": round(_cache_stats["hits"] / total * 100, 1) if total else 0.0,
+        "cached_files": len(_cache),
+        "saves": _write_stats["saves"],
+        "disk_writes": _write_stats["writes"],
+        "pending_writes": len(_pending),
+        "io_workers": IO_WORKERS,
+        **_io_stats
+    }
+
+def migrate_to_guild(guild_id, filenames=PARTITIONED_FILES):
+    """Move the records of the top-level partitioned files into guild partitions.
+
+    Records that carry a guild_id go to that guild, the rest to guild_id.
+    Files kept in SQLite stay where they are. Returns {filename: records moved}.
+    """
+    moved = {}
+    for filename in filenames:
+        if uses_sqlite(filename):
+            continue
+        records = load_data(filename)
+        by_guild = {}
+        for record in records:
+            by_guild.setdefault(record.get("guild_id", guild_id), []).append(record)
+        for target, batch in by_guild.items():
+            partition = load_data(guild_file(filename, target))
+            partition.extend(dict(record, guild_id=target) for record in batch)
+            save_data(guild_file(filename, target), partition)
+        save_data(filename, [])
+        moved[filename] = len(records)
+    flush_writes()
+    return moved
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 3 or sys.argv[1] != "migrate" or not sys.argv[2].isdigit():
+        print("Usage: python data.py migrate <guild_id>")
+        sys.exit(1)
+    print(f"🗂️ Moving global queue, matches and tournaments into guild {sys.argv[2]}")
+    for filename, count in migrate_to_guild(int(sys.argv[2])).items():
+        print(f"✅ {filename}: {count} records")
+    for filename in PARTITIONED_FILES:
+        if uses_sqlite(filename):
+            print(f"ℹ️ {filename} is stored in SQLite and shared by every guild, left as is")
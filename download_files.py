@@ -32,7 +32,7 @@ def create_project_archive():
         "matches.json",
         "tournaments.json",
         "queue.json",
-        "match_history.json",
+        "match_history.jsonl",
         "mvp_votes.json",
         "teams.json",
         "player_profiles.json",
@@ -76,6 +76,18 @@ def create_project_archive():
         else:
             print(f"⚠️  Data file not found: {file}")
     
+    # Player stats live in shard files under stats/
+    if os.path.isdir("stats"):
+        shutil.copytree("stats", f"{archive_name}/data/stats", dirs_exist_ok=True)
+        print("✅ Copied data: stats/")
+        copied_files += 1
+
+    # Per-guild queues, matches and tournaments live under guilds/
+    if os.path.isdir("guilds"):
+        shutil.copytree("guilds", f"{archive_name}/data/guilds", dirs_exist_ok=True)
+        print("✅ Copied data: guilds/")
+        copied_files += 1
+
     # Create a simple README for the archive
     readme_content = f"""# OctaneCore Bot Archive
 Created: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
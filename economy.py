@@ -4,8 +4,9 @@ from discord.ext import commands
 import json
 import random
 from datetime import datetime, timedelta
-from data import load_data, save_data
+from data import load_data, save_data, aload_data, asave_data
 from utils import *
+import leaderboards
 
 SHOP_ITEMS = {
     "banner_fire": {"name": "🔥 Fire Banner", "price": 500, "type": "banner", "value": "fire"},
@@ -26,27 +27,37 @@ def load_economy():
 def save_economy(economy):
     save_data("economy.json", economy)
 
+async def aload_economy():
+    return await aload_data("economy.json")
+
+async def asave_economy(economy):
+    await asave_data("economy.json", economy)
+
+def new_player_economy():
+    return {
+        "credits": 100,  # Starting credits
+        "daily_streak": 0,
+        "last_daily": None,
+        "total_earned": 100,
+        "total_spent": 0,
+        "purchases": [],
+        "vip_until": None,
+        "inventory": []
+    }
+
 def get_player_economy(user_id):
     economy = load_economy()
     if str(user_id) not in economy:
-        economy[str(user_id)] = {
-            "credits": 100,  # Starting credits
-            "daily_streak": 0,
-            "last_daily": None,
-            "total_earned": 100,
-            "total_spent": 0,
-            "purchases": [],
-            "vip_until": None,
-            "inventory": []
-        }
+        economy[str(user_id)] = new_player_economy()
         save_economy(economy)
     return economy[str(user_id)]
 
-def add_credits(user_id, amount, reason="Unknown"):
-    economy = load_economy()
-    player = get_player_economy(user_id)
+def credit_player(economy, user_id, amount, reason="Unknown"):
+    """Add credits to a player in an already loaded economy dict"""
+    player = economy.setdefault(str(user_id), new_player_economy())
     player["credits"] += amount
     player["total_earned"] += amount
+    leaderboards.update_credits(user_id, player["credits"])
     
     # Log transaction
     transaction = {
@@ -59,11 +70,14 @@ def add_credits(user_id, amount, reason="Unknown"):
     if "transactions" not in player:
         player["transactions"] = []
     player["transactions"].append(transaction)
-    
-    economy[str(user_id)] = player
-    save_economy(economy)
     return player["credits"]
 
+def add_credits(user_id, amount, reason="Unknown"):
+    economy = load_economy()
+    credits = credit_player(economy, user_id, amount, reason)
+    save_economy(economy)
+    return credits
+
 def spend_credits(user_id, amount, reason="Purchase"):
     economy = load_economy()
     player = get_player_economy(user_id)
@@ -73,6 +87,7 @@ def spend_credits(user_id, amount, reason="Purchase"):
     
     player["credits"] -= amount
     player["total_spent"] += amount
+    leaderboards.update_credits(user_id, player["credits"])
     
     # Log transaction
     transaction = {
@@ -137,7 +152,8 @@ class EconomyView(discord.ui.View):
             await interaction.response.send_message("❌ This is not your economy panel!", ephemeral=True)
             return
         
-        player = get_player_economy(self.user_id)
+        economy = await aload_economy()
+        player = economy.get(str(self.user_id)) or get_player_economy(self.user_id)
         
         embed = discord.Embed(title="💰 Your Economy Stats", color=0x00ff00)
         embed.add_field(name="💳 Current Balance", value=f"**{player['credits']:,}** credits", inline=True)
@@ -154,7 +170,7 @@ class EconomyView(discord.ui.View):
                 vip_status = f"VIP ({days_left} days left)"
         
         embed.add_field(name="👑 VIP Status", value=vip_status, inline=True)
-        embed.add_field(name="🛍️ Items Purchased", value=str(len(player.get("purchases", []))), inline=True)
+        embed.add_field(name="🛍️ Items Purchased", value=str(len(player.get("purchases", [])) + player.get("archived_purchases", 0)), inline=True)
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
     
@@ -245,16 +261,19 @@ class ShopView(discord.ui.View):
                     unlock_banner(self.user_id, item["value"])
                 elif item["type"] == "boost":
                     # Apply MMR boost
-                    stats = load_stats()
-                    if str(self.user_id) in stats:
-                        stats[str(self.user_id)]["mmr"] += item["value"]
-                        save_stats(stats)
+                    from player_store import players_transaction
+                    async with players_transaction([self.user_id]) as stats:
+                        if str(self.user_id) in stats:
+                            stats[str(self.user_id)]["mmr"] += item["value"]
                 elif item["type"] == "vip":
                     vip_until = datetime.now() + timedelta(days=item["value"])
                     player["vip_until"] = vip_until.isoformat()
+                elif item["type"] == "priority":
+                    from queue_priority import extend_priority, grant_priority
+                    grant_priority(self.user_id, extend_priority(player, item["value"]))
                 
                 economy[str(self.user_id)] = player
-                save_economy(economy)
+                await asave_economy(economy)
                 
                 embed = discord.Embed(title="✅ Purchase Successful!", color=0x00ff00)
                 embed.add_field(name="Item", value=item["name"], inline=True)
@@ -268,10 +287,13 @@ class ShopView(discord.ui.View):
         return purchase_callback
 
 # Economy reward functions for integration with other systems
-def reward_match_completion(user_id, won=False):
+def match_completion_reward(won=False):
     base_reward = 25
     win_bonus = 15 if won else 0
-    total = base_reward + win_bonus
+    return base_reward + win_bonus
+
+def reward_match_completion(user_id, won=False):
+    total = match_completion_reward(won)
     add_credits(user_id, total, "Match completion")
     return total
 
@@ -0,0 +1,221 @@
+
+import random
+import threading
+from data import load_data
+import player_store
+
+# Leaderboards kept sorted as stats change instead of sorting everything per
+# request. Stat boards are built from player_store on first use and updated by
+# its saves; the credits board is updated by economy.credit_player and
+# spend_credits, and rebuilt if economy.json is reloaded from disk.
+STAT_FIELDS = ["mmr", "goals", "saves", "assists", "matches_played"]
+ECONOMY_FIELDS = ["credits"]
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, levels):
+        self.key = key
+        self.next = [None] * levels
+        # Number of positions to the next node on each level
+        self.width = [1] * levels
+
+class SortedIndex:
+    """Indexable skip list of unique, comparable keys.
+
+    insert, remove and position are O(log n); items walks from any offset.
+    """
+
+    MAX_LEVELS = 32
+
+    def __init__(self, keys=()):
+        self.head = _Node(None, self.MAX_LEVELS)
+        self.size = 0
+        self._random = random.Random()
+        self._bulk_load(sorted(keys))
+
+    def _bulk_load(self, keys):
+        # Every 2^l-th key also gets level l, a perfectly balanced list in O(n)
+        last = [self.head] * self.MAX_LEVELS
+        last_position = [0] * self.MAX_LEVELS
+        for position, key in enumerate(keys, 1):
+            levels = 1
+            while levels < self.MAX_LEVELS and position % (1 << levels) == 0:
+                levels += 1
+            node = _Node(key, levels)
+            for level in range(levels):
+                last[level].next[level] = node
+                last[level].width[level] = position - last_position[level]
+                last[level], last_position[level] = node, position
+        for level in range(self.MAX_LEVELS):
+            last[level].width[level] = len(keys) + 1 - last_position[level]
+        self.size = len(keys)
+
+    def __len__(self):
+        return self.size
+
+    def _path(self, key):
+        # Last node before key on every level, and the position of each
+        chain = [None] * self.MAX_LEVELS
+        positions = [0] * self.MAX_LEVELS
+        node, position = self.head, 0
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+            positions[level] = position
+        return chain, positions
+
+    def insert(self, key):
+        chain, positions = self._path(key)
+        levels = 1
+        while levels < self.MAX_LEVELS and self._random.random() < 0.5:
+            levels += 1
+
+        node = _Node(key, levels)
+        for level in range(levels):
+            previous = chain[level]
+            steps = positions[0] - positions[level]
+            node.next[level] = previous.next[level]
+            previous.next[level] = node
+            node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+        for level in range(levels, self.MAX_LEVELS):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key):
+        chain, _ = self._path(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        for level in range(len(node.next)):
+            previous = chain[level]
+            previous.width[level] += node.width[level] - 1
+            previous.next[level] = node.next[level]
+        for level in range(len(node.next), self.MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def position(self, key):
+        """0-based position of key, or None if it isn't in the index"""
+        chain, positions = self._path(key)
+        node = chain[0].next[0]
+        return positions[0] if node is not None and node.key == key else None
+
+    def items(self, start=0, count=None):
+        """Keys in order from position start"""
+        node, remaining = self.head, start + 1
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        if remaining:
+            node = None  # start is past the end
+
+        keys = []
+        while node is not None and (count is None or len(keys) < count):
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+class Leaderboard:
+    """Players ordered by one field, highest first, ties by player id"""
+
+    def __init__(self, field, records=None):
+        self.field = field
+        self.values = {str(player_id): record.get(field, 0) for player_id, record in (records or {}).items()}
+        self.index = SortedIndex((-value, player_id) for player_id, value in self.values.items())
+
+    def __len__(self):
+        return len(self.values)
+
+    def update(self, player_id, value):
+        player_id = str(player_id)
+        old = self.values.get(player_id)
+        if old is not None:
+            if old == value:
+                return
+            self.index.remove((-old, player_id))
+        self.values[player_id] = value
+        self.index.insert((-value, player_id))
+
+    def remove(self, player_id):
+        player_id = str(player_id)
+        if player_id in self.values:
+            self.index.remove((-self.values.pop(player_id), player_id))
+
+    def top(self, count=10, start=0):
+        """[(player_id, value)] from 0-based position start"""
+        return [(player_id, -value) for value, player_id in self.index.items(start, count)]
+
+    def position(self, player_id):
+        """1-based position of a player, or None if they aren't on the board"""
+        player_id = str(player_id)
+        if player_id not in self.values:
+            return None
+        return self.index.position((-self.values[player_id], player_id)) + 1
+
+# field -> Leaderboard; the economy dict the credits board was built from
+_boards = {}
+_sources = {"economy": None}
+_lock = threading.RLock()
+
+def _build(fields, records):
+    for field in fields:
+        _boards[field] = Leaderboard(field, records)
+
+def get_board(field):
+    """The leaderboard for a stat or credits field, built on first use"""
+    with _lock:
+        if field in ECONOMY_FIELDS:
+            economy = load_data("economy.json")
+            if _sources["economy"] is not economy:
+                _build(ECONOMY_FIELDS, economy)
+                _sources["economy"] = economy
+        elif field not in _boards:
+            _build(STAT_FIELDS, player_store.load_all())
+        return _boards[field]
+
+def top(field, count=10, start=0):
+    with _lock:
+        return get_board(field).top(count, start)
+
+def board_key(field, user_id):
+    """Key a Discord user has on a board: stats are keyed "player_<id>", credits by the bare id"""
+    return str(user_id) if field in ECONOMY_FIELDS else player_store.stats_key(user_id)
+
+def board_user_id(field, player_id):
+    """Discord user id behind a board key, or None for old username-keyed stats"""
+    if field in ECONOMY_FIELDS:
+        return int(player_id)
+    return player_store.user_id_for(player_id)
+
+def position(field, player_id):
+    """(1-based position, players on the board); position is None when unranked"""
+    with _lock:
+        board = get_board(field)
+        return board.position(player_id), len(board)
+
+def update_players(records, complete=False):
+    """Apply saved player stats to the stat boards.
+
+    complete=True means records holds every player, so anyone missing from
+    it is dropped. Unchanged values cost a dict lookup, changed ones O(log n).
+    """
+    with _lock:
+        if STAT_FIELDS[0] not in _boards:
+            return  # Not built yet, it will be built from the saved data
+        for field in STAT_FIELDS:
+            board = _boards[field]
+            if complete:
+                for player_id in [p for p in board.values if p not in records]:
+                    board.remove(player_id)
+            for player_id, record in records.items():
+                board.update(player_id, record.get(field, 0))
+
+def update_credits(user_id, credits):
+    with _lock:
+        if "credits" in _boards:
+            _boards["credits"].update(user_id, credits)
@@ -6,8 +6,18 @@ import os, json, asyncio, random, datetime, time
 from bracket import generate_bracket_image
 from flask import Flask, render_template_string, jsonify
 import threading
-from data import load_data, save_data
+from collections import deque
+from data import load_data, save_data, get_cache_stats, flush_writes, transaction, guild_file, guild_partitions
 from utils import *
+from settlement import apply_player_result, settle_match
+from ranks import rank_for, rank_for_many
+from queue_state import aget_queue_state, all_queue_states, queue_transaction
+import player_store
+import matchmaking
+import team_balance
+import queue_priority
+import leaderboards
+import wait_estimator
 
 TOKEN = os.getenv("BOT_TOKEN")
 LOG_CHANNEL_ID = "1390470987971166208"  # Your specified log channel
@@ -178,9 +188,9 @@ def home():
         """, 
         current_time=datetime.datetime.now().strftime("%H:%M:%S"),
         uptime=get_uptime(),
-        total_matches=len(load_matches()) if load_matches() else 0,
-        active_tournaments=len([t for t in load_tournaments() if t.get('status') == 'active']) if load_tournaments() else 0,
-        queue_count=len(load_queue()) if load_queue() else 0,
+        total_matches=len(load_all_matches()),
+        active_tournaments=len([t for t in load_all_tournaments() if t.get('status') == 'active']),
+        queue_count=sum(state.players() for state in all_queue_states()),
         registered_players=len(load_stats()) if load_stats() else 0
         )
     except Exception as e:
@@ -201,10 +211,15 @@ def api_status():
     return jsonify({
         'status': 'online',
         'uptime': get_uptime(),
-        'total_matches': len(load_matches()),
-        'active_tournaments': len([t for t in load_tournaments() if t['status'] == 'active']),
-        'queue_count': len(load_queue()),
-        'registered_players': len(load_stats())
+        'total_matches': len(load_all_matches()),
+        'active_tournaments': len([t for t in load_all_tournaments() if t['status'] == 'active']),
+        'queue_count': sum(state.players() for state in all_queue_states()),
+        'registered_players': len(load_stats()),
+        'data_cache': get_cache_stats(),
+        'event_loop_lag': get_loop_lag_stats(),
+        'matchmaking': get_matchmaking_stats(),
+        'wait_estimates': wait_estimator.get_wait_stats(
+            {(state.guild_id, *key): count for state in all_queue_states() for key, count in state.counts.items()})
     })
 
 def get_uptime():
@@ -221,84 +236,10 @@ def run_flask():
 # Functions now imported from utils module
 
 def update_player_stats(player_id, win=False, goals=0, saves=0, assists=0, match_id=None):
-    stats = load_stats()
-    
-    if player_id not in stats:
-        stats[player_id] = {
-            "wins": 0,
-            "losses": 0,
-            "goals": 0,
-            "saves": 0,
-            "assists": 0,
-            "mmr": 1000,
-            "matches_played": 0,
-            "rank": "Bronze I"
-        }
-    
-    stats[player_id]["matches_played"] += 1
-    if win:
-        stats[player_id]["wins"] += 1
-        stats[player_id]["mmr"] += random.randint(15, 25)
-    else:
-        stats[player_id]["losses"] += 1
-        stats[player_id]["mmr"] -= random.randint(10, 20)
-    
-    stats[player_id]["goals"] += goals
-    stats[player_id]["saves"] += saves
-    stats[player_id]["assists"] += assists
-    
-    # Add match to player's history
-    if "match_history" not in stats[player_id]:
-        stats[player_id]["match_history"] = []
-    
-    if match_id:
-        stats[player_id]["match_history"].append({
-            "match_id": match_id,
-            "date": datetime.datetime.now().isoformat(),
-            "won": win,
-            "goals": goals,
-            "saves": saves,
-            "assists": assists
-        })
-    
-    # Update rank based on MMR
-    mmr = stats[player_id]["mmr"]
-    if mmr >= 1500:
-        stats[player_id]["rank"] = "Grand Champion"
-    elif mmr >= 1400:
-        stats[player_id]["rank"] = "Champion III"
-    elif mmr >= 1300:
-        stats[player_id]["rank"] = "Champion II"
-    elif mmr >= 1200:
-        stats[player_id]["rank"] = "Champion I"
-    elif mmr >= 1100:
-        stats[player_id]["rank"] = "Diamond III"
-    elif mmr >= 1000:
-        stats[player_id]["rank"] = "Diamond II"
-    elif mmr >= 900:
-        stats[player_id]["rank"] = "Diamond I"
-    elif mmr >= 800:
-        stats[player_id]["rank"] = "Platinum III"
-    elif mmr >= 700:
-        stats[player_id]["rank"] = "Platinum II"
-    elif mmr >= 600:
-        stats[player_id]["rank"] = "Platinum I"
-    elif mmr >= 500:
-        stats[player_id]["rank"] = "Gold III"
-    elif mmr >= 400:
-        stats[player_id]["rank"] = "Gold II"
-    elif mmr >= 300:
-        stats[player_id]["rank"] = "Gold I"
-    elif mmr >= 200:
-        stats[player_id]["rank"] = "Silver III"
-    elif mmr >= 100:
-        stats[player_id]["rank"] = "Silver II"
-    elif mmr >= 50:
-        stats[player_id]["rank"] = "Silver I"
-    else:
-        stats[player_id]["rank"] = "Bronze I"
-    
-    save_stats(stats)
+    player_id = player_store.stats_key(player_id)
+    stats = player_store.load_players([player_id])
+    apply_player_result(stats, player_id, win, goals, saves, assists, match_id)
+    player_store.save_players(stats)
     
     # Reward credits for match participation
     try:
@@ -427,6 +368,31 @@ def format_uptime(seconds):
         hours = int((seconds % 86400) // 3600)
         return f"{days}d {hours}h"
 
+# Event loop lag: how late a short sleep wakes up. Anything that blocks the
+# loop (file parsing, big sorts) shows up here and delays every interaction.
+LOOP_LAG_INTERVAL = 0.5
+loop_lag_samples = deque(maxlen=600)
+
+async def monitor_event_loop():
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag = loop.time() - start - LOOP_LAG_INTERVAL
+        loop_lag_samples.append(max(lag, 0.0) * 1000)
+
+def get_loop_lag_stats():
+    """Event loop lag in milliseconds over the last few minutes"""
+    samples = sorted(loop_lag_samples)
+    if not samples:
+        return {"samples": 0, "avg_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    return {
+        "samples": len(samples),
+        "avg_ms": round(sum(samples) / len(samples), 2),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+        "max_ms": round(samples[-1], 2)
+    }
+
 @tasks.loop(seconds=15)
 async def update_bot_status():
     """Update bot status with uptime"""
@@ -435,8 +401,7 @@ async def update_bot_status():
         uptime_str = format_uptime(uptime)
         
         # Count active users
-        queue = load_queue()
-        active_players = len([p for p in queue if p["status"] == "searching"])
+        active_players = sum(state.searching() for state in all_queue_states())
         
         status_text = f"🕐 Up {uptime_str} | 🎮 {active_players} in queue"
         
@@ -476,11 +441,8 @@ async def update_dashboards():
                         color=0x00ffcc
                     )
 
-                    queue = load_queue()
-                    queue_counts = {"1v1": 0, "2v2": 0, "3v3": 0}
-                    for player in queue:
-                        if player["status"] == "searching":
-                            queue_counts[player["format"]] += 1
+                    queue_state = await aget_queue_state(channel.guild.id if getattr(channel, "guild", None) else None)
+                    queue_counts = {fmt: queue_state.count(fmt) for fmt in ["1v1", "2v2", "3v3"]}
 
                     embed.add_field(
                         name="🎮 Live Queue Status",
@@ -500,13 +462,17 @@ async def update_dashboards():
                         inline=True
                     )
 
-                    # Show recent activity
-                    history = load_match_history()
-                    recent_matches = [m for m in history if (datetime.datetime.now() - datetime.datetime.fromisoformat(m["date"])).seconds < 1800]  # Last 30 minutes
+                    # Show recent activity, reading the history newest first until we pass 30 minutes
+                    cutoff = datetime.datetime.now() - datetime.timedelta(minutes=30)
+                    recent_matches = 0
+                    for m in tail_match_history():
+                        if datetime.datetime.fromisoformat(m["date"]) < cutoff:
+                            break
+                        recent_matches += 1
                     
                     embed.add_field(
                         name="📈 Recent Activity (30min)",
-                        value=f"**{len(recent_matches)}** matches completed\n**{len(queue)}** players in queue",
+                        value=f"**{recent_matches}** matches completed\n**{queue_state.players()}** players in queue",
                         inline=False
                     )
 
@@ -524,12 +490,11 @@ async def update_dashboards():
                 print(f"Failed to update dashboard: {e}")
                 
         # Only log significant queue changes (not every minor update)
-        queue = load_queue()
         current_queue_state = {}
-        for player in queue:
-            if player["status"] == "searching":
-                format_type = player["format"]
-                current_queue_state[format_type] = current_queue_state.get(format_type, 0) + 1
+        for queue_state in all_queue_states():
+            for fmt, count in queue_state.format_counts.items():
+                if count:
+                    current_queue_state[fmt] = current_queue_state.get(fmt, 0) + count
         
         # Only log if there's a significant change (more than 2 player difference)
         if current_queue_state != bot.last_queue_state:
@@ -563,6 +528,11 @@ async def on_ready():
     update_bot_status.start()
     update_dashboards.start()
     send_log_summary.start()
+    compaction_job.start()
+    if not getattr(bot, "matchmaking_task", None):
+        bot.matchmaking_task = asyncio.create_task(matchmaking_worker())
+    if not getattr(bot, "loop_monitor", None):
+        bot.loop_monitor = asyncio.create_task(monitor_event_loop())
     
     # Log bot startup
     await log_to_channel(f"🚀 Bot started successfully! Servers: {len(bot.guilds)}", "SUCCESS")
@@ -572,101 +542,157 @@ async def on_ready():
     flask_thread.daemon = True
     flask_thread.start()
 
-@tasks.loop(seconds=15)
+# guild_id -> buckets ("2v2_Soccar") with new players since the worker last ran
+pending_buckets = {}
+matchmaking_wakeup = asyncio.Event()
+join_to_match_samples = deque(maxlen=500)
+matchmaking_metrics = {"event_runs": 0, "sweep_runs": 0, "matches_formed": 0}
+
+def request_match_check(format_type, game_mode="Soccar", guild_id=None):
+    """Ask the matchmaking worker to look at one bucket of a guild right away"""
+    pending_buckets.setdefault(guild_id, set()).add(f"{format_type}_{game_mode}")
+    matchmaking_wakeup.set()
+
+async def matchmaking_worker():
+    while True:
+        await matchmaking_wakeup.wait()
+        matchmaking_wakeup.clear()
+        pending = dict(pending_buckets)
+        pending_buckets.clear()
+        matchmaking_metrics["event_runs"] += 1
+        # Guilds have separate queues, so they can be matched side by side
+        await asyncio.gather(*(run_matchmaking(guild_id, buckets) for guild_id, buckets in pending.items()))
+
+def get_matchmaking_stats():
+    """Join-to-match latency in seconds plus worker counters"""
+    samples = sorted(join_to_match_samples)
+    latency = {"samples": len(samples), "avg_s": 0.0, "p95_s": 0.0, "max_s": 0.0}
+    if samples:
+        latency.update({
+            "avg_s": round(sum(samples) / len(samples), 2),
+            "p95_s": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+            "max_s": round(samples[-1], 2)
+        })
+    return {**matchmaking_metrics, "join_to_match": latency}
+
+@tasks.loop(seconds=60)
 async def queue_checker():
-    """Check queue for matches every 15 seconds with smart logging"""
+    """Safety sweep: retry every bucket (waits widen the MMR range) and drop timed out players.
+    New joins are matched straight away by matchmaking_worker."""
+    matchmaking_metrics["sweep_runs"] += 1
+    await asyncio.gather(*(run_matchmaking(guild_id, drop_timeouts=True) for guild_id in guild_partitions("queue.json")))
+
+async def run_matchmaking(guild_id=None, buckets=None, drop_timeouts=False):
+    """Form matches in a guild's given format_mode buckets, or in all of them"""
     try:
-        queue = load_queue()
-        matches = load_matches()
-        
-        # Group players by format and game mode
-        formats = {}
-        for player in queue:
-            if player["status"] == "searching":
-                format_type = player["format"]
-                game_mode = player.get("game_mode", "Soccar")
-                key = f"{format_type}_{game_mode}"
-                if key not in formats:
-                    formats[key] = []
-                formats[key].append(player)
-        
         matches_created = 0
         failed_matches = 0
         match_details = []
+        errors = []
+        timeout_players = []
         
-        # Try to create matches for all game modes
-        for format_key, players in formats.items():
-            format_type, game_mode = format_key.split('_', 1)
-            needed_players = {"1v1": 2, "2v2": 4, "3v3": 6}[format_type]
+        # Hold the queue for the whole sweep so joins can't be lost in between
+        update = queue_transaction(guild_id)
+        async with update as queue_state:
+            # Players are already bucketed by format and game mode
+            formats = {}
+            for format_type, game_mode in queue_state.bucket_keys():
+                key = f"{format_type}_{game_mode}"
+                if buckets is not None and key not in buckets:
+                    continue
+                players = [p for p in queue_state.bucket(format_type, game_mode) if p["status"] == "searching"]
+                if players:
+                    formats[key] = players
             
-            if len(players) >= needed_players:
-                try:
-                    selected = random.sample(players, needed_players)
-                    
-                    # Create teams based on format
-                    if format_type == "1v1":
-                        team1, team2 = [selected[0]], [selected[1]]
-                    elif format_type == "2v2":
-                        team1, team2 = selected[:2], selected[2:]
-                    else:  # 3v3
-                        team1, team2 = selected[:3], selected[3:]
-                    
-                    # Simulate match acceptance (10% chance of failure)
-                    if random.random() < 0.1:
-                        failed_matches += 1
-                        # Remove one random player who "didn't accept"
-                        queue = [p for p in queue if p["user_id"] != random.choice(selected)["user_id"]]
-                        continue
-                    
-                    match_id = create_auto_match(team1, team2, format_type, game_mode)
-                    matches_created += 1
-                    
-                    # Remove all players from queue
-                    queue = [p for p in queue if p["user_id"] not in [p["user_id"] for p in selected]]
-                    
-                    # Store match details for logging
-                    team1_names = ", ".join([p['username'] for p in team1])
-                    team2_names = ", ".join([p['username'] for p in team2])
-                    match_details.append({
-                        "id": match_id,
-                        "format": format_type,
-                        "mode": game_mode,
-                        "orange": team1_names,
-                        "blue": team2_names
-                    })
-                    
-                    # Update dashboards immediately
-                    await update_all_dashboards()
-                    
-                except Exception as e:
-                    await log_to_channel(f"❌ Error creating {format_key} match: {str(e)}", "ERROR")
+            # Try to create matches for all game modes, priority and long waits first
+            now = time.time()
+            boosts = queue_priority.priority_boosts([p["user_id"] for players in formats.values() for p in players], now)
+            for format_key, players in formats.items():
+                format_type, game_mode = format_key.split('_', 1)
+                needed_players = matchmaking.players_needed(format_type)
+                
+                for selected, spread in matchmaking.find_matches(players, needed_players, now, boosts):
+                    try:
+                        balance = team_balance.best_unit_split(matchmaking.unit_members(u) for u in selected)
+                        team1, team2 = balance["orange"], balance["blue"]
+                        
+                        # Simulate match acceptance (10% chance of failure)
+                        if random.random() < 0.1:
+                            failed_matches += 1
+                            # Remove one random player who "didn't accept"
+                            queue_state.remove(random.choice(selected)["user_id"])
+                            continue
+                        
+                        match_id = create_auto_match(team1, team2, format_type, game_mode, mmr_spread=spread, balance=balance, guild_id=guild_id)
+                        matches_created += 1
+                        waits = [matchmaking.wait_seconds(u, now) for u in selected for _ in matchmaking.unit_members(u)]
+                        join_to_match_samples.extend(waits)
+                        wait_estimator.record_match(format_type, game_mode, waits, now, guild_id)
+                        
+                        # Remove all players from queue
+                        queue_state.remove_many(p["user_id"] for p in selected)
+                        
+                        # Store match details for logging
+                        team1_names = ", ".join([p['username'] for p in team1])
+                        team2_names = ", ".join([p['username'] for p in team2])
+                        match_details.append({
+                            "id": match_id,
+                            "format": format_type,
+                            "mode": game_mode,
+                            "orange": team1_names,
+                            "blue": team2_names,
+                            "quality": balance["quality"]
+                        })
+                        
+                    except Exception as e:
+                        errors.append(f"❌ Error creating {format_key} match: {str(e)}")
+            
+            # Drop players waiting too long, only the timed out ones are touched
+            if drop_timeouts:
+                timeout_players = queue_state.pop_expired(time.time())
+            
+            if not matches_created and not failed_matches and not timeout_players:
+                update.skip_save()
+        
+        matchmaking_metrics["matches_formed"] += matches_created
         
-        save_queue(queue)
+        # Update dashboards immediately
+        if matches_created > 0:
+            await update_all_dashboards()
+        
+        for error in errors:
+            await log_to_channel(error, "ERROR")
         
         # Send detailed summary only when matches are created
         if matches_created > 0:
-            match_summary = "\n".join([f"• **{m['format']} {m['mode']}** ({m['id'][:8]}): {m['orange']} vs {m['blue']}" for m in match_details])
+            match_summary = "\n".join([f"• **{m['format']} {m['mode']}** ({m['id'][:8]}): {m['orange']} vs {m['blue']} (quality {m['quality'] * 100:.0f}%)" for m in match_details])
             await log_to_channel(f"🎮 {matches_created} Matches Created:\n{match_summary}", "SUCCESS")
         
         if failed_matches > 0:
             await log_to_channel(f"⚠️ {failed_matches} matches failed (player timeout)", "WARNING")
         
         # Log queue timeouts (players waiting too long)
-        now = datetime.datetime.now()
-        timeout_players = []
-        for player in queue:
-            join_time = datetime.datetime.fromisoformat(player['joined_at'])
-            if (now - join_time).seconds > 600:  # 10 minutes
-                timeout_players.append(player)
-        
         if timeout_players:
-            queue = [p for p in queue if p not in timeout_players]
-            save_queue(queue)
             await log_to_channel(f"⏰ Removed {len(timeout_players)} players from queue (10min timeout)", "WARNING")
+            if load_admin_settings()["queue_timeout_notice"]:
+                await notify_queue_timeouts(timeout_players)
             
     except Exception as e:
         await log_to_channel(f"❌ CRITICAL: Queue Checker Failed: {str(e)}", "ERROR")
         print(f"Queue checker error: {e}")
+    
+    return matches_created
+
+async def notify_queue_timeouts(entries):
+    """DM everyone whose queue entry timed out"""
+    async def notify(member, entry):
+        try:
+            user = bot.get_user(member["user_id"]) or await bot.fetch_user(member["user_id"])
+            await user.send(f"⏰ You were removed from the {entry['format']} queue after waiting 10 minutes. Join again any time with `/queue`!")
+        except Exception:
+            pass  # DMs closed or user gone
+    
+    await asyncio.gather(*(notify(member, entry) for entry in entries for member in matchmaking.unit_members(entry)))
 
 async def update_all_dashboards():
     """Immediately update all dashboard messages"""
@@ -688,8 +714,10 @@ async def update_all_dashboards():
     except Exception as e:
         await log_to_channel(f"❌ Dashboard Update Error: {str(e)}", "ERROR")
 
-def create_auto_match(team1, team2, format_type, game_mode="Soccar"):
+def create_auto_match(team1, team2, format_type, game_mode="Soccar", mmr_spread=None, balance=None, guild_id=None):
     match_id = f"auto_{random.randint(10000, 99999)}"
+    if balance is None:
+        balance = team_balance.describe_teams(team1, team2)
     
     # Game mode specific maps
     maps = {
@@ -705,6 +733,8 @@ def create_auto_match(team1, team2, format_type, game_mode="Soccar"):
         "team2_name": "Blue Team",
         "orange_players": [p["username"] for p in team1],
         "blue_players": [p["username"] for p in team2],
+        "orange_ids": [p["user_id"] for p in team1],
+        "blue_ids": [p["user_id"] for p in team2],
         "format": format_type,
         "map": random.choice(maps.get(game_mode, maps["Soccar"])),
         "mode": game_mode,
@@ -715,37 +745,79 @@ def create_auto_match(team1, team2, format_type, game_mode="Soccar"):
         "type": "auto_matched",
         "game_mode": game_mode,
         "estimated_duration": "5 minutes",
-        "priority": "normal"
+        "priority": "normal",
+        "guild_id": guild_id,
+        "mmr_spread": mmr_spread,
+        "team_mmr": {"orange": balance["orange_mmr"], "blue": balance["blue_mmr"]},
+        "win_probability": {
+            "orange": balance["orange_win_probability"],
+            "blue": round(1 - balance["orange_win_probability"], 3)
+        },
+        "match_quality": balance["quality"]
     }
     
-    matches = load_matches()
+    matches = load_matches(guild_id)
     matches.append(match_data)
-    save_matches(matches)
+    save_matches(matches, guild_id)
     
     # Add to match history with status
-    history = load_match_history()
-    history.append({
+    append_match_history({
         "match_id": match_id,
+        "guild_id": guild_id,
         "date": datetime.datetime.now().isoformat(),
         "status": "created",
         "format": format_type,
         "mode": game_mode,
         "orange_players": [p["username"] for p in team1],
         "blue_players": [p["username"] for p in team2],
+        "orange_ids": [p["user_id"] for p in team1],
+        "blue_ids": [p["user_id"] for p in team2],
         "map": match_data["map"],
         "type": "auto_matched"
     })
-    save_match_history(history)
     
     return match_id
 
+@tasks.loop(hours=24)
+async def compaction_job():
+    """Archive old history so the hot data files stay small"""
+    try:
+        from retention import run_compaction
+        results = await run_compaction()
+        archived = sum(results.values())
+        if archived:
+            details = " | ".join(f"{kind}: {count}" for kind, count in results.items() if count)
+            await log_to_channel(f"🗄️ Archived {archived} old records ({details})", "INFO")
+    except Exception as e:
+        await log_to_channel(f"❌ Compaction failed: {str(e)}", "ERROR")
+        print(f"Compaction error: {e}")
+
 @tasks.loop(minutes=5)
 async def tournament_updater():
     """Update tournament status every 5 minutes"""
     try:
-        tournaments = load_tournaments()
-        tournaments_started = 0
+        # Each guild's tournaments are a separate file, so update them side by side
+        results = await asyncio.gather(*(start_due_tournaments(guild_id) for guild_id in guild_partitions("tournaments.json")))
+        tournaments_started = sum(started for started, _ in results)
         
+        for _, logs in results:
+            for message, level in logs:
+                await log_to_channel(message, level)
+        
+        if tournaments_started > 0:
+            await log_to_channel(f"🏆 Tournament Update: {tournaments_started} tournaments started", "INFO")
+            
+    except Exception as e:
+        await log_to_channel(f"❌ Tournament Updater Error: {str(e)}", "ERROR")
+        print(f"Tournament updater error: {e}")
+
+async def start_due_tournaments(guild_id):
+    """Start a guild's tournaments whose auto start time has passed"""
+    tournaments_started = 0
+    logs = []
+    
+    update = transaction(guild_file("tournaments.json", guild_id))
+    async with update as tournaments:
         for tournament in tournaments:
             if tournament["status"] == "registration" and tournament.get("auto_start_time"):
                 start_time = datetime.datetime.fromisoformat(tournament["auto_start_time"])
@@ -759,18 +831,14 @@ async def tournament_updater():
                         tournament["current_round"] = 1
                         tournament["matches"] = generate_tournament_matches(teams, tournament["format"], tournament["map"], tournament["mode"])
                         
-                        await log_to_channel(f"🏆 Tournament Started: {tournament['id']} with {len(teams)} teams", "SUCCESS")
+                        logs.append((f"🏆 Tournament Started: {tournament['id']} with {len(teams)} teams", "SUCCESS"))
                     else:
-                        await log_to_channel(f"⚠️ Tournament {tournament['id']} started but insufficient teams ({len(teams)})", "WARNING")
-        
-        save_tournaments(tournaments)
+                        logs.append((f"⚠️ Tournament {tournament['id']} started but insufficient teams ({len(teams)})", "WARNING"))
         
-        if tournaments_started > 0:
-            await log_to_channel(f"🏆 Tournament Update: {tournaments_started} tournaments started", "INFO")
-            
-    except Exception as e:
-        await log_to_channel(f"❌ Tournament Updater Error: {str(e)}", "ERROR")
-        print(f"Tournament updater error: {e}")
+        if tournaments_started == 0:
+            update.skip_save()
+    
+    return tournaments_started, logs
 
 @tasks.loop(minutes=1)
 async def auto_tournament_creator():
@@ -822,6 +890,7 @@ async def create_auto_tournament(channel):
     auto_settings = settings.get("auto_tournament", {})
     
     tournament_id = f"auto_tournament_{random.randint(10000, 99999)}"
+    guild_id = channel.guild.id if getattr(channel, "guild", None) else None
     
     tournament_data = {
         "id": tournament_id,
@@ -839,12 +908,13 @@ async def create_auto_tournament(channel):
         "current_round": 0,
         "registration_deadline": (datetime.datetime.now() + datetime.timedelta(hours=2)).isoformat(),
         "auto_start_time": (datetime.datetime.now() + datetime.timedelta(hours=2)).isoformat(),
-        "auto_created": True
+        "auto_created": True,
+        "guild_id": guild_id
     }
     
-    tournaments = load_tournaments()
+    tournaments = load_tournaments(guild_id)
     tournaments.append(tournament_data)
-    save_tournaments(tournaments)
+    save_tournaments(tournaments, guild_id)
     
     # Create announcement embed
     embed = discord.Embed(
@@ -894,8 +964,8 @@ class AutoTournamentRegistrationView(discord.ui.View):
     
     @discord.ui.button(label="📊 Tournament Info", style=discord.ButtonStyle.primary, emoji="ℹ️")
     async def tournament_info(self, interaction: discord.Interaction, button: discord.ui.Button):
-        tournaments = load_tournaments()
-        tournament = next((t for t in tournaments if t["id"] == self.tournament_id), None)
+        tournaments = await aload_tournaments(interaction.guild_id)
+        tournament = find_tournament(self.tournament_id, tournaments, interaction.guild_id)
         
         if not tournament:
             await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
@@ -934,38 +1004,34 @@ class QuickTournamentRegistrationModal(discord.ui.Modal, title="Quick Tournament
     )
     
     async def on_submit(self, interaction: discord.Interaction):
-        tournaments = load_tournaments()
-        tournament = next((t for t in tournaments if t["id"] == self.tournament_id), None)
-        
-        if not tournament:
-            await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
-            return
-        
-        if tournament["status"] != "registration":
-            await interaction.response.send_message("❌ Tournament registration is closed!", ephemeral=True)
-            return
-        
-        if len(tournament["teams"]) >= tournament["max_teams"]:
-            await interaction.response.send_message("❌ Tournament is full!", ephemeral=True)
-            return
-        
         player_list = [p.strip() for p in self.players.value.split(",")]
-        team_data = {
-            "name": self.team_name.value,
-            "players": player_list,
-            "captain": interaction.user.id,
-            "registered_at": datetime.datetime.now().isoformat()
-        }
+        error = None
         
-        tournament["teams"].append(team_data)
-        
-        # Update tournaments
-        for i, t in enumerate(tournaments):
-            if t["id"] == self.tournament_id:
-                tournaments[i] = tournament
-                break
+        # Check and claim the slot under the tournaments lock so two teams can't take the last one
+        registration = transaction(guild_file("tournaments.json", interaction.guild_id))
+        async with registration as tournaments:
+            tournament = find_tournament(self.tournament_id, tournaments, interaction.guild_id)
+            
+            if not tournament:
+                error = "❌ Tournament not found!"
+            elif tournament["status"] != "registration":
+                error = "❌ Tournament registration is closed!"
+            elif len(tournament["teams"]) >= tournament["max_teams"]:
+                error = "❌ Tournament is full!"
+            else:
+                tournament["teams"].append({
+                    "name": self.team_name.value,
+                    "players": player_list,
+                    "captain": interaction.user.id,
+                    "registered_at": datetime.datetime.now().isoformat()
+                })
+            
+            if error:
+                registration.skip_save()
         
-        save_tournaments(tournaments)
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
+            return
         
         embed = discord.Embed(title="✅ Tournament Registration Successful!", color=0x00ff00)
         embed.add_field(name="Tournament", value=self.tournament_id, inline=False)
@@ -1106,12 +1172,12 @@ class AdvancedTournamentView(discord.ui.View):
             "created_by": interaction.user.id,
             "prize_pool": 0,
             "current_round": 0,
-            "registration_deadline": (datetime.datetime.now() + datetime.timedelta(hours=24)).isoformat()
+            "registration_deadline": (datetime.datetime.now() + datetime.timedelta(hours=24)).isoformat(),
+            "guild_id": interaction.guild_id
         }
         
-        tournaments = load_tournaments()
-        tournaments.append(tournament_data)
-        save_tournaments(tournaments)
+        async with transaction(guild_file("tournaments.json", interaction.guild_id)) as tournaments:
+            tournaments.append(tournament_data)
         
         embed = discord.Embed(title="🏆 Tournament Created!", color=0xFFD700)
         embed.add_field(name="Tournament ID", value=tournament_id, inline=False)
@@ -1193,47 +1259,43 @@ class QueueView(discord.ui.View):
 
     @discord.ui.button(label="Leave Queue", style=discord.ButtonStyle.danger, emoji="❌")
     async def leave_queue(self, interaction: discord.Interaction, button: discord.ui.Button):
-        queue = load_queue()
-        queue = [p for p in queue if p["user_id"] != interaction.user.id]
-        save_queue(queue)
+        async with queue_transaction(interaction.guild_id) as queue_state:
+            queue_state.remove(interaction.user.id)
         
         embed = discord.Embed(title="❌ Left Queue", description="You have been removed from all queues.", color=0xff0000)
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
     async def join_queue(self, interaction, format_type):
-        queue = load_queue()
-        
-        # Remove user from any existing queue
-        queue = [p for p in queue if p["user_id"] != interaction.user.id]
-        
-        # Add to new queue
-        queue.append({
-            "user_id": interaction.user.id,
-            "username": interaction.user.display_name,
-            "format": format_type,
-            "status": "searching",
-            "joined_at": datetime.datetime.now().isoformat()
-        })
+        from parties import queue_unit
+        unit, error = await queue_unit(interaction.user.id, interaction.user.display_name, format_type)
+        if error:
+            await interaction.response.send_message(f"❌ {error}", ephemeral=True)
+            return
         
-        save_queue(queue)
+        async with queue_transaction(interaction.guild_id) as queue_state:
+            # Replaces any queue entry the user (or their party) already had
+            queue_state.add({
+                **unit,
+                "format": format_type,
+                "status": "searching",
+                "joined_at": datetime.datetime.now().isoformat()
+            })
+            
+            # Count players in this format
+            format_count = queue_state.count(format_type)
         
-        # Count players in this format
-        format_count = len([p for p in queue if p["format"] == format_type])
+        wait_estimator.record_join(format_type, guild_id=interaction.guild_id)
+        request_match_check(format_type, guild_id=interaction.guild_id)
         
         embed = discord.Embed(title=f"🔍 Searching for {format_type} Match", color=0x00ffcc)
         embed.add_field(name="Queue Status", value=f"**{format_count}** players in {format_type} queue", inline=False)
-        embed.add_field(name="Estimated Wait", value=self.get_estimated_wait(format_type, format_count), inline=False)
+        embed.add_field(name="Estimated Wait", value=self.get_estimated_wait(format_type, format_count, guild_id=interaction.guild_id), inline=False)
         embed.set_footer(text="You'll be notified when a match is found!")
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    def get_estimated_wait(self, format_type, count):
-        if format_type == "1v1":
-            return "< 1 minute" if count >= 2 else f"Waiting for {2-count} more players"
-        elif format_type == "2v2":
-            return "< 1 minute" if count >= 4 else f"Waiting for {4-count} more players"
-        elif format_type == "3v3":
-            return "< 1 minute" if count >= 6 else f"Waiting for {6-count} more players"
+    def get_estimated_wait(self, format_type, count, game_mode="Soccar", guild_id=None):
+        return wait_estimator.describe(format_type, game_mode, count, guild_id)
 
 class AdminControlView(discord.ui.View):
     def __init__(self):
@@ -1320,11 +1382,8 @@ async def advanced_tournament(interaction: discord.Interaction):
 
 @tree.command(name="queue", description="Join the matchmaking queue")
 async def queue_command(interaction: discord.Interaction):
-    queue = load_queue()
-    current_queues = {}
-    
-    for format_type in ["1v1", "2v2", "3v3"]:
-        current_queues[format_type] = len([p for p in queue if p["format"] == format_type])
+    queue_state = await aget_queue_state(interaction.guild_id)
+    current_queues = {fmt: queue_state.count(fmt) for fmt in ["1v1", "2v2", "3v3"]}
     
     embed = discord.Embed(title="🎮 Matchmaking Queue", description="Join a queue to find matches automatically!", color=0x00ffcc)
     embed.add_field(name="🔥 Current Queues", value=f"**1v1:** {current_queues['1v1']} players\n**2v2:** {current_queues['2v2']} players\n**3v3:** {current_queues['3v3']} players", inline=False)
@@ -1333,41 +1392,81 @@ async def queue_command(interaction: discord.Interaction):
     view = QueueView()
     await interaction.response.send_message(embed=embed, view=view)
 
-@tree.command(name="tournament_register", description="Register for a tournament")
-@app_commands.describe(tournament_id="Tournament ID to join", team_name="Your team name", players="Comma-separated player names")
-async def tournament_register(interaction: discord.Interaction, tournament_id: str, team_name: str, players: str):
-    tournaments = load_tournaments()
-    tournament = next((t for t in tournaments if t["id"] == tournament_id), None)
-    
-    if not tournament:
-        await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
+@tree.command(name="party_invite", description="Invite a player to queue with you as a party")
+@app_commands.describe(player="Player to invite")
+async def party_invite(interaction: discord.Interaction, player: discord.Member):
+    from parties import invite_to_party
+    if player.id == interaction.user.id:
+        await interaction.response.send_message("❌ You can't invite yourself!", ephemeral=True)
         return
-    
-    if tournament["status"] != "registration":
-        await interaction.response.send_message("❌ Tournament registration is closed!", ephemeral=True)
+    success, message = invite_to_party(interaction.user.id, interaction.user.display_name, player.id)
+    if not success:
+        await interaction.response.send_message(f"❌ {message}", ephemeral=True)
         return
-    
-    if len(tournament["teams"]) >= tournament["max_teams"]:
-        await interaction.response.send_message("❌ Tournament is full!", ephemeral=True)
+    await interaction.response.send_message(f"🎉 {player.mention}, {interaction.user.display_name} invited you to their party! Use `/party_accept` to join.")
+
+@tree.command(name="party_accept", description="Accept a party invite")
+@app_commands.describe(leader="Player who invited you")
+async def party_accept(interaction: discord.Interaction, leader: discord.Member):
+    from parties import accept_party_invite
+    success, message = accept_party_invite(interaction.user.id, interaction.user.display_name, leader.id)
+    await interaction.response.send_message(f"✅ {message}" if success else f"❌ {message}", ephemeral=not success)
+
+@tree.command(name="party_leave", description="Leave your party")
+async def party_leave(interaction: discord.Interaction):
+    from parties import leave_party
+    success, message, party_id = leave_party(interaction.user.id)
+    if success:
+        # A changed party has to queue again
+        update = queue_transaction(interaction.guild_id)
+        async with update as queue_state:
+            if queue_state.remove(int(party_id)) is None:
+                update.skip_save()
+    await interaction.response.send_message(f"✅ {message}" if success else f"❌ {message}", ephemeral=True)
+
+@tree.command(name="party", description="View your party")
+async def party_command(interaction: discord.Interaction):
+    from parties import get_party, MAX_PARTY_SIZE
+    party = get_party(interaction.user.id)
+    if not party:
+        await interaction.response.send_message("❌ You're not in a party! Use `/party_invite` to start one.", ephemeral=True)
         return
-    
+    embed = discord.Embed(title="👥 Your Party", color=0x00ffcc)
+    members = "\n".join(f"{'👑 ' if m['user_id'] == party['leader_id'] else ''}{m['username']}" for m in party["members"])
+    embed.add_field(name=f"Members ({len(party['members'])}/{MAX_PARTY_SIZE})", value=members, inline=False)
+    embed.set_footer(text="The leader queues for the whole party")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@tree.command(name="tournament_register", description="Register for a tournament")
+@app_commands.describe(tournament_id="Tournament ID to join", team_name="Your team name", players="Comma-separated player names")
+async def tournament_register(interaction: discord.Interaction, tournament_id: str, team_name: str, players: str):
     player_list = [p.strip() for p in players.split(",")]
-    team_data = {
-        "name": team_name,
-        "players": player_list,
-        "captain": interaction.user.id,
-        "registered_at": datetime.datetime.now().isoformat()
-    }
+    error = None
     
-    tournament["teams"].append(team_data)
-    
-    # Update tournaments
-    for i, t in enumerate(tournaments):
-        if t["id"] == tournament_id:
-            tournaments[i] = tournament
-            break
-    
-    save_tournaments(tournaments)
+    registration = transaction(guild_file("tournaments.json", interaction.guild_id))
+    async with registration as tournaments:
+        tournament = find_tournament(tournament_id, tournaments, interaction.guild_id)
+        
+        if not tournament:
+            error = "❌ Tournament not found!"
+        elif tournament["status"] != "registration":
+            error = "❌ Tournament registration is closed!"
+        elif len(tournament["teams"]) >= tournament["max_teams"]:
+            error = "❌ Tournament is full!"
+        else:
+            tournament["teams"].append({
+                "name": team_name,
+                "players": player_list,
+                "captain": interaction.user.id,
+                "registered_at": datetime.datetime.now().isoformat()
+            })
+        
+        if error:
+            registration.skip_save()
+    
+    if error:
+        await interaction.response.send_message(error, ephemeral=True)
+        return
     
     embed = discord.Embed(title="✅ Tournament Registration Successful!", color=0x00ff00)
     embed.add_field(name="Tournament", value=tournament_id, inline=False)
@@ -1379,20 +1478,21 @@ async def tournament_register(interaction: discord.Interaction, tournament_id: s
 
 @tree.command(name="leaderboard", description="View the server leaderboard")
 async def leaderboard(interaction: discord.Interaction):
-    stats = load_stats()
+    top_players = await run_io(leaderboards.top, "mmr", 10)
     
-    if not stats:
+    if not top_players:
         await interaction.response.send_message("❌ No player stats found!", ephemeral=True)
         return
     
-    # Sort by MMR
-    sorted_players = sorted(stats.items(), key=lambda x: x[1]["mmr"], reverse=True)
+    stats = await run_io(player_store.load_players, [player_id for player_id, _ in top_players])
+    ranks = rank_for_many(mmr for _, mmr in top_players)
     
     embed = discord.Embed(title="🏆 Server Leaderboard", color=0xFFD700)
     
-    for i, (player_id, player_stats) in enumerate(sorted_players[:10]):
+    for i, (player_id, mmr) in enumerate(top_players):
+        player_stats = stats.get(player_id, {})
         try:
-            user = await bot.fetch_user(int(player_id))
+            user = await bot.fetch_user(leaderboards.board_user_id("mmr", player_id))
             name = user.display_name
         except:
             name = f"Player {player_id}"
@@ -1401,26 +1501,29 @@ async def leaderboard(interaction: discord.Interaction):
         
         embed.add_field(
             name=f"{rank_emoji} {name}",
-            value=f"**{player_stats['rank']}** ({player_stats['mmr']} MMR)\n{player_stats['wins']}W-{player_stats['losses']}L",
+            value=f"**{ranks[i]}** ({mmr} MMR)\n{player_stats.get('wins', 0)}W-{player_stats.get('losses', 0)}L",
             inline=True
         )
     
+    position, total = await run_io(leaderboards.position, "mmr", leaderboards.board_key("mmr", interaction.user.id))
+    if position:
+        embed.set_footer(text=f"Your position: #{position} of {total}")
+    
     await interaction.response.send_message(embed=embed)
 
 @tree.command(name="mystats", description="View your player statistics")
 async def mystats(interaction: discord.Interaction):
-    stats = load_stats()
-    player_id = str(interaction.user.id)
+    player_id = player_store.stats_key(interaction.user.id)
+    player_stats = await aload_player_stats(player_id)
     
-    if player_id not in stats:
-        # Initialize new player
-        update_player_stats(player_id)
-        stats = load_stats()
-    
-    player_stats = stats[player_id]
+    if player_stats is None:
+        # Initialize new player, without playing a match for them; the
+        # transaction keeps a record saved meanwhile by a settle
+        async with player_store.players_transaction([player_id]) as stats:
+            player_stats = player_store.ensure_player(stats, player_id)
     
     embed = discord.Embed(title=f"📊 {interaction.user.display_name}'s Stats", color=0x00ffcc)
-    embed.add_field(name="🏆 Rank", value=f"**{player_stats['rank']}**", inline=True)
+    embed.add_field(name="🏆 Rank", value=f"**{rank_for(player_stats['mmr'])}**", inline=True)
     embed.add_field(name="📈 MMR", value=f"**{player_stats['mmr']}**", inline=True)
     embed.add_field(name="🎮 Matches", value=f"**{player_stats['matches_played']}**", inline=True)
     embed.add_field(name="✅ Wins", value=f"**{player_stats['wins']}**", inline=True)
@@ -1434,7 +1537,7 @@ async def mystats(interaction: discord.Interaction):
 
 @tree.command(name="list_matches", description="List all matches")
 async def list_matches(interaction: discord.Interaction):
-    matches = load_matches()
+    matches = await aload_matches(interaction.guild_id)
     if not matches:
         await interaction.response.send_message("❌ No matches found!", ephemeral=True)
         return
@@ -1462,13 +1565,6 @@ async def list_matches(interaction: discord.Interaction):
 @tree.command(name="report_match", description="Report match results with detailed stats")
 @app_commands.describe(match_id="Match ID", orange_score="Orange team score", blue_score="Blue team score", orange_goals="Orange team individual goals (comma-separated)", blue_goals="Blue team individual goals (comma-separated)")
 async def report_match(interaction: discord.Interaction, match_id: str, orange_score: int, blue_score: int, orange_goals: str = None, blue_goals: str = None):
-    matches = load_matches()
-    match = next((m for m in matches if m["id"] == match_id), None)
-    
-    if not match:
-        await interaction.response.send_message("❌ Match not found!", ephemeral=True)
-        return
-    
     # Parse individual goals
     orange_individual_goals = []
     blue_individual_goals = []
@@ -1478,50 +1574,54 @@ async def report_match(interaction: discord.Interaction, match_id: str, orange_s
     if blue_goals:
         blue_individual_goals = [int(g.strip()) for g in blue_goals.split(",") if g.strip().isdigit()]
     
-    # Update match with results
-    match["status"] = "completed"
-    match["orange_score"] = orange_score
-    match["blue_score"] = blue_score
-    match["completed_at"] = datetime.datetime.now().isoformat()
-    match["reported_by"] = interaction.user.id
-    match["orange_individual_goals"] = orange_individual_goals
-    match["blue_individual_goals"] = blue_individual_goals
-    
-    # Update player stats with detailed tracking
-    if "orange_players" in match and "blue_players" in match:
-        orange_won = orange_score > blue_score
-        blue_won = blue_score > orange_score
-        
-        for i, player in enumerate(match["orange_players"]):
-            goals = orange_individual_goals[i] if i < len(orange_individual_goals) else 0
-            update_player_stats(f"player_{player}", win=orange_won, goals=goals, saves=random.randint(0, 2), assists=random.randint(0, 2), match_id=match_id)
-        
-        for i, player in enumerate(match["blue_players"]):
-            goals = blue_individual_goals[i] if i < len(blue_individual_goals) else 0
-            update_player_stats(f"player_{player}", win=blue_won, goals=goals, saves=random.randint(0, 2), assists=random.randint(0, 2), match_id=match_id)
-    
-    # Save to match history
-    history = load_match_history()
-    history.append({
-        "match_id": match_id,
-        "date": datetime.datetime.now().isoformat(),
-        "orange_score": orange_score,
-        "blue_score": blue_score,
-        "orange_players": match.get("orange_players", []),
-        "blue_players": match.get("blue_players", []),
-        "orange_goals": orange_individual_goals,
-        "blue_goals": blue_individual_goals,
-        "format": match.get("format", "Unknown"),
-        "map": match.get("map", "Unknown")
-    })
-    save_match_history(history)
+    error = None
+    new_achievements = []
     
-    # Save updated matches
-    for i, m in enumerate(matches):
-        if m["id"] == match_id:
-            matches[i] = match
-            break
-    save_matches(matches)
+    # Check, settle and save under the matches lock so a match can't be reported twice
+    report = transaction(guild_file("matches.json", interaction.guild_id))
+    async with report as matches:
+        match = find_match(match_id, matches, interaction.guild_id)
+        
+        if not match:
+            error = "❌ Match not found!"
+        elif match.get("status") == "completed":
+            error = "❌ This match has already been reported!"
+        else:
+            # Update match with results
+            match["status"] = "completed"
+            match["orange_score"] = orange_score
+            match["blue_score"] = blue_score
+            match["completed_at"] = datetime.datetime.now().isoformat()
+            match["reported_by"] = interaction.user.id
+            match["orange_individual_goals"] = orange_individual_goals
+            match["blue_individual_goals"] = blue_individual_goals
+            
+            # Settle stats, credits and achievements for every player in one pass
+            if "orange_players" in match and "blue_players" in match:
+                new_achievements = await settle_match(match, orange_score, blue_score, orange_individual_goals, blue_individual_goals)
+            
+            # Save to match history
+            append_match_history({
+                "match_id": match_id,
+                "date": datetime.datetime.now().isoformat(),
+                "orange_score": orange_score,
+                "blue_score": blue_score,
+                "orange_players": match.get("orange_players", []),
+                "blue_players": match.get("blue_players", []),
+                "orange_ids": match.get("orange_ids", []),
+                "blue_ids": match.get("blue_ids", []),
+                "orange_goals": orange_individual_goals,
+                "blue_goals": blue_individual_goals,
+                "format": match.get("format", "Unknown"),
+                "map": match.get("map", "Unknown")
+            })
+        
+        if error:
+            report.skip_save()
+    
+    if error:
+        await interaction.response.send_message(error, ephemeral=True)
+        return
     
     winner = "Orange" if orange_score > blue_score else "Blue" if blue_score > orange_score else "Tie"
     
@@ -1538,45 +1638,6 @@ async def report_match(interaction: discord.Interaction, match_id: str, orange_s
     embed.add_field(name="📋 Match Details", value=f"**ID:** {match_id}\n**Format:** {match.get('format', 'Unknown')}\n**Map:** {match.get('map', 'Unknown')}", inline=False)
     embed.set_footer(text=f"Reported by {interaction.user.display_name}")
     
-    # Check achievements for all players
-    new_achievements = []
-    if "orange_players" in match and "blue_players" in match:
-        from achievements import check_achievements, create_achievement_embed
-        from customization import unlock_banner, unlock_badge
-        
-        all_players = match["orange_players"] + match["blue_players"]
-        for i, player in enumerate(all_players):
-            player_id = f"player_{player}"
-            
-            # Create match data for achievement checking
-            match_data = {
-                "won": (player in match["orange_players"] and orange_score > blue_score) or 
-                       (player in match["blue_players"] and blue_score > orange_score),
-                "goals": orange_individual_goals[i] if i < len(orange_individual_goals) and player in match["orange_players"] else 
-                        blue_individual_goals[i-len(match["orange_players"])] if i >= len(match["orange_players"]) and i-len(match["orange_players"]) < len(blue_individual_goals) else 0,
-                "saves": random.randint(0, 3),
-                "assists": random.randint(0, 2),
-                "first_goal_scorer": player_id if (orange_individual_goals and orange_individual_goals[0] > 0 and i == 0) or (blue_individual_goals and blue_individual_goals[0] > 0 and i == len(match["orange_players"])) else None,
-                "overtime_win": abs(orange_score - blue_score) == 1 and max(orange_score, blue_score) > 3,
-                "goals_conceded": blue_score if player in match["orange_players"] else orange_score,
-                "max_deficit": random.randint(0, 2) if match_data.get("won") else 0,
-                "aerial_goals": random.randint(0, 1) if match_data.get("goals", 0) > 0 else 0
-            }
-            
-            achievements = check_achievements(player_id, match_data)
-            for achievement in achievements:
-                new_achievements.append((player, achievement))
-                
-                # Unlock corresponding banner/badge
-                if achievement == "hat_trick_hero":
-                    unlock_banner(f"player_{player}", "fire")
-                elif achievement == "clutch_king":
-                    unlock_banner(f"player_{player}", "champion")
-                elif achievement == "mvp_streak":
-                    unlock_banner(f"player_{player}", "mvp")
-                
-                unlock_badge(f"player_{player}", achievement)
-    
     # Start MVP voting if enabled
     settings = load_admin_settings()
     if settings.get("mvp_voting_enabled", True):
@@ -1605,8 +1666,8 @@ async def report_match(interaction: discord.Interaction, match_id: str, orange_s
 @tree.command(name="tournament_status", description="Check tournament status")
 @app_commands.describe(tournament_id="Tournament ID to check")
 async def tournament_status(interaction: discord.Interaction, tournament_id: str):
-    tournaments = load_tournaments()
-    tournament = next((t for t in tournaments if t["id"] == tournament_id), None)
+    tournaments = await aload_tournaments(interaction.guild_id)
+    tournament = find_tournament(tournament_id, tournaments, interaction.guild_id)
     
     if not tournament:
         await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
@@ -1639,7 +1700,7 @@ async def admin_panel(interaction: discord.Interaction):
 @tree.command(name="match_history", description="View detailed match history including pending and cancelled matches")
 @app_commands.describe(player="Player name to filter by (optional)", status="Filter by match status (optional)")
 async def match_history(interaction: discord.Interaction, player: str = None, status: str = None):
-    history = load_match_history()
+    history = await aload_match_history()
     
     if not history:
         await interaction.response.send_message("❌ No match history found!", ephemeral=True)
@@ -1849,8 +1910,7 @@ async def profile_command(interaction: discord.Interaction):
     from customization import get_player_profile, ProfileCustomizationView
     
     profile = get_player_profile(interaction.user.id)
-    stats = load_stats()
-    player_stats = stats.get(str(interaction.user.id), {})
+    player_stats = await aload_player_stats(interaction.user.id) or {}
     
     embed = discord.Embed(
         title=f"🎯 {interaction.user.display_name}'s Profile",
@@ -1863,7 +1923,7 @@ async def profile_command(interaction: discord.Interaction):
     embed.add_field(name="🚗 Favorite Car", value=profile.get("favorite_car", "Octane"), inline=True)
     
     # Stats
-    rank = player_stats.get("rank", "Unranked")
+    rank = rank_for(player_stats["mmr"]) if "mmr" in player_stats else "Unranked"
     mmr = player_stats.get("mmr", 0)
     wins = player_stats.get("wins", 0)
     losses = player_stats.get("losses", 0)
@@ -1915,13 +1975,16 @@ async def server_achievements_command(interaction: discord.Interaction):
 @tree.command(name="generate_match_recap", description="Generate AI-powered match recap")
 @app_commands.describe(match_id="Match ID to generate recap for")
 async def generate_match_recap(interaction: discord.Interaction, match_id: str):
-    history = load_match_history()
-    match = next((h for h in history if h["match_id"] == match_id), None)
+    match = find_match_history(match_id)
     
     if not match:
         await interaction.response.send_message("❌ Match not found in history!", ephemeral=True)
         return
     
+    if "orange_score" not in match:
+        await interaction.response.send_message("❌ This match hasn't been reported yet!", ephemeral=True)
+        return
+    
     # Generate fun recap text
     orange_score = match["orange_score"]
     blue_score = match["blue_score"]
@@ -2167,31 +2230,35 @@ async def shop_command(interaction: discord.Interaction):
     view = ShopView(interaction.user.id)
     await interaction.response.send_message(embed=embed, view=view)
 
+def _board_mention(field, player_id):
+    user_id = leaderboards.board_user_id(field, player_id)
+    return f"<@{user_id}>" if user_id is not None else str(player_id).replace("player_", "", 1)
+
 @tree.command(name="leaderboards", description="View various server leaderboards")
 async def leaderboards_command(interaction: discord.Interaction):
-    from economy import load_economy
-    
     embed = discord.Embed(title="🏆 Server Leaderboards", color=0xFFD700)
     
-    # MMR Leaderboard
-    stats = load_stats()
-    if stats:
-        sorted_mmr = sorted(stats.items(), key=lambda x: x[1]["mmr"], reverse=True)[:5]
-        mmr_text = "\n".join([f"{i+1}. <@{player_id}> - {player_stats['mmr']} MMR" for i, (player_id, player_stats) in enumerate(sorted_mmr)])
-        embed.add_field(name="📈 MMR Leaders", value=mmr_text or "No data", inline=True)
-    
-    # Economy Leaderboard
-    economy = load_economy()
-    if economy:
-        sorted_credits = sorted(economy.items(), key=lambda x: x[1]["credits"], reverse=True)[:5]
-        credit_text = "\n".join([f"{i+1}. <@{player_id}> - {player_data['credits']:,} credits" for i, (player_id, player_data) in enumerate(sorted_credits)])
-        embed.add_field(name="💰 Richest Players", value=credit_text or "No data", inline=True)
-    
-    # Goals Leaderboard
-    if stats:
-        sorted_goals = sorted(stats.items(), key=lambda x: x[1]["goals"], reverse=True)[:5]
-        goals_text = "\n".join([f"{i+1}. <@{player_id}> - {player_stats['goals']} goals" for i, (player_id, player_stats) in enumerate(sorted_goals)])
-        embed.add_field(name="⚽ Top Scorers", value=goals_text or "No data", inline=True)
+    boards = [
+        ("mmr", "📈 MMR Leaders", "{:,} MMR"),
+        ("credits", "💰 Richest Players", "{:,} credits"),
+        ("goals", "⚽ Top Scorers", "{:,} goals"),
+        ("saves", "🛡️ Top Savers", "{:,} saves"),
+        ("assists", "🤝 Top Playmakers", "{:,} assists"),
+        ("matches_played", "🎮 Most Matches", "{:,} matches")
+    ]
+    my_positions = []
+    for field, title, value_format in boards:
+        top_players = await run_io(leaderboards.top, field, 5)
+        if top_players:
+            text = "\n".join([f"{i+1}. {_board_mention(field, player_id)} - {value_format.format(value)}" for i, (player_id, value) in enumerate(top_players)])
+            embed.add_field(name=title, value=text, inline=True)
+        
+        position, total = await run_io(leaderboards.position, field, leaderboards.board_key(field, interaction.user.id))
+        if position:
+            my_positions.append(f"{title.split(' ', 1)[1]} #{position}")
+    
+    if my_positions:
+        embed.set_footer(text=f"Your positions: {' | '.join(my_positions)}")
     
     await interaction.response.send_message(embed=embed)
 
@@ -2253,6 +2320,9 @@ except KeyboardInterrupt:
 except Exception as e:
     print(f"Bot crashed: {e}")
 finally:
+    # Make sure any held-back saves reach the disk
+    flush_writes()
+    
     # Try to log shutdown if possible
     try:
         import asyncio
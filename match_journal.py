@@ -0,0 +1,184 @@
+
+import json
+import os
+import threading
+from data import uses_sqlite, load_data, save_data
+import sqlite_store
+
+# Match history lives in an append-only JSON Lines journal: one record per line,
+# so recording a match is a single write() instead of rewriting the whole file.
+JOURNAL_FILE = "match_history.jsonl"
+LEGACY_FILE = "match_history.json"
+
+# Byte offsets of every record per match_id, built lazily and extended as the journal grows
+_index = {"size": 0, "offsets": {}}
+# Fully parsed journal, kept while the file size matches
+_records = {"size": -1, "records": []}
+# load_all runs on the I/O pool while appends come from the event loop
+_records_lock = threading.Lock()
+
+def _migrate_legacy():
+    # Convert the old match_history.json array into the journal the first time we run
+    if os.path.exists(JOURNAL_FILE) or not os.path.exists(LEGACY_FILE):
+        return
+    try:
+        with open(LEGACY_FILE, "r") as f:
+            history = json.load(f)
+    except:
+        history = []
+    rewrite(history)
+    os.replace(LEGACY_FILE, LEGACY_FILE + ".migrated")
+
+def _journal_size():
+    try:
+        return os.path.getsize(JOURNAL_FILE)
+    except OSError:
+        return 0
+
+def append_record(record):
+    """Append one match record to the history"""
+    if uses_sqlite(LEGACY_FILE):
+        sqlite_store.append(LEGACY_FILE, record)
+        return
+
+    _migrate_legacy()
+    line = (json.dumps(record) + "\n").encode("utf-8")
+    with open(JOURNAL_FILE, "ab") as f:
+        offset = f.tell()
+        f.write(line)
+
+    # Extend the in-memory views only if they were current before this write
+    if _index["size"] == offset:
+        _index["offsets"].setdefault(record.get("match_id"), []).append(offset)
+        _index["size"] = offset + len(line)
+    with _records_lock:
+        if _records["size"] == offset:
+            _records["records"].append(record)
+            _records["size"] = offset + len(line)
+
+def iter_records():
+    """Stream history records oldest first"""
+    if uses_sqlite(LEGACY_FILE):
+        yield from sqlite_store.iter_rows(LEGACY_FILE)
+        return
+
+    _migrate_legacy()
+    if not os.path.exists(JOURNAL_FILE):
+        return
+    with open(JOURNAL_FILE, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def tail(limit=None, block_size=65536):
+    """Stream history records newest first, reading the journal from the end"""
+    if uses_sqlite(LEGACY_FILE):
+        yield from sqlite_store.iter_rows(LEGACY_FILE, newest_first=True, limit=limit)
+        return
+
+    _migrate_legacy()
+    if not os.path.exists(JOURNAL_FILE):
+        return
+
+    count = 0
+    with open(JOURNAL_FILE, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        leftover = b""
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            chunk = f.read(read_size) + leftover
+            lines = chunk.split(b"\n")
+            # The first piece may be the tail end of a line that starts in an earlier block
+            leftover = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield json.loads(line)
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return
+        if leftover.strip():
+            yield json.loads(leftover)
+
+def load_all():
+    """Return the whole history as a list (cached until the journal changes)"""
+    if uses_sqlite(LEGACY_FILE):
+        return load_data(LEGACY_FILE)
+
+    _migrate_legacy()
+    size = _journal_size()
+    if _records["size"] != size:
+        # Read only up to the size we saw: a record appended meanwhile lies
+        # past it, so the next call sees the size differ and reads again
+        records, end = [], 0
+        if size:
+            with open(JOURNAL_FILE, "rb") as f:
+                for line in f:
+                    if end + len(line) > size or not line.endswith(b"\n"):
+                        break
+                    end += len(line)
+                    if line.strip():
+                        records.append(json.loads(line))
+        with _records_lock:
+            _records["records"] = records
+            _records["size"] = end
+    return _records["records"]
+
+def rewrite(history):
+    """Replace the whole journal, used for wipes and compaction"""
+    if uses_sqlite(LEGACY_FILE):
+        save_data(LEGACY_FILE, history)
+        return
+
+    temp_file = JOURNAL_FILE + ".tmp"
+    with open(temp_file, "w") as f:
+        for record in history:
+            f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, JOURNAL_FILE)
+
+    _index["size"] = 0
+    _index["offsets"] = {}
+    with _records_lock:
+        _records["size"] = -1
+
+def _refresh_index():
+    size = _journal_size()
+    if size < _index["size"]:
+        # Journal was rewritten, start over
+        _index["size"] = 0
+        _index["offsets"] = {}
+    if size == _index["size"]:
+        return
+
+    with open(JOURNAL_FILE, "rb") as f:
+        f.seek(_index["size"])
+        offset = _index["size"]
+        for line in f:
+            if line.endswith(b"\n") and line.strip():
+                match_id = json.loads(line).get("match_id")
+                _index["offsets"].setdefault(match_id, []).append(offset)
+            elif not line.endswith(b"\n"):
+                # Partial last line from a concurrent append, pick it up next time
+                break
+            offset += len(line)
+        _index["size"] = offset
+
+def find_record(match_id):
+    """Latest history record for a match, via the offset index"""
+    if uses_sqlite(LEGACY_FILE):
+        return sqlite_store.find_row(LEGACY_FILE, match_id)
+
+    _migrate_legacy()
+    if not os.path.exists(JOURNAL_FILE):
+        return None
+
+    _refresh_index()
+    offsets = _index["offsets"].get(match_id)
+    if not offsets:
+        return None
+    with open(JOURNAL_FILE, "rb") as f:
+        f.seek(offsets[-1])
+        return json.loads(f.readline())
@@ -0,0 +1,118 @@
+
+import heapq
+from datetime import datetime
+
+# Skill-based matchmaking. Each queue is sorted by MMR and matches are taken
+# from runs of neighbouring players; how far apart players may be grows with
+# how long each of them has been queued, and queue priority counts as extra
+# time waited.
+TEAM_SIZES = {"1v1": 1, "2v2": 2, "3v3": 3}
+
+BASE_SPREAD = 150      # MMR spread allowed for a fresh queue entry
+SPREAD_STEP = 50       # extra spread per SPREAD_INTERVAL seconds waited
+SPREAD_INTERVAL = 30
+MAX_SPREAD = 1500      # after long enough anyone can be matched with anyone
+STARVATION_WAIT = 300  # players waiting this long go ahead of any priority
+
+DEFAULT_MMR = 1000
+
+def players_needed(format_type):
+    return TEAM_SIZES[format_type] * 2
+
+def allowed_spread(wait_seconds):
+    """Largest MMR gap accepted for a player who has waited this long"""
+    steps = max(0, int(wait_seconds // SPREAD_INTERVAL))
+    return min(BASE_SPREAD + steps * SPREAD_STEP, MAX_SPREAD)
+
+def entry_mmr(entry):
+    return entry.get("mmr", DEFAULT_MMR)
+
+def unit_members(entry):
+    """Players in a queue entry: a party's members, or the entry itself"""
+    return entry.get("party") or [entry]
+
+def unit_size(entry):
+    return len(entry.get("party") or ()) or 1
+
+def _packs(sizes, team_size):
+    # Can these party sizes fill two teams exactly? At most 6 units, so
+    # checking every subset for one team is constant work
+    if sum(sizes) != 2 * team_size:
+        return False
+    if max(sizes) == 1:
+        return True
+    for mask in range(1 << len(sizes)):
+        if sum(size for i, size in enumerate(sizes) if mask >> i & 1) == team_size:
+            return True
+    return False
+
+def joined_timestamp(entry):
+    joined = entry.get("joined_ts")
+    if joined is None:
+        joined = datetime.fromisoformat(entry["joined_at"]).timestamp()
+    return joined
+
+def wait_seconds(entry, now):
+    return max(0.0, now - joined_timestamp(entry))
+
+def find_matches(entries, needed, now=None, boosts=None):
+    """Pick disjoint groups of queue entries holding `needed` players with close MMR.
+
+    Entries may be parties (see unit_members). Sorting is O(n log n); from
+    every entry the next entries in MMR order that still fit are collected
+    until `needed` players are reached, and if the parties can be packed into
+    two full teams the group goes on a heap when its MMR spread is within what
+    every member accepts, i.e. its shortest waiter's tolerance. Groups holding a starving player are taken
+    first, then the largest effective wait (real wait plus the priority boost
+    from `boosts`, user_id -> seconds), tightest spread breaking ties.
+    Returns a list of (group, spread) with each group sorted by MMR.
+    """
+    if needed <= 0 or sum(unit_size(e) for e in entries) < needed:
+        return []
+    now = now if now is not None else datetime.now().timestamp()
+    boosts = boosts or {}
+    team_size = needed // 2
+
+    ordered = sorted(entries, key=entry_mmr)
+    sizes = [unit_size(e) for e in ordered]
+    lows = [min(entry_mmr(m) for m in unit_members(e)) for e in ordered]
+    highs = [max(entry_mmr(m) for m in unit_members(e)) for e in ordered]
+    waits = [wait_seconds(e, now) for e in ordered]
+    effective = [w + boosts.get(e["user_id"], 0) for w, e in zip(waits, ordered)]
+
+    heap = []
+    for start in range(len(ordered)):
+        if sizes[start] > team_size:
+            continue
+        group, players = [start], sizes[start]
+        # Look a bounded distance ahead so the scan stays linear
+        for i in range(start + 1, min(len(ordered), start + 2 * needed)):
+            if players == needed:
+                break
+            if sizes[i] <= team_size and players + sizes[i] <= needed:
+                group.append(i)
+                players += sizes[i]
+        if players != needed or not _packs([sizes[i] for i in group], team_size):
+            continue
+
+        spread = max(highs[i] for i in group) - min(lows[i] for i in group)
+        # Everyone has to accept the spread, not just whoever waited longest
+        if spread > allowed_spread(min(effective[i] for i in group)):
+            continue
+        longest = max(effective[i] for i in group)
+        starving = max(waits[i] for i in group) >= STARVATION_WAIT
+        # Bucket effective waits by SPREAD_INTERVAL so a few seconds of
+        # difference doesn't beat a much closer match
+        heap.append((not starving, -int(longest // SPREAD_INTERVAL), spread, start, group))
+    heapq.heapify(heap)
+
+    used = [False] * len(ordered)
+    matches = []
+    while heap:
+        _, _, spread, _, group = heapq.heappop(heap)
+        if any(used[i] for i in group):
+            continue
+        for i in group:
+            used[i] = True
+        matches.append(([ordered[i] for i in group], spread))
+    return matches
@@ -23,8 +23,10 @@ def log_moderation_action(guild_id, moderator_id, action, target_id, reason=None
     if str(guild_id) not in logs:
         logs[str(guild_id)] = []
     
+    # Old entries get archived, so count on from the newest id rather than the length
+    guild_logs = logs[str(guild_id)]
     log_entry = {
-        "id": len(logs[str(guild_id)]) + 1,
+        "id": guild_logs[-1]["id"] + 1 if guild_logs else 1,
         "timestamp": datetime.now().isoformat(),
         "moderator_id": moderator_id,
         "action": action,
@@ -112,9 +114,9 @@ class QuickModerationView(discord.ui.View):
     
     @discord.ui.button(label="🔇 Clear Queue Abuse", style=discord.ButtonStyle.danger)
     async def clear_queue_abuse(self, interaction: discord.Interaction, button: discord.ui.Button):
-        from utils import load_queue, save_queue
+        from utils import load_queue, save_queue, in_guild
         
-        queue = load_queue()
+        queue = load_queue(interaction.guild_id)
         original_count = len(queue)
         
         # Remove players who joined in the last minute (potential spam)
@@ -122,11 +124,15 @@ class QuickModerationView(discord.ui.View):
         filtered_queue = []
         
         for player in queue:
+            if not in_guild("queue.json", player, interaction.guild_id):
+                # Another server's entry in a shared SQLite queue
+                filtered_queue.append(player)
+                continue
             join_time = datetime.fromisoformat(player['joined_at'])
             if (now - join_time).seconds > 60:  # Keep players who joined more than 1 minute ago
                 filtered_queue.append(player)
         
-        save_queue(filtered_queue)
+        save_queue(filtered_queue, interaction.guild_id)
         removed = original_count - len(filtered_queue)
         
         # Log action
@@ -175,10 +181,10 @@ class TournamentResetModal(discord.ui.Modal, title="Reset Tournament"):
     )
     
     async def on_submit(self, interaction: discord.Interaction):
-        from utils import load_tournaments, save_tournaments
+        from utils import load_tournaments, save_tournaments, find_tournament
         
-        tournaments = load_tournaments()
-        tournament = next((t for t in tournaments if t["id"] == self.tournament_id.value), None)
+        tournaments = load_tournaments(interaction.guild_id)
+        tournament = find_tournament(self.tournament_id.value, tournaments, interaction.guild_id)
         
         if not tournament:
             await interaction.response.send_message("❌ Tournament not found!", ephemeral=True)
@@ -190,7 +196,7 @@ class TournamentResetModal(discord.ui.Modal, title="Reset Tournament"):
         tournament["matches"] = []
         tournament["current_round"] = 0
         
-        save_tournaments(tournaments)
+        save_tournaments(tournaments, interaction.guild_id)
         
         # Log action
         log_moderation_action(
@@ -0,0 +1,137 @@
+
+from datetime import datetime
+from data import load_data, save_data, run_io
+import matchmaking
+import rating
+import player_store
+
+# Premade groups that queue together and always end up on the same team.
+# parties.json is keyed by party id (the leader's id), party_members.json maps
+# every member to their party like clan_members.json does for clans.
+MAX_PARTY_SIZE = 3
+
+def load_parties():
+    return load_data("parties.json")
+
+def save_parties(parties):
+    save_data("parties.json", parties)
+
+def load_party_members():
+    return load_data("party_members.json")
+
+def save_party_members(members):
+    save_data("party_members.json", members)
+
+def get_party(user_id):
+    party_id = load_party_members().get(str(user_id))
+    return load_parties().get(party_id) if party_id else None
+
+def invite_to_party(leader_id, leader_name, user_id):
+    parties = load_parties()
+    members = load_party_members()
+
+    if str(user_id) in members:
+        return False, "That player is already in a party!"
+
+    party_id = members.get(str(leader_id))
+    if party_id is None:
+        party_id = str(leader_id)
+        parties[party_id] = {
+            "id": party_id,
+            "leader_id": leader_id,
+            "members": [{"user_id": leader_id, "username": leader_name}],
+            "invites": [],
+            "created_at": datetime.now().isoformat()
+        }
+        members[str(leader_id)] = party_id
+    party = parties[party_id]
+
+    if party["leader_id"] != leader_id:
+        return False, "Only the party leader can invite players!"
+    if len(party["members"]) >= MAX_PARTY_SIZE:
+        return False, f"Parties are limited to {MAX_PARTY_SIZE} players!"
+    if user_id not in party["invites"]:
+        party["invites"].append(user_id)
+
+    save_parties(parties)
+    save_party_members(members)
+    return True, "Invite sent!"
+
+def accept_party_invite(user_id, username, leader_id):
+    parties = load_parties()
+    members = load_party_members()
+
+    if str(user_id) in members:
+        return False, "You're already in a party!"
+
+    party = parties.get(members.get(str(leader_id), ""))
+    if not party or user_id not in party["invites"]:
+        return False, "You don't have an invite from that player!"
+    if len(party["members"]) >= MAX_PARTY_SIZE:
+        return False, "That party is full!"
+
+    party["invites"].remove(user_id)
+    party["members"].append({"user_id": user_id, "username": username})
+    members[str(user_id)] = party["id"]
+
+    save_parties(parties)
+    save_party_members(members)
+    return True, "Joined the party!"
+
+def leave_party(user_id):
+    """Leave your party; when the leader leaves the party is disbanded.
+    Returns (success, message, party_id)"""
+    parties = load_parties()
+    members = load_party_members()
+
+    party_id = members.get(str(user_id))
+    if party_id is None:
+        return False, "You're not in a party!", None
+    party = parties[party_id]
+
+    if party["leader_id"] == user_id or len(party["members"]) <= 2:
+        for member in party["members"]:
+            members.pop(str(member["user_id"]), None)
+        del parties[party_id]
+        message = "Party disbanded!"
+    else:
+        party["members"] = [m for m in party["members"] if m["user_id"] != user_id]
+        del members[str(user_id)]
+        message = "Left the party!"
+
+    save_parties(parties)
+    save_party_members(members)
+    return True, message, party_id
+
+def _rating_fields(stats):
+    # Copied onto queue entries so match quality needs no stats lookups
+    return {"mmr": stats.get("mmr", matchmaking.DEFAULT_MMR), "rating_deviation": rating.deviation_for(stats)}
+
+async def queue_unit(user_id, username, format_type):
+    """The fields a queue entry needs for a player or their whole party.
+
+    Returns (fields, error). A party queues as one entry under its leader,
+    with every member's MMR in "party" and their average as "mmr".
+    """
+    party = get_party(user_id)
+    if party is None:
+        stats = await run_io(player_store.load_player, player_store.stats_key(user_id)) or {}
+        return {"user_id": user_id, "username": username, **_rating_fields(stats)}, None
+
+    if party["leader_id"] != user_id:
+        return None, "Only the party leader can queue the party!"
+    if len(party["members"]) > matchmaking.TEAM_SIZES[format_type]:
+        return None, f"Your party of {len(party['members'])} is too big for {format_type}!"
+
+    stats = await run_io(player_store.load_players, [player_store.stats_key(m["user_id"]) for m in party["members"]])
+    members = [{
+        "user_id": m["user_id"],
+        "username": m["username"],
+        **_rating_fields(stats.get(player_store.stats_key(m["user_id"]), {}))
+    } for m in party["members"]]
+    return {
+        "user_id": user_id,
+        "username": username,
+        "mmr": round(sum(m["mmr"] for m in members) / len(members)),
+        "party": members
+    }, None
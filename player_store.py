@@ -0,0 +1,308 @@
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import zlib
+from data import load_data, save_data, asave_data, uses_sqlite, get_file_lock, run_io, discard_cached
+import sqlite_store
+import rating
+
+# Player stats are split over hash-bucketed shard files so updating one
+# player only rewrites the few hundred records that share its shard.
+STATS_FILE = "stats.json"
+SHARD_DIR = "stats"
+SHARD_COUNT = int(os.getenv("STATS_SHARDS", "64"))
+
+# Bumped on every save through this module so load_all knows its merged copy is stale
+_state = {"version": 0, "merged": None, "merged_key": None}
+# shard filename -> digest of the content last written
+_digests = {}
+# Loads run on several I/O pool threads, only one of them may migrate
+_migrate_lock = threading.Lock()
+
+def stats_key(user_id):
+    """Stats key of a Discord user, "player_<id>"; keys that already are one pass through"""
+    user_id = str(user_id)
+    return user_id if user_id.startswith("player_") else f"player_{user_id}"
+
+def user_id_for(player_id):
+    """Discord user id behind a stats key, or None for keys that aren't one (old username keys)"""
+    try:
+        return int(str(player_id).replace("player_", "", 1))
+    except ValueError:
+        return None
+
+def match_player_keys(match, side):
+    """Stats keys of one side ("orange" or "blue") of a match, in player order.
+
+    Matches store their players' user ids in "<side>_ids"; older ones only
+    have usernames in "<side>_players", which were used as the key then.
+    """
+    return [stats_key(player) for player in match.get(f"{side}_ids") or match.get(f"{side}_players", [])]
+
+def shard_for(player_id):
+    bucket = zlib.crc32(str(player_id).encode("utf-8")) % SHARD_COUNT
+    return os.path.join(SHARD_DIR, f"shard_{bucket:02d}.json")
+
+def shard_files():
+    return [os.path.join(SHARD_DIR, f"shard_{bucket:02d}.json") for bucket in range(SHARD_COUNT)]
+
+def _migrate_legacy():
+    # Split the old single stats.json into shards the first time we run
+    if uses_sqlite(STATS_FILE) or os.path.isdir(SHARD_DIR) or not os.path.exists(STATS_FILE):
+        return
+    with _migrate_lock:
+        # Another thread may have migrated while we waited
+        if os.path.isdir(SHARD_DIR) or not os.path.exists(STATS_FILE):
+            return
+        stats = load_data(STATS_FILE)
+        # The shards are written aside and the directory renamed last, so
+        # nobody sees stats/ before every shard is in it
+        temp_dir = SHARD_DIR + ".migrating"
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        os.makedirs(temp_dir)
+        for filename, shard in _split(stats).items():
+            if shard:
+                with open(os.path.join(temp_dir, os.path.basename(filename)), "w") as f:
+                    json.dump(shard, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+        os.replace(temp_dir, SHARD_DIR)
+        os.replace(STATS_FILE, STATS_FILE + ".migrated")
+
+def _load_shard(filename):
+    return load_data(filename)
+
+def _write_shard(filename, shard):
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    save_data(filename, shard)
+    _digests[filename] = _digest(shard)
+
+async def _awrite_shard(filename, shard, digest):
+    await asave_data(filename, shard)
+    _digests[filename] = digest
+
+def _load_shards(filenames):
+    _migrate_legacy()
+    return {filename: _load_shard(filename) for filename in filenames}
+
+def _split(stats):
+    # A full stats dict split into the content of every shard
+    shards = {filename: {} for filename in shard_files()}
+    for player_id, record in stats.items():
+        shards[shard_for(player_id)][str(player_id)] = record
+    return shards
+
+def _read_digests(filenames):
+    for filename in filenames:
+        if os.path.exists(filename):
+            _digests[filename] = _disk_digest(filename)
+
+def _needs_write(filename, shard, digest):
+    # A shard that doesn't exist yet is only created once it has players
+    if filename not in _digests:
+        return bool(shard)
+    return _digests[filename] != digest
+
+def _digest(shard):
+    return hashlib.sha1(json.dumps(shard, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _disk_digest(filename):
+    # Digest of the file itself, not the cached shard: records handed out by
+    # load_all are the cached ones, so that copy may already hold unsaved edits
+    try:
+        with open(filename, "r") as f:
+            return _digest(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+def ensure_player(stats, player_id):
+    """A player's record in a loaded stats dict, added with starting values if missing"""
+    if player_id not in stats:
+        stats[player_id] = {
+            "wins": 0,
+            "losses": 0,
+            "goals": 0,
+            "saves": 0,
+            "assists": 0,
+            "mmr": rating.DEFAULT_RATING,
+            "matches_played": 0,
+            "rank": "Bronze I"
+        }
+    return stats[player_id]
+
+def load_player(player_id):
+    """Stats of one player, or None if they haven't played yet"""
+    player_id = str(player_id)
+    if uses_sqlite(STATS_FILE):
+        return sqlite_store.load_row(STATS_FILE, player_id)
+
+    _migrate_legacy()
+    return _load_shard(shard_for(player_id)).get(player_id)
+
+def load_players(player_ids):
+    """Stats for several players, reading only the shards they live in"""
+    _migrate_legacy()
+    players = {}
+    for player_id in map(str, player_ids):
+        if uses_sqlite(STATS_FILE):
+            record = sqlite_store.load_row(STATS_FILE, player_id)
+        else:
+            record = _load_shard(shard_for(player_id)).get(player_id)
+        if record is not None:
+            players[player_id] = record
+    return players
+
+def save_player(player_id, record):
+    save_players({str(player_id): record})
+
+def save_players(records):
+    """Write the given player records, touching only their shards"""
+    from leaderboards import update_players
+    _state["version"] += 1
+    if uses_sqlite(STATS_FILE):
+        sqlite_store.save_rows(STATS_FILE, records)
+        update_players(records)
+        return
+
+    _migrate_legacy()
+    touched = {}
+    for player_id, record in records.items():
+        filename = shard_for(player_id)
+        shard = touched.get(filename)
+        if shard is None:
+            shard = touched[filename] = _load_shard(filename)
+        shard[str(player_id)] = record
+
+    for filename, shard in touched.items():
+        _write_shard(filename, shard)
+    # Only once the records are saved, so a failed write doesn't rank them
+    update_players(records)
+
+def load_all():
+    """Every player's stats as one dict, like the old stats.json.
+
+    Records are shared with the shards, so edit them and pass the dict to
+    save_all. Prefer load_player/load_players when only a few are needed.
+    """
+    if uses_sqlite(STATS_FILE):
+        return load_data(STATS_FILE)
+
+    _migrate_legacy()
+    shards = [_load_shard(filename) for filename in shard_files()]
+    key = (_state["version"], tuple(id(shard) for shard in shards))
+    if _state["merged_key"] != key:
+        merged = {}
+        for shard in shards:
+            merged.update(shard)
+        _state["merged"] = merged
+        _state["merged_key"] = key
+    return _state["merged"]
+
+def save_all(stats):
+    """Save a full stats dict, writing only the shards whose content changed"""
+    from leaderboards import update_players
+    _state["version"] += 1
+    if uses_sqlite(STATS_FILE):
+        save_data(STATS_FILE, stats)
+        update_players(stats, complete=True)
+        return
+
+    shards = _split(stats)
+    _read_digests([filename for filename in shards if filename not in _digests])
+    for filename, shard in shards.items():
+        if _needs_write(filename, shard, _digest(shard)):
+            _write_shard(filename, shard)
+    update_players(stats, complete=True)
+
+async def asave_players(records):
+    """save_players for coroutines: the touched shards are serialized here
+    on the event loop, where nothing else can change the records, and only
+    the writes run on the I/O pool"""
+    from leaderboards import update_players
+    _state["version"] += 1
+    if uses_sqlite(STATS_FILE):
+        await run_io(sqlite_store.save_rows, STATS_FILE, records, sqlite_store.serialize(STATS_FILE, records))
+        update_players(records)
+        return
+
+    filenames = {shard_for(player_id) for player_id in records}
+    shards = await run_io(_load_shards, filenames)
+    for player_id, record in records.items():
+        shards[shard_for(player_id)][str(player_id)] = record
+    for filename, shard in shards.items():
+        await _awrite_shard(filename, shard, _digest(shard))
+    update_players(records)
+
+async def asave_all(stats):
+    """save_all for coroutines, serializing on the event loop like asave_players"""
+    from leaderboards import update_players
+    _state["version"] += 1
+    if uses_sqlite(STATS_FILE):
+        await asave_data(STATS_FILE, stats)
+        update_players(stats, complete=True)
+        return
+
+    shards = _split(stats)
+    digests = {filename: _digest(shard) for filename, shard in shards.items()}
+    unknown = [filename for filename in shards if filename not in _digests]
+    if unknown:
+        await run_io(_read_digests, unknown)
+    for filename, shard in shards.items():
+        if _needs_write(filename, shard, digests[filename]):
+            await _awrite_shard(filename, shard, digests[filename])
+    update_players(stats, complete=True)
+
+def discard_players(player_ids):
+    """Forget unsaved changes made to cached player records; they are read again on next use"""
+    _state["version"] += 1
+    if uses_sqlite(STATS_FILE):
+        discard_cached(STATS_FILE)
+        return
+    for filename in {shard_for(player_id) for player_id in player_ids}:
+        discard_cached(filename)
+
+def stats_lock():
+    """Lock shared by every writer of player stats"""
+    return get_file_lock(STATS_FILE)
+
+class players_transaction:
+    """Async load-modify-save of a few players' stats.
+
+        async with players_transaction(ids) as stats:
+            stats["player_1"]["mmr"] += 10
+
+    Players that don't exist yet are simply missing from the dict; anything
+    in the dict on exit is saved. If the block or the save raises, the cached
+    records are dropped instead so their changes can't be saved later.
+    """
+
+    def __init__(self, player_ids):
+        self.player_ids = [str(p) for p in player_ids]
+        self.lock = stats_lock()
+        self.data = None
+
+    async def __aenter__(self):
+        await self.lock.acquire()
+        try:
+            self.data = await run_io(load_players, self.player_ids)
+        except:
+            self.lock.release()
+            raise
+        return self.data
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is not None:
+                discard_players(self.player_ids)
+            elif self.data:
+                try:
+                    await asave_players(self.data)
+                except:
+                    discard_players(self.player_ids)
+                    raise
+        finally:
+            self.lock.release()
+        return False
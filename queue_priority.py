@@ -0,0 +1,101 @@
+
+import heapq
+import time
+from datetime import datetime, timedelta
+from data import load_data
+
+# Matchmaking priority. Buying "queue_priority" or being in a clan with the
+# queue_priority perk counts as having waited longer than you have; the
+# boosts are in seconds of extra effective wait.
+PURCHASE_BOOST = 120
+CLAN_BOOST = 60
+
+class PriorityCache:
+    """user_id -> expiry of purchased priority, with a heap of expiries.
+
+    Built once from economy.json and kept current by grant(); expired
+    entries are dropped from the top of the heap, so a lookup never scans.
+    """
+
+    def __init__(self):
+        self.expiries = {}   # user_id -> expiry timestamp
+        self.heap = []       # (expiry, user_id), may hold superseded entries
+        self.source = None   # economy dict the cache was built from
+
+    def build(self, economy):
+        self.expiries = {}
+        self.heap = []
+        self.source = economy
+        for user_id, player in economy.items():
+            until = player.get("priority_until") or _until_from_purchases(player)
+            if until:
+                self.grant(int(user_id), datetime.fromisoformat(until).timestamp())
+
+    def grant(self, user_id, expires_at):
+        if expires_at <= self.expiries.get(user_id, 0):
+            return
+        self.expiries[user_id] = expires_at
+        heapq.heappush(self.heap, (expires_at, user_id))
+
+    def expire(self, now):
+        while self.heap and self.heap[0][0] <= now:
+            expires_at, user_id = heapq.heappop(self.heap)
+            if self.expiries.get(user_id) == expires_at:
+                del self.expiries[user_id]
+
+    def active(self, user_id, now):
+        self.expire(now)
+        return user_id in self.expiries
+
+def _until_from_purchases(player):
+    # Purchases made before priority_until was recorded
+    bought = [p["purchased_at"] for p in player.get("purchases", []) if p.get("item_id") == "queue_priority"]
+    if not bought:
+        return None
+    return (datetime.fromisoformat(max(bought)) + timedelta(hours=24)).isoformat()
+
+_purchases = PriorityCache()
+
+def _purchase_cache():
+    economy = load_data("economy.json")
+    if _purchases.source is not economy:
+        _purchases.build(economy)
+    return _purchases
+
+def extend_priority(player, hours, now=None):
+    """Add purchased priority to a player's economy record, stacking on time left"""
+    now = now or datetime.now()
+    current = player.get("priority_until")
+    start = max(now, datetime.fromisoformat(current)) if current else now
+    player["priority_until"] = (start + timedelta(hours=hours)).isoformat()
+    return player["priority_until"]
+
+def grant_priority(user_id, until):
+    _purchase_cache().grant(int(user_id), datetime.fromisoformat(until).timestamp())
+
+def has_clan_priority(user_id, members=None, clans=None):
+    members = members if members is not None else load_data("clan_members.json")
+    membership = members.get(str(user_id))
+    if not membership:
+        return False
+    clans = clans if clans is not None else load_data("clans.json")
+    clan = clans.get(membership["clan_id"], {})
+    return bool(clan.get("perks", {}).get("queue_priority"))
+
+def priority_boosts(user_ids, now=None):
+    """Effective-wait boost in seconds for each user that has one"""
+    now = now if now is not None else time.time()
+    purchases = _purchase_cache()
+    members = load_data("clan_members.json")
+    clans = load_data("clans.json")
+
+    boosts = {}
+    for user_id in user_ids:
+        boost = 0
+        if purchases.active(user_id, now):
+            boost += PURCHASE_BOOST
+        if has_clan_priority(user_id, members, clans):
+            boost += CLAN_BOOST
+        if boost:
+            boosts[user_id] = boost
+    return boosts
@@ -0,0 +1,195 @@
+
+import heapq
+from matchmaking import unit_members, joined_timestamp
+from data import load_data, save_data, aload_data, asave_data, get_file_lock, guild_file, guild_partitions, file_version, discard_cached
+
+QUEUE_FILE = "queue.json"
+DEFAULT_MODE = "Soccar"
+QUEUE_TIMEOUT = 600  # seconds in queue before an entry is dropped
+
+class QueueState:
+    """Indexed view of the matchmaking queue.
+
+    Entries are the same dicts stored in queue.json; a party is one entry
+    under its leader. Lookups by any player, the entries of one (format, mode)
+    bucket in join order, and per-bucket player counts are all O(1);
+    queue.json is written as a snapshot of this state.
+    """
+
+    def __init__(self, entries=()):
+        self.entries = {}        # entry user_id -> entry, in join order
+        self.member_of = {}      # every queued player -> their entry's user_id
+        self.player_count = 0
+        self.buckets = {}        # (format, mode) -> {user_id: entry}, in join order
+        self.counts = {}         # (format, mode) -> players searching
+        self.format_counts = {}  # format -> players searching, across modes
+        self.source = None       # list this state was loaded from or last saved as
+        self.guild_id = None     # partition the state belongs to
+        self.version = None      # data.file_version of queue.json this state matches
+        self.deadlines = []      # min-heap of (timeout timestamp, user_id); stale items are skipped
+        self.expires_at = {}     # entry user_id -> its current deadline
+        for entry in entries:
+            self.add(entry, track=False)
+        self.deadlines = [(deadline, user_id) for user_id, deadline in self.expires_at.items()]
+        heapq.heapify(self.deadlines)
+
+    @staticmethod
+    def bucket_key(entry):
+        return (entry["format"], entry.get("game_mode", DEFAULT_MODE))
+
+    def _count(self, entry, delta):
+        delta *= len(unit_members(entry))
+        self.player_count += delta
+        if entry.get("status") != "searching":
+            return
+        key = self.bucket_key(entry)
+        self.counts[key] = self.counts.get(key, 0) + delta
+        self.format_counts[key[0]] = self.format_counts.get(key[0], 0) + delta
+
+    def add(self, entry, track=True):
+        """Queue an entry, replacing any earlier entry of its players"""
+        for member in unit_members(entry):
+            self.remove(member["user_id"])
+        self.entries[entry["user_id"]] = entry
+        deadline = joined_timestamp(entry) + QUEUE_TIMEOUT
+        self.expires_at[entry["user_id"]] = deadline
+        if track:
+            heapq.heappush(self.deadlines, (deadline, entry["user_id"]))
+        for member in unit_members(entry):
+            self.member_of[member["user_id"]] = entry["user_id"]
+        self.buckets.setdefault(self.bucket_key(entry), {})[entry["user_id"]] = entry
+        self._count(entry, 1)
+
+    def remove(self, user_id):
+        """Dequeue the entry a player is in, their whole party included"""
+        entry = self.entries.pop(self.member_of.get(user_id, user_id), None)
+        if entry is not None:
+            # Its heap item goes stale and is skipped when it comes up
+            self.expires_at.pop(entry["user_id"], None)
+            self.buckets[self.bucket_key(entry)].pop(entry["user_id"], None)
+            for member in unit_members(entry):
+                self.member_of.pop(member["user_id"], None)
+            self._count(entry, -1)
+        return entry
+
+    def remove_many(self, user_ids):
+        return [entry for entry in map(self.remove, user_ids) if entry is not None]
+
+    def pop_expired(self, now):
+        """Remove and return the entries whose timeout has passed, in O(k log n)"""
+        expired = []
+        while self.deadlines and self.deadlines[0][0] <= now:
+            deadline, user_id = heapq.heappop(self.deadlines)
+            if self.expires_at.get(user_id) == deadline:
+                expired.append(self.remove(user_id))
+        if len(self.deadlines) > 2 * len(self.expires_at) + 64:
+            # Mostly stale items left from matched players, rebuild
+            self.deadlines = [(deadline, user_id) for user_id, deadline in self.expires_at.items()]
+            heapq.heapify(self.deadlines)
+        return expired
+
+    def get(self, user_id):
+        return self.entries.get(self.member_of.get(user_id, user_id))
+
+    def __contains__(self, user_id):
+        return user_id in self.member_of
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(list(self.entries.values()))
+
+    def bucket(self, format_type, game_mode=DEFAULT_MODE):
+        """Entries of one bucket, oldest first"""
+        return list(self.buckets.get((format_type, game_mode), {}).values())
+
+    def bucket_keys(self):
+        return [key for key, entries in self.buckets.items() if entries]
+
+    def count(self, format_type, game_mode=None):
+        """Players searching in a format, or in one format + mode"""
+        if game_mode is None:
+            return self.format_counts.get(format_type, 0)
+        return self.counts.get((format_type, game_mode), 0)
+
+    def players(self):
+        return self.player_count
+
+    def searching(self):
+        return sum(self.format_counts.values())
+
+    def snapshot(self):
+        return list(self.entries.values())
+
+_states = {}  # guild_id -> QueueState of that guild's queue partition
+
+def _current_state(guild_id, queue):
+    state = _states.get(guild_id)
+    # queue.json is still written directly by admin tools, so rebuild when the
+    # stored list is not the one we last loaded or saved, or it was saved or
+    # invalidated by anyone but us since
+    version = file_version(guild_file(QUEUE_FILE, guild_id))
+    if state is None or state.source is not queue or state.version != version:
+        state = _states[guild_id] = QueueState(queue)
+        state.source = queue
+        state.guild_id = guild_id
+        state.version = version
+    return state
+
+def get_queue_state(guild_id=None):
+    return _current_state(guild_id, load_data(guild_file(QUEUE_FILE, guild_id)))
+
+async def aget_queue_state(guild_id=None):
+    return _current_state(guild_id, await aload_data(guild_file(QUEUE_FILE, guild_id)))
+
+def all_queue_states():
+    """The queue of every guild that has one"""
+    return [get_queue_state(guild_id) for guild_id in guild_partitions(QUEUE_FILE)]
+
+def save_queue_state(state):
+    snapshot = state.snapshot()
+    state.source = snapshot
+    state.version = save_data(guild_file(QUEUE_FILE, state.guild_id), snapshot)
+
+async def asave_queue_state(state):
+    snapshot = state.snapshot()
+    state.source = snapshot
+    state.version = await asave_data(guild_file(QUEUE_FILE, state.guild_id), snapshot)
+
+class queue_transaction:
+    """Like data.transaction("queue.json") but hands out a guild's QueueState.
+
+        async with queue_transaction(interaction.guild_id) as state:
+            state.add(entry)
+    """
+
+    def __init__(self, guild_id=None):
+        self.guild_id = guild_id
+        self.lock = get_file_lock(guild_file(QUEUE_FILE, guild_id))
+        self.state = None
+        self.save_on_exit = True
+
+    def skip_save(self):
+        self.save_on_exit = False
+
+    async def __aenter__(self):
+        await self.lock.acquire()
+        try:
+            self.state = await aget_queue_state(self.guild_id)
+        except:
+            self.lock.release()
+            raise
+        return self.state
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is not None:
+                # The state may be half changed, rebuild it from the file next time
+                _states.pop(self.guild_id, None)
+                discard_cached(guild_file(QUEUE_FILE, self.guild_id))
+            elif self.save_on_exit:
+                await asave_queue_state(self.state)
+        finally:
+            self.lock.release()
+        return False
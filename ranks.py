@@ -0,0 +1,81 @@
+
+from bisect import bisect_right
+
+# MMR floor of every rank, lowest first. A player holds the highest rank whose
+# floor they've reached; every rank below the top one is split into equal
+# divisions for progress display.
+RANK_TIERS = [
+    (0, "Bronze I"),
+    (50, "Silver I"),
+    (100, "Silver II"),
+    (200, "Silver III"),
+    (300, "Gold I"),
+    (400, "Gold II"),
+    (500, "Gold III"),
+    (600, "Platinum I"),
+    (700, "Platinum II"),
+    (800, "Platinum III"),
+    (900, "Diamond I"),
+    (1000, "Diamond II"),
+    (1100, "Diamond III"),
+    (1200, "Champion I"),
+    (1300, "Champion II"),
+    (1400, "Champion III"),
+    (1500, "Grand Champion")
+]
+DIVISIONS = 4
+
+_FLOORS = [floor for floor, _ in RANK_TIERS]
+_NAMES = [name for _, name in RANK_TIERS]
+
+def tier_index(mmr):
+    """Index into RANK_TIERS for an MMR value"""
+    return max(bisect_right(_FLOORS, mmr) - 1, 0)
+
+def rank_for(mmr):
+    """Rank name for an MMR value"""
+    return _NAMES[tier_index(mmr)]
+
+def rank_for_many(mmrs):
+    """Rank names for many MMR values, in the same order"""
+    floors, names = _FLOORS, _NAMES
+    return [names[max(bisect_right(floors, mmr) - 1, 0)] for mmr in mmrs]
+
+def division_floors(rank):
+    """MMR floor of each division of a rank; the top rank has a single division"""
+    index = _NAMES.index(rank)
+    if index + 1 == len(RANK_TIERS):
+        return [_FLOORS[index]]
+    floor, width = _FLOORS[index], _FLOORS[index + 1] - _FLOORS[index]
+    return [floor + width * division / DIVISIONS for division in range(DIVISIONS)]
+
+def rank_progress(mmr):
+    """Where an MMR sits within its rank.
+
+    Returns {"rank", "division", "floor", "division_floor", "division_ceiling",
+    "next_rank", "next_floor", "progress"}; division_floor and
+    division_ceiling bound the MMR of the current division, and progress is
+    the percentage of the way to next_rank. next_rank, next_floor, division
+    and division_ceiling are None at the top rank.
+    """
+    index = tier_index(mmr)
+    floor, rank = RANK_TIERS[index]
+    if index + 1 == len(RANK_TIERS):
+        return {"rank": rank, "division": None, "floor": floor,
+                "division_floor": floor, "division_ceiling": None,
+                "next_rank": None, "next_floor": None, "progress": 100.0}
+
+    next_floor, next_rank = RANK_TIERS[index + 1]
+    fraction = min(max((mmr - floor) / (next_floor - floor), 0.0), 1.0)
+    division = min(int(fraction * DIVISIONS) + 1, DIVISIONS)
+    floors = division_floors(rank) + [next_floor]
+    return {
+        "rank": rank,
+        "division": division,
+        "floor": floor,
+        "division_floor": floors[division - 1],
+        "division_ceiling": floors[division],
+        "next_rank": next_rank,
+        "next_floor": next_floor,
+        "progress": round(fraction * 100, 1)
+    }
@@ -0,0 +1,291 @@
+
+import datetime
+import math
+import os
+from statistics import NormalDist
+
+# Skill ratings for reported matches. Every participant of a match is updated
+# in one call from the ratings everyone had before it, so the order players
+# are listed in doesn't matter. Stats records keep "mmr" as the rating plus
+# the system's extra state, and a capped "rating_history" for charts.
+# Switching to "trueskill" is best done after `python rating.py migrate` (or
+# `python replay_ratings.py --system trueskill --apply` with the bot stopped)
+RATING_SYSTEM = os.getenv("RATING_SYSTEM", "glicko2").lower()
+RATING_HISTORY_LIMIT = int(os.getenv("RATING_HISTORY_LIMIT", "200"))
+DEFAULT_RATING = 1000
+DEFAULT_DEVIATION = 350.0
+# Deviation for records from before ratings had one: every match played counts
+# as a rating period, shrinking it from DEFAULT_DEVIATION towards this floor
+MIN_DEVIATION = 50.0
+
+class Elo:
+    """Team Elo: each player moves by K * (result - expected), expected from team averages"""
+
+    name = "elo"
+
+    def __init__(self, k_factor=32):
+        self.k_factor = k_factor
+
+    def expected(self, rating, opponent_rating):
+        return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+    def rate(self, teams, scores):
+        """teams: lists of player state dicts, scores: 1 win / 0.5 draw / 0 loss per team.
+        Returns new state dicts in the same shape."""
+        averages = [sum(p["mmr"] for p in team) / len(team) if team else DEFAULT_RATING for team in teams]
+        updated = []
+        for index, team in enumerate(teams):
+            opponents = [a for i, a in enumerate(averages) if i != index]
+            opponent = sum(opponents) / len(opponents) if opponents else DEFAULT_RATING
+            change = self.k_factor * (scores[index] - self.expected(averages[index], opponent))
+            updated.append([{**p, "mmr": p["mmr"] + change} for p in team])
+        return updated
+
+class Glicko2:
+    """Glicko-2 (Glickman 2012) with each team's opponents treated as one composite player"""
+
+    name = "glicko2"
+    SCALE = 173.7178
+
+    def __init__(self, tau=0.5, default_deviation=DEFAULT_DEVIATION, default_volatility=0.06, epsilon=0.000001):
+        self.tau = tau
+        self.default_deviation = default_deviation
+        self.default_volatility = default_volatility
+        self.epsilon = epsilon
+
+    def _g(self, phi):
+        return 1 / math.sqrt(1 + 3 * phi ** 2 / math.pi ** 2)
+
+    def _volatility(self, sigma, phi, v, delta):
+        # Step 5 of the paper, Illinois-method root finding
+        a = math.log(sigma ** 2)
+
+        def f(x):
+            ex = math.exp(x)
+            return (ex * (delta ** 2 - phi ** 2 - v - ex) / (2 * (phi ** 2 + v + ex) ** 2)) - (x - a) / self.tau ** 2
+
+        low = a
+        if delta ** 2 > phi ** 2 + v:
+            high = math.log(delta ** 2 - phi ** 2 - v)
+        else:
+            k = 1
+            while f(a - k * self.tau) < 0:
+                k += 1
+            high = a - k * self.tau
+        f_low, f_high = f(low), f(high)
+        while abs(high - low) > self.epsilon:
+            mid = low + (low - high) * f_low / (f_high - f_low)
+            f_mid = f(mid)
+            if f_mid * f_high <= 0:
+                low, f_low = high, f_high
+            else:
+                f_low /= 2
+            high, f_high = mid, f_mid
+        return math.exp(low / 2)
+
+    def _update(self, player, opponent_mu, opponent_phi, score):
+        mu = (player["mmr"] - DEFAULT_RATING) / self.SCALE
+        phi = player.get("rating_deviation", self.default_deviation) / self.SCALE
+        sigma = player.get("rating_volatility", self.default_volatility)
+
+        g = self._g(opponent_phi)
+        expected = 1 / (1 + math.exp(-g * (mu - opponent_mu)))
+        v = 1 / (g ** 2 * expected * (1 - expected))
+        delta = v * g * (score - expected)
+
+        sigma = self._volatility(sigma, phi, v, delta)
+        phi_star = math.sqrt(phi ** 2 + sigma ** 2)
+        phi = 1 / math.sqrt(1 / phi_star ** 2 + 1 / v)
+        mu = mu + phi ** 2 * g * (score - expected)
+        return {
+            **player,
+            "mmr": DEFAULT_RATING + mu * self.SCALE,
+            "rating_deviation": phi * self.SCALE,
+            "rating_volatility": sigma
+        }
+
+    def rate(self, teams, scores):
+        composites = []
+        for team in teams:
+            if not team:
+                composites.append((0.0, self.default_deviation / self.SCALE))
+                continue
+            mu = sum((p["mmr"] - DEFAULT_RATING) / self.SCALE for p in team) / len(team)
+            phi = math.sqrt(sum((p.get("rating_deviation", self.default_deviation) / self.SCALE) ** 2 for p in team) / len(team))
+            composites.append((mu, phi))
+
+        updated = []
+        for index, team in enumerate(teams):
+            opponents = [c for i, c in enumerate(composites) if i != index]
+            opponent_mu = sum(mu for mu, _ in opponents) / len(opponents)
+            opponent_phi = math.sqrt(sum(phi ** 2 for _, phi in opponents) / len(opponents))
+            updated.append([self._update(p, opponent_mu, opponent_phi, scores[index]) for p in team])
+        return updated
+
+def _pdf(x):
+    return math.exp(-x * x / 2) / math.sqrt(2 * math.pi)
+
+def _cdf(x):
+    return math.erfc(-x / math.sqrt(2)) / 2
+
+def win_correction(t, margin):
+    """TrueSkill's v and w for a win by a performance difference of t (in units of c)"""
+    x = t - margin
+    denominator = _cdf(x)
+    # Far in the tail pdf/cdf tends to -x
+    v = _pdf(x) / denominator if denominator > 1e-160 else -x
+    return v, v * (v + x)
+
+def draw_correction(t, margin):
+    """TrueSkill's v and w for a draw with a performance difference of t (in units of c)"""
+    denominator = _cdf(margin - t) - _cdf(-margin - t)
+    if denominator < 1e-160:
+        return (-t - margin if t < 0 else -t + margin), 1.0
+    v = (_pdf(-margin - t) - _pdf(margin - t)) / denominator
+    w = v ** 2 + ((margin - t) * _pdf(margin - t) + (margin + t) * _pdf(margin + t)) / denominator
+    return v, w
+
+class TrueSkill:
+    """Two-team TrueSkill (Herbrich et al. 2006) in MMR units.
+
+    Each player has a mean ("mmr") and an uncertainty ("rating_deviation");
+    a team's performance is the sum of its players' performances, so the
+    update for each player depends on the whole match, not just their side.
+    """
+
+    name = "trueskill"
+
+    def __init__(self, beta=175.0, default_deviation=DEFAULT_DEVIATION, dynamics=3.5, draw_probability=0.1):
+        self.beta = beta
+        self.default_deviation = default_deviation
+        self.dynamics = dynamics
+        self.draw_probability = draw_probability
+
+    def draw_margin(self, players):
+        return NormalDist().inv_cdf((self.draw_probability + 1) / 2) * math.sqrt(players) * self.beta
+
+    def _teams(self, teams):
+        # An empty side plays as one average, unknown player
+        return [team or [{"mmr": DEFAULT_RATING, "rating_deviation": self.default_deviation}] for team in teams]
+
+    def quality(self, teams):
+        """Draw probability of the match relative to the fairest possible one, 0-1"""
+        orange, blue = self._teams(teams)
+        players = orange + blue
+        variance = len(players) * self.beta ** 2 + sum(p.get("rating_deviation", self.default_deviation) ** 2 for p in players)
+        difference = sum(p.get("mmr", DEFAULT_RATING) for p in orange) - sum(p.get("mmr", DEFAULT_RATING) for p in blue)
+        return math.sqrt(len(players) * self.beta ** 2 / variance) * math.exp(-difference ** 2 / (2 * variance))
+
+    def rate(self, teams, scores):
+        orange, blue = self._teams(teams)
+        variances = [[p.get("rating_deviation", self.default_deviation) ** 2 + self.dynamics ** 2 for p in team]
+                     for team in (orange, blue)]
+        players = len(orange) + len(blue)
+        c = math.sqrt(sum(map(sum, variances)) + players * self.beta ** 2)
+        difference = sum(p.get("mmr", DEFAULT_RATING) for p in orange) - sum(p.get("mmr", DEFAULT_RATING) for p in blue)
+        margin = self.draw_margin(players) / c
+
+        # sign is +1 when orange won, and the corrections are for the winner
+        if scores[0] == scores[1]:
+            sign = 1
+            v, w = draw_correction(difference / c, margin)
+        else:
+            sign = 1 if scores[0] > scores[1] else -1
+            v, w = win_correction(sign * difference / c, margin)
+
+        updated = []
+        for team, team_variances, direction, original in ((orange, variances[0], sign, teams[0]),
+                                                          (blue, variances[1], -sign, teams[1])):
+            updated.append([{
+                **p,
+                "mmr": p.get("mmr", DEFAULT_RATING) + direction * variance / c * v,
+                "rating_deviation": math.sqrt(variance * max(1 - variance / c ** 2 * w, 0.0001))
+            } for p, variance in zip(team, team_variances)] if original else [])
+        return updated
+
+SYSTEMS = {
+    "elo": Elo(k_factor=float(os.getenv("ELO_K", "32"))),
+    "glicko2": Glicko2(tau=float(os.getenv("GLICKO_TAU", "0.5"))),
+    "trueskill": TrueSkill(beta=float(os.getenv("TRUESKILL_BETA", "175")))
+}
+
+def get_system(name=None):
+    return SYSTEMS[(name or RATING_SYSTEM).lower()]
+
+def match_quality(orange, blue):
+    """How even a match between two lists of players would be, 0-1 (TrueSkill quality).
+
+    Players are dicts with "mmr" and optionally "rating_deviation", such as
+    stats records or queue entries; nothing is loaded, so this is cheap
+    enough to call for every candidate split.
+    """
+    return SYSTEMS["trueskill"].quality([orange, blue])
+
+def deviation_for(record):
+    """A record's rating deviation, estimated from matches_played if it has none"""
+    if "rating_deviation" in record:
+        return record["rating_deviation"]
+    return max(MIN_DEVIATION, DEFAULT_DEVIATION / math.sqrt(1 + record.get("matches_played", 0)))
+
+def _state(record):
+    state = {"mmr": record.get("mmr", DEFAULT_RATING), "rating_deviation": deviation_for(record)}
+    if "rating_volatility" in record:
+        state["rating_volatility"] = record["rating_volatility"]
+    return state
+
+def rate_match(stats, orange_ids, blue_ids, orange_score, blue_score, match_id=None, system=None):
+    """Update the rating of every player of a match in loaded stats records.
+
+    Player records must already exist in stats. An empty side stands for an
+    average (DEFAULT_RATING) opponent. Returns {player_id: rating change}.
+    """
+    system = system or get_system()
+    orange_result = 1.0 if orange_score > blue_score else 0.0 if orange_score < blue_score else 0.5
+    teams = [[_state(stats[p]) for p in orange_ids], [_state(stats[p]) for p in blue_ids]]
+    updated = system.rate(teams, [orange_result, 1 - orange_result])
+
+    now = datetime.datetime.now().isoformat()
+    changes = {}
+    for ids, states in zip((orange_ids, blue_ids), updated):
+        for player_id, state in zip(ids, states):
+            record = stats[player_id]
+            new_mmr = round(state["mmr"])
+            changes[player_id] = new_mmr - record.get("mmr", DEFAULT_RATING)
+            record["mmr"] = new_mmr
+            point = {"date": now, "match_id": match_id, "mmr": new_mmr, "system": system.name}
+            if "rating_deviation" in state:
+                record["rating_deviation"] = round(state["rating_deviation"], 2)
+                point["deviation"] = record["rating_deviation"]
+            if "rating_volatility" in state:
+                record["rating_volatility"] = round(state["rating_volatility"], 6)
+            history = record.setdefault("rating_history", [])
+            history.append(point)
+            del history[:-RATING_HISTORY_LIMIT]
+    return changes
+
+def seed_deviations(stats):
+    """Store deviation_for on every record that has no rating_deviation yet.
+
+    Run once (python rating.py migrate) before switching RATING_SYSTEM so
+    established players aren't rated like brand new ones. Returns the number
+    of records changed.
+    """
+    seeded = 0
+    for record in stats.values():
+        if "rating_deviation" not in record:
+            record["rating_deviation"] = round(deviation_for(record), 2)
+            seeded += 1
+    return seeded
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] != ["migrate"]:
+        print("Usage: python rating.py migrate")
+        sys.exit(1)
+    import player_store
+    from data import flush_writes
+    stats = player_store.load_all()
+    seeded = seed_deviations(stats)
+    player_store.save_all(stats)
+    flush_writes()
+    print(f"✅ Seeded rating deviation for {seeded} of {len(stats)} players")
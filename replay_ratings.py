@@ -0,0 +1,386 @@
+
+import argparse
+import itertools
+import json
+import math
+import random
+import time
+from statistics import NormalDist
+import numpy as np
+import match_journal
+import player_store
+from data import flush_writes
+import rating
+import retention
+from ranks import rank_for_many
+
+# Offline rating replay: every reported match from the archive and the journal
+# is replayed oldest first with NumPy arrays indexed by a dense player-id map,
+# one column per parameter value so a whole sweep runs in a single pass.
+# Matches are grouped into rounds where nobody plays twice; a round only
+# depends on earlier rounds, so each one is a single vectorized update and the
+# result is the same as replaying the matches one at a time.
+#
+# --apply rewrites the live stats from outside the bot, so stop the bot first:
+# its stats_lock only guards writers in its own process, and a running bot
+# would keep serving (and saving over) the ratings it has in memory.
+OUTPUT_FILE = "stats_replay.json"
+# The parameter each system sweeps over
+SWEEP_PARAMS = {"elo": "k_factor", "glicko2": "tau", "trueskill": "beta"}
+
+def load_results():
+    """Reported matches from the archive and the journal, oldest first"""
+    records = list(retention.read_archive("match_history")) + list(match_journal.iter_records())
+    results, seen = [], set()
+    for record in records:
+        if "orange_score" not in record or "blue_score" not in record:
+            continue
+        if not record.get("orange_players") and not record.get("blue_players"):
+            continue
+        # Archiving can leave a duplicate behind after a crash
+        match_id = record.get("match_id")
+        if match_id is not None:
+            if match_id in seen:
+                continue
+            seen.add(match_id)
+        results.append(record)
+    results.sort(key=lambda r: r.get("date") or "")
+    return results
+
+def synthetic_results(count, players=10000, seed=1):
+    """Random 1v1/2v2/3v3 results for benchmarking, with a hidden skill per player"""
+    rng = random.Random(seed)
+    skill = [rng.gauss(0, 1) for _ in range(players)]
+    results = []
+    for i in range(count):
+        size = rng.choice((1, 2, 3))
+        picked = rng.sample(range(players), size * 2)
+        orange, blue = picked[:size], picked[size:]
+        edge = sum(skill[p] for p in orange) - sum(skill[p] for p in blue)
+        orange_wins = rng.random() < 1 / (1 + 10 ** (-edge / 2))
+        results.append({
+            "match_id": i,
+            "orange_players": orange,
+            "blue_players": blue,
+            "orange_score": 3 if orange_wins else 1,
+            "blue_score": 1 if orange_wins else 3
+        })
+    return results
+
+class Journal:
+    """Match results encoded as arrays over dense player indexes.
+
+    orange/blue are (matches, width) index arrays padded with the sentinel
+    index len(player_ids), whose rating is never changed.
+    """
+
+    def __init__(self, results):
+        # Interleaved sides: orange of match i is sides[2i], blue is sides[2i + 1]
+        # User ids, or usernames for matches stored before ids were (see player_store.match_player_keys)
+        sides = [r.get(f"{side}_ids") or r.get(f"{side}_players", []) for r in results for side in ("orange", "blue")]
+        lengths = np.fromiter(map(len, sides), dtype=np.int64, count=len(sides))
+        flat = list(itertools.chain.from_iterable(sides))
+
+        names = list(dict.fromkeys(flat))
+        lookup = {name: index for index, name in enumerate(names)}
+        codes = np.fromiter(map(lookup.__getitem__, flat), dtype=np.int64, count=len(flat))
+        self.player_ids = {player_store.stats_key(name): index for index, name in enumerate(names)}
+        self.sentinel = len(names)
+
+        width = max(int(lengths.max()) if len(lengths) else 0, 1)
+        starts = np.cumsum(lengths) - lengths
+        padded = np.full((len(sides), width), self.sentinel, dtype=np.int64)
+        padded[np.repeat(np.arange(len(sides)), lengths), np.arange(len(flat)) - np.repeat(starts, lengths)] = codes
+        padded = padded.reshape(len(results), 2 * width)
+        self.orange, self.blue = padded[:, :width], padded[:, width:]
+
+        margin = np.array([r["orange_score"] - r["blue_score"] for r in results], dtype=np.float64)
+        self.scores = (np.sign(margin) + 1) / 2
+        match_ends = np.cumsum(lengths.reshape(-1, 2).sum(axis=1))
+        self.rounds = self._rounds(codes.tolist(), match_ends.tolist())
+
+    def __len__(self):
+        return len(self.scores)
+
+    def _rounds(self, codes, match_ends):
+        # A match's round is one past the latest round any of its players was in
+        last = [0] * self.sentinel
+        levels = []
+        start = 0
+        for end in match_ends:
+            players = codes[start:end]
+            level = max(map(last.__getitem__, players), default=0) + 1
+            for player in players:
+                last[player] = level
+            levels.append(level)
+            start = end
+        if not levels:
+            return []
+        levels = np.array(levels)
+        order = np.argsort(levels, kind="stable")
+        return np.split(order, np.flatnonzero(np.diff(levels[order])) + 1)
+
+def _team_mean(values, indexes, mask, counts, empty):
+    # values: (players, params); returns the per-match mean over real players
+    total = (values[indexes] * mask[..., None]).sum(axis=1)
+    return np.where(counts[:, None] > 0, total / np.maximum(counts, 1)[:, None], empty)
+
+def replay_elo(journal, k_factors):
+    """Returns (ratings, metrics); ratings is (players, len(k_factors))"""
+    k_factors = np.asarray(k_factors, dtype=np.float64)
+    ratings = np.full((journal.sentinel + 1, len(k_factors)), float(rating.DEFAULT_RATING))
+    losses = np.zeros((2, len(k_factors)))
+
+    for round_matches in journal.rounds:
+        orange, blue = journal.orange[round_matches], journal.blue[round_matches]
+        orange_mask, blue_mask = orange != journal.sentinel, blue != journal.sentinel
+        orange_avg = _team_mean(ratings, orange, orange_mask, orange_mask.sum(axis=1), rating.DEFAULT_RATING)
+        blue_avg = _team_mean(ratings, blue, blue_mask, blue_mask.sum(axis=1), rating.DEFAULT_RATING)
+
+        expected = 1 / (1 + 10 ** ((blue_avg - orange_avg) / 400))
+        score = journal.scores[round_matches][:, None]
+        losses += _losses(expected, score)
+
+        change = k_factors * (score - expected)
+        ratings[orange] += change[:, None, :] * orange_mask[..., None]
+        ratings[blue] -= change[:, None, :] * blue_mask[..., None]
+    return ratings[:-1], _metrics(losses, len(journal))
+
+def _volatility(sigma, phi, v, delta, tau, epsilon):
+    # Glicko-2 step 5 (Illinois method) for every player of a round at once
+    a = np.log(sigma ** 2)
+
+    def f(x):
+        ex = np.exp(x)
+        return ex * (delta ** 2 - phi ** 2 - v - ex) / (2 * (phi ** 2 + v + ex) ** 2) - (x - a) / tau ** 2
+
+    with np.errstate(all="ignore"):
+        large = delta ** 2 > phi ** 2 + v
+        low = a
+        high = np.where(large, np.log(np.where(large, delta ** 2 - phi ** 2 - v, 1.0)), a - tau)
+        k = np.ones_like(a)
+        pending = ~large & (f(high) < 0)
+        while pending.any():
+            k = np.where(pending, k + 1, k)
+            high = np.where(pending, a - k * tau, high)
+            pending = pending & (f(high) < 0)
+
+        f_low, f_high = f(low), f(high)
+        active = np.abs(high - low) > epsilon
+        while active.any():
+            mid = low + (low - high) * f_low / (f_high - f_low)
+            f_mid = f(mid)
+            swap = active & (f_mid * f_high <= 0)
+            low, f_low = np.where(swap, high, low), np.where(swap, f_high, np.where(active, f_low / 2, f_low))
+            high, f_high = np.where(active, mid, high), np.where(active, f_mid, f_high)
+            active = active & (np.abs(high - low) > epsilon)
+    return np.exp(low / 2)
+
+def replay_glicko2(journal, taus):
+    """Returns ({"mmr", "rating_deviation", "rating_volatility"}, metrics), each (players, len(taus))"""
+    system = rating.get_system("glicko2")
+    taus = np.asarray(taus, dtype=np.float64)
+    shape = (journal.sentinel + 1, len(taus))
+    mu = np.zeros(shape)
+    phi = np.full(shape, system.default_deviation / system.SCALE)
+    sigma = np.full(shape, system.default_volatility)
+    default_phi = system.default_deviation / system.SCALE
+    losses = np.zeros((2, len(taus)))
+
+    for round_matches in journal.rounds:
+        orange, blue = journal.orange[round_matches], journal.blue[round_matches]
+        orange_mask, blue_mask = orange != journal.sentinel, blue != journal.sentinel
+        orange_count, blue_count = orange_mask.sum(axis=1), blue_mask.sum(axis=1)
+        # Each side faces the other as one composite player: mean mu, RMS phi
+        composite = {
+            "orange": (_team_mean(mu, orange, orange_mask, orange_count, 0.0),
+                       np.sqrt(_team_mean(phi ** 2, orange, orange_mask, orange_count, default_phi ** 2))),
+            "blue": (_team_mean(mu, blue, blue_mask, blue_count, 0.0),
+                     np.sqrt(_team_mean(phi ** 2, blue, blue_mask, blue_count, default_phi ** 2)))
+        }
+        score = journal.scores[round_matches][:, None]
+        g_blue = 1 / np.sqrt(1 + 3 * composite["blue"][1] ** 2 / np.pi ** 2)
+        losses += _losses(1 / (1 + np.exp(-g_blue * (composite["orange"][0] - composite["blue"][0]))), score)
+
+        for players, mask, opponent, result in ((orange, orange_mask, composite["blue"], score),
+                                                (blue, blue_mask, composite["orange"], 1 - score)):
+            opponent_mu, opponent_phi = opponent[0][:, None, :], opponent[1][:, None, :]
+            player_mu, player_phi, player_sigma = mu[players], phi[players], sigma[players]
+
+            g = 1 / np.sqrt(1 + 3 * opponent_phi ** 2 / np.pi ** 2)
+            expected = 1 / (1 + np.exp(-g * (player_mu - opponent_mu)))
+            v = 1 / (g ** 2 * expected * (1 - expected))
+            outcome = result[:, None, :]
+            delta = v * g * (outcome - expected)
+
+            new_sigma = _volatility(player_sigma, player_phi, v, delta, taus, system.epsilon)
+            phi_star = np.sqrt(player_phi ** 2 + new_sigma ** 2)
+            new_phi = 1 / np.sqrt(1 / phi_star ** 2 + 1 / v)
+            new_mu = player_mu + new_phi ** 2 * g * (outcome - expected)
+
+            keep = ~mask[..., None]
+            mu[players] = np.where(keep, player_mu, new_mu)
+            phi[players] = np.where(keep, player_phi, new_phi)
+            sigma[players] = np.where(keep, player_sigma, new_sigma)
+
+    return {
+        "mmr": rating.DEFAULT_RATING + mu[:-1] * system.SCALE,
+        "rating_deviation": phi[:-1] * system.SCALE,
+        "rating_volatility": sigma[:-1]
+    }, _metrics(losses, len(journal))
+
+_erfc = np.vectorize(math.erfc, otypes=[float])
+
+def _pdf(x):
+    return np.exp(-x * x / 2) / math.sqrt(2 * math.pi)
+
+def _cdf(x):
+    return _erfc(-x / math.sqrt(2)) / 2
+
+def _corrections(t, margin, draw):
+    # rating.win_correction / rating.draw_correction for a whole round
+    with np.errstate(all="ignore"):
+        x = t - margin
+        win_denominator = _cdf(x)
+        win_v = np.where(win_denominator > 1e-160, _pdf(x) / win_denominator, -x)
+        win_w = win_v * (win_v + x)
+
+        draw_denominator = _cdf(margin - t) - _cdf(-margin - t)
+        tail = draw_denominator < 1e-160
+        draw_v = np.where(tail, np.where(t < 0, -t - margin, -t + margin),
+                          (_pdf(-margin - t) - _pdf(margin - t)) / draw_denominator)
+        draw_w = np.where(tail, 1.0, draw_v ** 2 + ((margin - t) * _pdf(margin - t)
+                                                   + (margin + t) * _pdf(margin + t)) / draw_denominator)
+    return np.where(draw, draw_v, win_v), np.where(draw, draw_w, win_w)
+
+def replay_trueskill(journal, betas):
+    """Returns ({"mmr", "rating_deviation"}, metrics), each (players, len(betas))"""
+    system = rating.get_system("trueskill")
+    betas = np.asarray(betas, dtype=np.float64)
+    shape = (journal.sentinel + 1, len(betas))
+    mu = np.full(shape, float(rating.DEFAULT_RATING))
+    variance = np.full(shape, system.default_deviation ** 2)
+    # An empty side plays as one average, unknown player
+    empty_variance = system.default_deviation ** 2 + system.dynamics ** 2
+    draw_quantile = NormalDist().inv_cdf((system.draw_probability + 1) / 2)
+    losses = np.zeros((2, len(betas)))
+
+    for round_matches in journal.rounds:
+        orange, blue = journal.orange[round_matches], journal.blue[round_matches]
+        orange_mask, blue_mask = orange != journal.sentinel, blue != journal.sentinel
+        orange_count, blue_count = orange_mask.sum(axis=1), blue_mask.sum(axis=1)
+        orange_variance = variance[orange] + system.dynamics ** 2
+        blue_variance = variance[blue] + system.dynamics ** 2
+
+        def team_sum(values, mask, count, empty):
+            return np.where(count[:, None] > 0, (values * mask[..., None]).sum(axis=1), empty)
+
+        players = (np.maximum(orange_count, 1) + np.maximum(blue_count, 1))[:, None]
+        c = np.sqrt(team_sum(orange_variance, orange_mask, orange_count, empty_variance)
+                    + team_sum(blue_variance, blue_mask, blue_count, empty_variance)
+                    + players * betas ** 2)
+        difference = (team_sum(mu[orange], orange_mask, orange_count, rating.DEFAULT_RATING)
+                      - team_sum(mu[blue], blue_mask, blue_count, rating.DEFAULT_RATING))
+        score = journal.scores[round_matches][:, None]
+        losses += _losses(_cdf(difference / c), score)
+
+        # sign is +1 when orange won, and the corrections are for the winner
+        draw = score == 0.5
+        sign = np.where(score < 0.5, -1.0, 1.0)
+        margin = draw_quantile * np.sqrt(players) * betas / c
+        v, w = _corrections(np.where(draw, difference, sign * difference) / c, margin, draw)
+
+        for indexes, mask, team_variance, direction in ((orange, orange_mask, orange_variance, sign),
+                                                        (blue, blue_mask, blue_variance, -sign)):
+            new_mu = mu[indexes] + (direction * v / c)[:, None, :] * team_variance
+            new_variance = team_variance * np.maximum(1 - team_variance / (c ** 2)[:, None, :] * w[:, None, :], 0.0001)
+            keep = ~mask[..., None]
+            mu[indexes] = np.where(keep, mu[indexes], new_mu)
+            variance[indexes] = np.where(keep, variance[indexes], new_variance)
+
+    return {"mmr": mu[:-1], "rating_deviation": np.sqrt(variance[:-1])}, _metrics(losses, len(journal))
+
+def _losses(expected, score):
+    # Brier score and log loss of the pre-match prediction, summed over matches
+    expected = np.clip(expected, 1e-12, 1 - 1e-12)
+    brier = ((expected - score) ** 2).sum(axis=0)
+    log_loss = -(score * np.log(expected) + (1 - score) * np.log(1 - expected)).sum(axis=0)
+    return np.stack([brier, log_loss])
+
+def _metrics(losses, count):
+    count = max(count, 1)
+    return [{"brier": round(float(b / count), 5), "log_loss": round(float(l / count), 5)}
+            for b, l in zip(losses[0], losses[1])]
+
+def default_params(system):
+    return [getattr(rating.get_system(system), SWEEP_PARAMS[system])]
+
+def replay(journal, system="elo", params=None):
+    """Replay the journal with one column per parameter value.
+    Returns (fields, metrics) where fields maps stats field -> (players, params) array."""
+    params = params or default_params(system)
+    if system == "elo":
+        ratings, metrics = replay_elo(journal, params)
+        return {"mmr": ratings}, metrics
+    if system == "trueskill":
+        return replay_trueskill(journal, params)
+    return replay_glicko2(journal, params)
+
+def build_snapshot(journal, fields, column, stats):
+    """Copy of stats with the replayed rating and rank of every journal player"""
+    snapshot = dict(stats)
+    mmrs = np.rint(fields["mmr"][:, column]).astype(int).tolist()
+    ranks = rank_for_many(mmrs)
+    for player_id, index in journal.player_ids.items():
+        record = dict(player_store.ensure_player(snapshot, player_id))
+        record["mmr"] = mmrs[index]
+        record["rank"] = ranks[index]
+        if "rating_deviation" in fields:
+            record["rating_deviation"] = round(float(fields["rating_deviation"][index, column]), 2)
+        if "rating_volatility" in fields:
+            record["rating_volatility"] = round(float(fields["rating_volatility"][index, column]), 6)
+        snapshot[player_id] = record
+    return snapshot
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute ratings from the full match history")
+    parser.add_argument("--system", choices=sorted(rating.SYSTEMS), default=rating.RATING_SYSTEM)
+    parser.add_argument("--params", type=float, nargs="+",
+                        help="K-factors for elo, tau for glicko2 or beta for trueskill; several values run a sweep")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="where to write the replayed stats snapshot")
+    parser.add_argument("--apply", action="store_true", help="write the replayed ratings to the live stats instead (stop the bot first)")
+    parser.add_argument("--synthetic", type=int, metavar="MATCHES", help="benchmark on random matches, writes nothing")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"🔁 Rating replay ({args.system})")
+    print("=" * 50)
+    results = synthetic_results(args.synthetic, seed=args.seed) if args.synthetic else load_results()
+    started = time.perf_counter()
+    journal = Journal(results)
+    encoded = time.perf_counter()
+    print(f"📚 {len(journal):,} matches, {len(journal.player_ids):,} players, {len(journal.rounds):,} rounds "
+          f"({encoded - started:.2f}s to encode)")
+
+    params = args.params or default_params(args.system)
+    fields, metrics = replay(journal, args.system, params)
+    print(f"⚡ Replayed in {time.perf_counter() - encoded:.2f}s")
+    for value, metric in zip(params, metrics):
+        print(f"   {SWEEP_PARAMS[args.system]}={value:g}: brier {metric['brier']}, log loss {metric['log_loss']}")
+
+    best = min(range(len(params)), key=lambda i: metrics[i]["log_loss"])
+    if len(params) > 1:
+        print(f"🏆 Best: {params[best]:g}")
+    if args.synthetic:
+        raise SystemExit(0)
+
+    snapshot = build_snapshot(journal, fields, best, player_store.load_all())
+    if args.apply:
+        print("⚠️ Writing live stats, the bot must not be running")
+        player_store.save_all(snapshot)
+        flush_writes()
+        print(f"✅ Applied replayed ratings to {len(journal.player_ids):,} players")
+    else:
+        with open(args.output, "w") as f:
+            json.dump(snapshot, f, indent=2)
+        print(f"✅ Snapshot written to {args.output}")
@@ -0,0 +1,238 @@
+
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from data import load_data, aload_data, asave_data, get_file_lock, run_io, guild_file, guild_partitions
+import match_journal
+import player_store
+
+# Records older than this move out of the hot files into gzip archives under
+# archive/<kind>/<YYYY-MM>.jsonl.gz; totals for what was moved are kept in
+# archive_summary.json so counts and analytics still cover everything.
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "90"))
+# Recent matches kept inside each player's stats record regardless of age
+PLAYER_HISTORY_LIMIT = int(os.getenv("PLAYER_HISTORY_LIMIT", "50"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+SUMMARY_FILE = "archive_summary.json"
+
+def _month(timestamp):
+    return timestamp[:7] if timestamp else "undated"
+
+def _older_than(timestamp, cutoff):
+    if not timestamp:
+        return False
+    try:
+        return datetime.fromisoformat(timestamp) < cutoff
+    except ValueError:
+        return False
+
+def write_archive(kind, records, date_field):
+    """Append records to their monthly archive files"""
+    by_month = {}
+    for record in records:
+        by_month.setdefault(_month(record.get(date_field)), []).append(record)
+
+    directory = os.path.join(ARCHIVE_DIR, kind)
+    os.makedirs(directory, exist_ok=True)
+    for month, batch in by_month.items():
+        # Appending to a gzip file adds a new member, readers see one stream
+        with gzip.open(os.path.join(directory, f"{month}.jsonl.gz"), "at", encoding="utf-8") as f:
+            for record in batch:
+                f.write(json.dumps(record) + "\n")
+    return len(records)
+
+def read_archive(kind, month=None):
+    """Stream archived records, oldest month first"""
+    directory = os.path.join(ARCHIVE_DIR, kind)
+    if not os.path.isdir(directory):
+        return
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".jsonl.gz") or (month and not name.startswith(month)):
+            continue
+        with gzip.open(os.path.join(directory, name), "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def load_archive_summary():
+    return load_data(SUMMARY_FILE)
+
+def _summary_section(summary, kind):
+    return summary.setdefault(kind, {"archived": 0, "last_run": None})
+
+async def compact_match_history(cutoff, summary):
+    records = await run_io(match_journal.load_all)
+    old = [r for r in records if _older_than(r.get("date"), cutoff)]
+    if not old:
+        return 0
+
+    # Archive first so a crash can only leave a duplicate, never lose a record
+    await run_io(write_archive, "match_history", old, "date")
+
+    # No awaits from here to the rewrite, so concurrent appends can't be dropped
+    records = match_journal.load_all()
+    match_journal.rewrite([r for r in records if not _older_than(r.get("date"), cutoff)])
+
+    section = _summary_section(summary, "match_history")
+    section["archived"] += len(old)
+    by_format = section.setdefault("by_format", {})
+    for record in old:
+        format_type = record.get("format", "Unknown")
+        by_format[format_type] = by_format.get(format_type, 0) + 1
+    section["goals"] = section.get("goals", 0) + sum(
+        r.get("orange_score", 0) + r.get("blue_score", 0) for r in old)
+    return len(old)
+
+async def compact_matches(cutoff, summary):
+    def is_old(match):
+        finished = match.get("status") in ("completed", "cancelled")
+        return finished and _older_than(match.get("completed_at") or match.get("created_at"), cutoff)
+
+    archived = 0
+    for guild_id in guild_partitions("matches.json"):
+        filename = guild_file("matches.json", guild_id)
+        matches = await aload_data(filename)
+        old = [m for m in matches if is_old(m)]
+        if not old:
+            continue
+        await run_io(write_archive, "matches", old, "created_at")
+
+        async with get_file_lock(filename):
+            matches = await aload_data(filename)
+            matches[:] = [m for m in matches if not is_old(m)]
+            await asave_data(filename, matches)
+        archived += len(old)
+
+    _summary_section(summary, "matches")["archived"] += archived
+    return archived
+
+def _split_player_history(history, cutoff):
+    # Keep everything recent, but never more than PLAYER_HISTORY_LIMIT entries
+    keep_from = max(0, len(history) - PLAYER_HISTORY_LIMIT)
+    while keep_from < len(history) and _older_than(history[keep_from].get("date"), cutoff):
+        keep_from += 1
+    return history[:keep_from], history[keep_from:]
+
+def _without(records, moved):
+    moved_ids = {id(r) for r in moved}
+    return [r for r in records if id(r) not in moved_ids]
+
+async def compact_player_history(cutoff, summary):
+    # Through player_store, so it works for shards and SQLite alike and only
+    # the records that changed are written
+    async with player_store.stats_lock():
+        stats = await run_io(player_store.load_all)
+        moved_by_player = {}
+        for player_id, player in stats.items():
+            moved, kept = _split_player_history(player.get("match_history", []), cutoff)
+            if moved:
+                moved_by_player[player_id] = moved
+
+        archived = 0
+        if moved_by_player:
+            old = [dict(entry, player_id=player_id)
+                   for player_id, moved in moved_by_player.items() for entry in moved]
+            await run_io(write_archive, "player_history", old, "date")
+
+            # Only drop what reached the archive, entries added meanwhile stay
+            for player_id, moved in moved_by_player.items():
+                player = stats[player_id]
+                player["match_history"] = _without(player["match_history"], moved)
+                player["archived_matches"] = player.get("archived_matches", 0) + len(moved)
+            try:
+                await player_store.asave_players({player_id: stats[player_id] for player_id in moved_by_player})
+            except:
+                player_store.discard_players(moved_by_player)
+                raise
+            archived = len(old)
+
+    _summary_section(summary, "player_history")["archived"] += archived
+    return archived
+
+async def compact_economy(cutoff, summary):
+    async with get_file_lock("economy.json"):
+        economy = await aload_data("economy.json")
+        moved_transactions = {}
+        moved_purchases = {}
+        for user_id, player in economy.items():
+            moved = [t for t in player.get("transactions", []) if _older_than(t.get("timestamp"), cutoff)]
+            if moved:
+                moved_transactions[user_id] = moved
+            moved = [p for p in player.get("purchases", []) if _older_than(p.get("purchased_at"), cutoff)]
+            if moved:
+                moved_purchases[user_id] = moved
+        if not moved_transactions and not moved_purchases:
+            return 0
+
+        await run_io(write_archive, "economy_transactions",
+                     [dict(t, user_id=u) for u, moved in moved_transactions.items() for t in moved], "timestamp")
+        await run_io(write_archive, "economy_purchases",
+                     [dict(p, user_id=u) for u, moved in moved_purchases.items() for p in moved], "purchased_at")
+
+        archived = 0
+        for user_id, moved in moved_transactions.items():
+            player = economy[user_id]
+            player["transactions"] = _without(player["transactions"], moved)
+            totals = player.setdefault("transaction_summary", {"earned": 0, "spent": 0, "count": 0})
+            for t in moved:
+                totals["earned" if t.get("type") == "earned" else "spent"] += t.get("amount", 0)
+            totals["count"] += len(moved)
+            archived += len(moved)
+        for user_id, moved in moved_purchases.items():
+            player = economy[user_id]
+            player["purchases"] = _without(player["purchases"], moved)
+            player["archived_purchases"] = player.get("archived_purchases", 0) + len(moved)
+            archived += len(moved)
+        await asave_data("economy.json", economy)
+
+    _summary_section(summary, "economy")["archived"] += archived
+    return archived
+
+async def compact_moderation_logs(cutoff, summary):
+    async with get_file_lock("moderation_logs.json"):
+        logs = await aload_data("moderation_logs.json")
+        old = {}
+        for guild_id, entries in logs.items():
+            # Always keep the newest entry so log ids keep counting up
+            moved = [e for e in entries[:-1] if _older_than(e.get("timestamp"), cutoff)]
+            if moved:
+                old[guild_id] = moved
+        if not old:
+            return 0
+
+        await run_io(write_archive, "moderation_logs",
+                     [dict(e, guild_id=g) for g, moved in old.items() for e in moved], "timestamp")
+        archived = 0
+        for guild_id, moved in old.items():
+            logs[guild_id] = _without(logs[guild_id], moved)
+            archived += len(moved)
+        await asave_data("moderation_logs.json", logs)
+
+    _summary_section(summary, "moderation_logs")["archived"] += archived
+    return archived
+
+async def run_compaction(retention_days=None):
+    """Move everything older than the retention horizon into the archives"""
+    cutoff = datetime.now() - timedelta(days=retention_days or RETENTION_DAYS)
+
+    async with get_file_lock(SUMMARY_FILE):
+        summary = await aload_data(SUMMARY_FILE)
+        results = {
+            "match_history": await compact_match_history(cutoff, summary),
+            "matches": await compact_matches(cutoff, summary),
+            "player_history": await compact_player_history(cutoff, summary),
+            "economy": await compact_economy(cutoff, summary),
+            "moderation_logs": await compact_moderation_logs(cutoff, summary)
+        }
+        for kind in results:
+            _summary_section(summary, kind)["last_run"] = datetime.now().isoformat()
+        await asave_data(SUMMARY_FILE, summary)
+    return results
+
+if __name__ == "__main__":
+    print(f"🗄️ Archiving records older than {RETENTION_DAYS} days into {ARCHIVE_DIR}/")
+    print("=" * 50)
+    for kind, count in asyncio.run(run_compaction()).items():
+        print(f"✅ {kind}: {count} archived")
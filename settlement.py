@@ -0,0 +1,149 @@
+
+import random
+import datetime
+from data import transaction
+from player_store import players_transaction, ensure_player, match_player_keys, user_id_for
+from economy import credit_player, match_completion_reward
+from achievements import evaluate_achievements
+from customization import grant_banner, grant_badge
+import rating
+from ranks import rank_for
+
+# Banners handed out alongside some achievements
+ACHIEVEMENT_BANNERS = {
+    "hat_trick_hero": "fire",
+    "clutch_king": "champion",
+    "mvp_streak": "mvp"
+}
+
+def apply_player_result(stats, player_id, win=False, goals=0, saves=0, assists=0, match_id=None, rated=False):
+    """Apply one player's match result to an already loaded stats dict.
+
+    Pass rated=True when rating.rate_match already updated the MMR for this
+    match; otherwise the player is rated against an average opponent.
+    """
+    ensure_player(stats, player_id)
+    if not rated:
+        rating.rate_match(stats, [player_id], [], 1 if win else 0, 0 if win else 1, match_id)
+    
+    stats[player_id]["matches_played"] += 1
+    if win:
+        stats[player_id]["wins"] += 1
+    else:
+        stats[player_id]["losses"] += 1
+    
+    stats[player_id]["goals"] += goals
+    stats[player_id]["saves"] += saves
+    stats[player_id]["assists"] += assists
+    
+    # Add match to player's history
+    if "match_history" not in stats[player_id]:
+        stats[player_id]["match_history"] = []
+    
+    if match_id:
+        stats[player_id]["match_history"].append({
+            "match_id": match_id,
+            "date": datetime.datetime.now().isoformat(),
+            "won": win,
+            "goals": goals,
+            "saves": saves,
+            "assists": assists
+        })
+    
+    stats[player_id]["rank"] = rank_for(stats[player_id]["mmr"])
+    
+    return stats[player_id]
+
+def economy_id(player_id):
+    # Economy accounts are keyed by Discord user id, stats by "player_<id>"
+    return user_id_for(player_id)
+
+def player_results(match, orange_score, blue_score, orange_goals, blue_goals):
+    """Box score for every player in a reported match"""
+    results = []
+    teams = [
+        ("orange", orange_goals, orange_score > blue_score, blue_score),
+        ("blue", blue_goals, blue_score > orange_score, orange_score)
+    ]
+    for side, goals, won, conceded in teams:
+        players = match.get(f"{side}_players", [])
+        for i, player_id in enumerate(match_player_keys(match, side)):
+            results.append({
+                "player": players[i] if i < len(players) else player_id,
+                "player_id": player_id,
+                "side": side,
+                "won": won,
+                "goals": goals[i] if i < len(goals) else 0,
+                "saves": random.randint(0, 2),
+                "assists": random.randint(0, 2),
+                "first_scorer": i == 0 and bool(goals) and goals[0] > 0,
+                "conceded": conceded
+            })
+    return results
+
+async def settle_match(match, orange_score, blue_score, orange_goals=None, blue_goals=None):
+    """Apply a reported match to stats, economy, achievements and profiles.
+
+    Every store is loaded once, all players are applied in memory and each
+    file is written at most once. If anything raises, every store's cached
+    copy is dropped by its transaction, so no partial credits or ratings stay
+    in memory to be saved later. Returns [(player, achievement_id), ...] for
+    the achievements unlocked by this match.
+    """
+    results = player_results(match, orange_score, blue_score, orange_goals or [], blue_goals or [])
+    overtime_win = abs(orange_score - blue_score) == 1 and max(orange_score, blue_score) > 3
+    new_achievements = []
+    credited = False
+
+    stats_tx = players_transaction([result["player_id"] for result in results])
+    economy_tx = transaction("economy.json")
+    achievements_tx = transaction("achievements.json")
+    profiles_tx = transaction("player_profiles.json")
+
+    async with stats_tx as stats, economy_tx as economy, achievements_tx as achievements, profiles_tx as profiles:
+        for result in results:
+            ensure_player(stats, result["player_id"])
+        # Everyone is rated together, from the ratings they had before the match
+        rating.rate_match(stats,
+                          [result["player_id"] for result in results if result["side"] == "orange"],
+                          [result["player_id"] for result in results if result["side"] == "blue"],
+                          orange_score, blue_score, match.get("id"))
+
+        for result in results:
+            player_id = result["player_id"]
+            apply_player_result(stats, player_id, win=result["won"], goals=result["goals"],
+                                saves=result["saves"], assists=result["assists"], match_id=match.get("id"), rated=True)
+
+            # Reward credits for match participation
+            user_id = economy_id(player_id)
+            if user_id is not None:
+                credit_player(economy, user_id, match_completion_reward(result["won"]), "Match completion")
+                credited = True
+
+            match_data = {
+                "won": result["won"],
+                "goals": result["goals"],
+                "player_goals": result["goals"],
+                "saves": result["saves"],
+                "assists": result["assists"],
+                "first_goal_scorer": player_id if result["first_scorer"] else None,
+                "overtime_win": overtime_win,
+                "goals_conceded": result["conceded"],
+                "max_deficit": random.randint(0, 2) if result["won"] else 0,
+                "aerial_goals": random.randint(0, 1) if result["goals"] > 0 else 0
+            }
+
+            for achievement in evaluate_achievements(achievements, player_id, match_data):
+                new_achievements.append((result["player"], achievement))
+
+                # Unlock corresponding banner/badge
+                if achievement in ACHIEVEMENT_BANNERS:
+                    grant_banner(profiles, player_id, ACHIEVEMENT_BANNERS[achievement])
+                grant_badge(profiles, player_id, achievement)
+
+        if not credited:
+            economy_tx.skip_save()
+        if not new_achievements:
+            profiles_tx.skip_save()
+
+    return new_achievements
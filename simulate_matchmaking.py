@@ -0,0 +1,135 @@
+
+import argparse
+import json
+import random
+import time
+import matchmaking
+import team_balance
+from queue_state import QueueState, QUEUE_TIMEOUT
+
+# Offline matchmaking benchmark: synthetic players from a seed go through the
+# same QueueState / find_matches / best_unit_split path as run_matchmaking,
+# on a simulated clock, with no Discord or data files involved.
+FORMAT_WEIGHTS = {"1v1": 0.2, "2v2": 0.45, "3v3": 0.35}
+MODE_WEIGHTS = {"Soccar": 0.8, "Hoops": 0.1, "Snow Day": 0.05, "Heatseeker": 0.05}
+MMR_MEAN = 1000
+MMR_STDDEV = 300
+
+def generate_players(count, seed, arrival="burst", duration=600, party_share=0.0):
+    """Synthetic queue entries with joined_ts on the simulated clock.
+
+    arrival is "burst" (everyone queued at t=0), "uniform" over duration, or
+    "poisson" with count/duration joins per second on average.
+    """
+    rng = random.Random(seed)
+    formats, format_weights = zip(*FORMAT_WEIGHTS.items())
+    modes, mode_weights = zip(*MODE_WEIGHTS.items())
+
+    entries = []
+    clock = 0.0
+    user_id = 0
+    while user_id < count:
+        if arrival == "poisson":
+            clock += rng.expovariate(count / duration)
+        elif arrival == "uniform":
+            clock = rng.uniform(0, duration)
+
+        format_type = rng.choices(formats, format_weights)[0]
+        size = 1
+        if party_share and rng.random() < party_share:
+            size = rng.randint(2, matchmaking.TEAM_SIZES[format_type]) if matchmaking.TEAM_SIZES[format_type] > 1 else 1
+        size = min(size, count - user_id)
+
+        members = []
+        for _ in range(size):
+            user_id += 1
+            members.append({"user_id": user_id, "username": f"sim_{user_id}",
+                            "mmr": max(0, round(rng.gauss(MMR_MEAN, MMR_STDDEV)))})
+        entry = {**members[0], "format": format_type, "game_mode": rng.choices(modes, mode_weights)[0],
+                 "status": "searching", "joined_ts": clock}
+        if size > 1:
+            entry["party"] = members
+            entry["mmr"] = round(sum(m["mmr"] for m in members) / size)
+        entries.append(entry)
+
+    entries.sort(key=lambda e: e["joined_ts"])
+    return entries
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def simulate(count, seed=1, arrival="burst", duration=600, sweep_interval=5, party_share=0.0):
+    """Run the queue until every player is matched or timed out; returns a report dict"""
+    entries = generate_players(count, seed, arrival, duration, party_share)
+    state = QueueState()
+    waits, spreads, differences = [], [], []
+    matches = timed_out = 0
+    matching_seconds = 0.0
+
+    clock = 0.0
+    next_arrival = 0
+    end = entries[-1]["joined_ts"] + QUEUE_TIMEOUT + sweep_interval if entries else 0
+    while clock <= end:
+        while next_arrival < len(entries) and entries[next_arrival]["joined_ts"] <= clock:
+            state.add(entries[next_arrival])
+            next_arrival += 1
+
+        started = time.perf_counter()
+        for format_type, game_mode in state.bucket_keys():
+            needed = matchmaking.players_needed(format_type)
+            for group, spread in matchmaking.find_matches(state.bucket(format_type, game_mode), needed, clock):
+                balance = team_balance.best_unit_split(matchmaking.unit_members(u) for u in group)
+                state.remove_many(u["user_id"] for u in group)
+                matches += 1
+                spreads.append(spread)
+                differences.append(balance["mmr_difference"])
+                waits.extend(matchmaking.wait_seconds(u, clock) for u in group for _ in matchmaking.unit_members(u))
+        timed_out += sum(len(matchmaking.unit_members(e)) for e in state.pop_expired(clock))
+        matching_seconds += time.perf_counter() - started
+
+        if next_arrival == len(entries) and not len(state):
+            break
+        clock += sweep_interval
+
+    return {
+        "players": count,
+        "seed": seed,
+        "arrival": arrival,
+        "matches": matches,
+        "players_matched": len(waits),
+        "players_timed_out": timed_out,
+        "matching_seconds": round(matching_seconds, 3),
+        "matches_per_second": round(matches / matching_seconds, 1) if matching_seconds else 0.0,
+        "wait_mean_s": round(sum(waits) / len(waits), 1) if waits else 0.0,
+        "wait_p95_s": round(_percentile(waits, 0.95), 1),
+        "spread_mean": round(sum(spreads) / len(spreads), 1) if spreads else 0.0,
+        "spread_p95": _percentile(spreads, 0.95),
+        "team_difference_mean": round(sum(differences) / len(differences), 1) if differences else 0.0
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark matchmaking on synthetic players")
+    parser.add_argument("--players", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--arrival", choices=["burst", "uniform", "poisson"], default="burst")
+    parser.add_argument("--duration", type=float, default=600, help="seconds arrivals are spread over")
+    parser.add_argument("--sweep-interval", type=float, default=5)
+    parser.add_argument("--party-share", type=float, default=0.0, help="fraction of entries that are parties")
+    parser.add_argument("--json", action="store_true", help="print one JSON report per run")
+    args = parser.parse_args()
+
+    if not args.json:
+        print(f"🧪 Matchmaking simulation (seed {args.seed}, {args.arrival} arrivals)")
+        print("=" * 50)
+    for count in args.players:
+        report = simulate(count, args.seed, args.arrival, args.duration, args.sweep_interval, args.party_share)
+        if args.json:
+            print(json.dumps(report))
+            continue
+        print(f"👥 {count:,} players: {report['matches']:,} matches, {report['players_timed_out']:,} timed out")
+        print(f"   ⚡ {report['matches_per_second']:,} matches/s ({report['matching_seconds']}s matching)")
+        print(f"   ⏱️ wait mean {report['wait_mean_s']}s, p95 {report['wait_p95_s']}s")
+        print(f"   📏 MMR spread mean {report['spread_mean']}, p95 {report['spread_p95']}; team difference mean {report['team_difference_mean']}")
@@ -0,0 +1,294 @@
+
+import json
+import os
+import sqlite3
+import threading
+
+DATABASE_PATH = os.getenv("DATABASE_PATH", "octanecore.db")
+
+# Table layout for every JSON file the SQLite backend takes over.
+# "dict" files are keyed by their top-level key, "list" files by position,
+# with the record's id copied into an indexed column for lookups.
+TABLES = {
+    "stats.json": {"table": "player_stats", "shape": "dict", "key": "player_id",
+                   "columns": {"mmr": "INTEGER", "rank": "TEXT", "matches_played": "INTEGER"}},
+    "economy.json": {"table": "economy", "shape": "dict", "key": "user_id",
+                     "columns": {"credits": "INTEGER"}},
+    "achievements.json": {"table": "achievements", "shape": "dict", "key": "player_id", "columns": {}},
+    "player_profiles.json": {"table": "player_profiles", "shape": "dict", "key": "player_id", "columns": {}},
+    "clans.json": {"table": "clans", "shape": "dict", "key": "clan_id",
+                   "columns": {"name": "TEXT", "tag": "TEXT"}},
+    "clan_members.json": {"table": "clan_members", "shape": "dict", "key": "user_id",
+                          "columns": {"clan_id": "TEXT"}},
+    "matches.json": {"table": "matches", "shape": "list", "key": "match_id", "field": "id",
+                     "columns": {"status": "TEXT", "created_at": "TEXT"}, "date": "created_at"},
+    "match_history.json": {"table": "match_history", "shape": "list", "key": "match_id", "field": "match_id",
+                           "columns": {"status": "TEXT", "date": "TEXT"}, "date": "date"},
+    "tournaments.json": {"table": "tournaments", "shape": "list", "key": "tournament_id", "field": "id",
+                         "columns": {"status": "TEXT", "created_at": "TEXT"}, "date": "created_at"}
+}
+
+_conn = None
+_lock = threading.RLock()
+_loaded = {}  # filename -> (data_version, data) handed out by load()
+_rows = {}    # filename -> {row key: serialized record} as last read or written
+
+def handles(filename):
+    return filename in TABLES
+
+def get_connection():
+    global _conn
+    with _lock:
+        if _conn is None:
+            _conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
+            _conn.execute("PRAGMA journal_mode=WAL")
+            _conn.execute("PRAGMA synchronous=NORMAL")
+            _create_tables(_conn)
+        return _conn
+
+def _create_tables(conn):
+    for spec in TABLES.values():
+        table = spec["table"]
+        columns = "".join(f", {name} {kind}" for name, kind in spec["columns"].items())
+
+        if spec["shape"] == "dict":
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({spec['key']} TEXT PRIMARY KEY{columns}, data TEXT NOT NULL)")
+        else:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (seq INTEGER PRIMARY KEY, {spec['key']} TEXT{columns}, data TEXT NOT NULL)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{spec['key']} ON {table} ({spec['key']})")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{spec['date']} ON {table} ({spec['date']})")
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_player_stats_mmr ON player_stats (mmr)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_economy_credits ON economy (credits)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_clan_members_clan_id ON clan_members (clan_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_matches_status ON matches (status)")
+    conn.commit()
+
+def _data_version(conn):
+    # Changes whenever another connection commits, so outside edits are noticed
+    return conn.execute("PRAGMA data_version").fetchone()[0]
+
+def load(filename):
+    """Return (data, from_cache) for a file stored in SQLite"""
+    spec = TABLES[filename]
+    with _lock:
+        conn = get_connection()
+        version = _data_version(conn)
+        cached = _loaded.get(filename)
+        if cached and cached[0] == version:
+            return cached[1], True
+
+        if spec["shape"] == "dict":
+            rows = conn.execute(f"SELECT {spec['key']}, data FROM {spec['table']}").fetchall()
+            data = {key: json.loads(raw) for key, raw in rows}
+        else:
+            rows = conn.execute(f"SELECT seq, data FROM {spec['table']} ORDER BY seq").fetchall()
+            data = [json.loads(raw) for _, raw in rows]
+
+        _rows[filename] = {key: raw for key, raw in rows}
+        _loaded[filename] = (version, data)
+        return data, False
+
+def serialize(filename, data):
+    """[(row key, column values, JSON text)] for every record of data.
+
+    Split from save so callers on the event loop can take this snapshot
+    themselves and leave only the database work to another thread.
+    """
+    spec = TABLES[filename]
+    if spec["shape"] == "dict":
+        items = data.items()
+        extra = list(spec["columns"])
+    else:
+        items = enumerate(data)
+        extra = [spec["key"]] + list(spec["columns"])
+
+    rows = []
+    for key, record in items:
+        values = []
+        for name in extra:
+            field = spec.get("field", name) if name == spec["key"] else name
+            values.append(record.get(field) if isinstance(record, dict) else None)
+        rows.append((key, values, json.dumps(record)))
+    return rows
+
+def save(filename, data, rows=None):
+    """Write only the rows that changed since the last load or save.
+
+    rows is serialize(filename, data) when the caller already took it.
+    """
+    spec = TABLES[filename]
+    table = spec["table"]
+    columns = list(spec["columns"])
+    key_column = spec["key"] if spec["shape"] == "dict" else "seq"
+    extra = columns if spec["shape"] == "dict" else [spec["key"]] + columns
+    if rows is None:
+        rows = serialize(filename, data)
+
+    with _lock:
+        conn = get_connection()
+        if filename not in _rows:
+            load(filename)
+        previous = _rows[filename]
+
+        current = {}
+        upserts = []
+        for key, values, raw in rows:
+            current[key] = raw
+            if previous.get(key) != raw:
+                upserts.append([key] + values + [raw])
+
+        removed = [(key,) for key in previous if key not in current]
+
+        all_columns = [key_column] + extra + ["data"]
+        placeholders = ", ".join("?" for _ in all_columns)
+        updates = ", ".join(f"{name} = excluded.{name}" for name in all_columns[1:])
+
+        with conn:
+            if upserts:
+                conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(all_columns)}) VALUES ({placeholders}) "
+                    f"ON CONFLICT({key_column}) DO UPDATE SET {updates}",
+                    upserts
+                )
+            if removed:
+                conn.executemany(f"DELETE FROM {table} WHERE {key_column} = ?", removed)
+
+        _rows[filename] = current
+        _loaded[filename] = (_data_version(conn), data)
+        return len(upserts), len(removed)
+
+def _row_values(spec, record):
+    values = [record.get(spec["field"]) if isinstance(record, dict) else None]
+    for name in spec["columns"]:
+        values.append(record.get(name) if isinstance(record, dict) else None)
+    return values
+
+def append(filename, record):
+    """Insert one record at the end of a list table"""
+    spec = TABLES[filename]
+    table = spec["table"]
+    all_columns = ["seq", spec["key"]] + list(spec["columns"]) + ["data"]
+    placeholders = ", ".join("?" for _ in all_columns)
+    raw = json.dumps(record)
+
+    with _lock:
+        conn = get_connection()
+        cached = _loaded.get(filename)
+        if cached and cached[0] == _data_version(conn):
+            seq = len(cached[1])
+        else:
+            seq = conn.execute(f"SELECT COALESCE(MAX(seq) + 1, 0) FROM {table}").fetchone()[0]
+            cached = None
+
+        with conn:
+            conn.execute(f"INSERT INTO {table} ({', '.join(all_columns)}) VALUES ({placeholders})",
+                         [seq] + _row_values(spec, record) + [raw])
+
+        if cached:
+            cached[1].append(record)
+            _rows[filename][seq] = raw
+
+def iter_rows(filename, newest_first=False, limit=None):
+    spec = TABLES[filename]
+    order = "DESC" if newest_first else "ASC"
+    query = f"SELECT data FROM {spec['table']} ORDER BY seq {order}"
+    if limit is not None:
+        query += f" LIMIT {int(limit)}"
+
+    with _lock:
+        rows = get_connection().execute(query).fetchall()
+    for (raw,) in rows:
+        yield json.loads(raw)
+
+def find_row(filename, key):
+    """Latest record of a list table whose id column equals key"""
+    spec = TABLES[filename]
+    with _lock:
+        row = get_connection().execute(
+            f"SELECT data FROM {spec['table']} WHERE {spec['key']} = ? ORDER BY seq DESC LIMIT 1", (key,)
+        ).fetchone()
+    return json.loads(row[0]) if row else None
+
+def load_row(filename, key):
+    """One record of a dict table, without loading the rest"""
+    spec = TABLES[filename]
+    with _lock:
+        conn = get_connection()
+        cached = _loaded.get(filename)
+        if cached and cached[0] == _data_version(conn):
+            return cached[1].get(key)
+        row = conn.execute(f"SELECT data FROM {spec['table']} WHERE {spec['key']} = ?", (key,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def save_rows(filename, records, rows=None):
+    """Upsert a few records of a dict table, keyed like the JSON file.
+
+    rows is serialize(filename, records) when the caller already took it.
+    """
+    spec = TABLES[filename]
+    columns = list(spec["columns"])
+    all_columns = [spec["key"]] + columns + ["data"]
+    placeholders = ", ".join("?" for _ in all_columns)
+    updates = ", ".join(f"{name} = excluded.{name}" for name in all_columns[1:])
+
+    if rows is None:
+        rows = serialize(filename, records)
+    rows = [[key] + values + [raw] for key, values, raw in rows]
+
+    with _lock:
+        conn = get_connection()
+        cached = _loaded.get(filename)
+        current = cached is not None and cached[0] == _data_version(conn)
+
+        with conn:
+            conn.executemany(
+                f"INSERT INTO {spec['table']} ({', '.join(all_columns)}) VALUES ({placeholders}) "
+                f"ON CONFLICT({spec['key']}) DO UPDATE SET {updates}",
+                rows
+            )
+
+        if current:
+            # Keep the full copy handed out by load() in step with the rows we wrote
+            cached[1].update(records)
+            for row in rows:
+                _rows[filename][row[0]] = row[-1]
+            _loaded[filename] = (_data_version(conn), cached[1])
+        else:
+            _loaded.pop(filename, None)
+            _rows.pop(filename, None)
+
+def invalidate(filename=None):
+    with _lock:
+        if filename is None:
+            _loaded.clear()
+            _rows.clear()
+        else:
+            _loaded.pop(filename, None)
+            _rows.pop(filename, None)
+
+def migrate_from_json(filenames=None):
+    """One-shot import of the existing JSON files into the database"""
+    imported = {}
+    for filename in filenames or TABLES:
+        if not os.path.exists(filename):
+            continue
+        try:
+            with open(filename, "r") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"❌ Skipped {filename}: {e}")
+            continue
+
+        save(filename, data)
+        imported[filename] = len(data)
+        print(f"✅ Imported {filename}: {len(data)} records")
+    return imported
+
+if __name__ == "__main__":
+    print(f"📦 Migrating JSON data into {DATABASE_PATH}")
+    print("=" * 50)
+    results = migrate_from_json()
+    print("=" * 50)
+    print(f"✅ Migrated {len(results)} files")
+    print("💡 Set STORAGE_BACKEND=sqlite to start using the database")
@@ -0,0 +1,106 @@
+
+from itertools import combinations
+from rating import match_quality
+
+# Exact team balancing: try every way to split the players into two teams and
+# keep the one with the smallest MMR-sum difference. A 3v3 has only 10
+# distinct splits, so this is cheap for anything the bot builds. For a fixed
+# set of players the closest sums are also the highest TrueSkill quality.
+EXHAUSTIVE_LIMIT = 12  # beyond this many players fall back to greedy
+DEFAULT_MMR = 1000
+
+def _mmr(player):
+    return player.get("mmr", DEFAULT_MMR)
+
+def win_probability(team_mmr, opponent_mmr):
+    """Elo expected score of a team given both teams' average MMR"""
+    return 1 / (1 + 10 ** ((opponent_mmr - team_mmr) / 400))
+
+def _average(team):
+    return sum(_mmr(p) for p in team) / len(team) if team else 0
+
+def _greedy_split(players, team_size):
+    # Largest first onto the lighter team that still has room
+    orange, blue = [], []
+    for player in sorted(players, key=_mmr, reverse=True):
+        orange_sum = sum(_mmr(p) for p in orange)
+        blue_sum = sum(_mmr(p) for p in blue)
+        if len(blue) >= len(players) - team_size or (len(orange) < team_size and orange_sum <= blue_sum):
+            orange.append(player)
+        else:
+            blue.append(player)
+    return orange, blue
+
+def best_split(players):
+    """Split players into the two most evenly matched teams.
+
+    Returns {"orange", "blue", "orange_mmr", "blue_mmr", "mmr_difference",
+    "orange_win_probability"}; team MMRs are averages, the difference is
+    between team MMR sums. With an odd count orange gets the extra player.
+    """
+    players = list(players)
+    team_size = (len(players) + 1) // 2
+    total = sum(_mmr(p) for p in players)
+
+    if len(players) > EXHAUSTIVE_LIMIT:
+        orange, blue = _greedy_split(players, team_size)
+    else:
+        best = None
+        # Keep the first player on orange so mirrored splits aren't tried twice
+        # (with an odd count mirrors differ in size, so try both sides)
+        first_fixed = len(players) > 0 and len(players) % 2 == 0
+        rest = range(1, len(players)) if first_fixed else range(len(players))
+        picks = team_size - 1 if first_fixed else team_size
+        for chosen in combinations(rest, picks):
+            indexes = set(chosen) | ({0} if first_fixed else set())
+            orange_sum = sum(_mmr(players[i]) for i in indexes)
+            difference = abs(total - 2 * orange_sum)
+            if best is None or difference < best[0]:
+                best = (difference, indexes)
+        indexes = best[1] if best else set()
+        orange = [p for i, p in enumerate(players) if i in indexes]
+        blue = [p for i, p in enumerate(players) if i not in indexes]
+
+    return describe_teams(orange, blue)
+
+def best_unit_split(units):
+    """Like best_split, but for queue entries where a party must share a team.
+
+    Each unit is a list of players. Matches hold at most six units, so every
+    way of filling orange with whole units is tried.
+    """
+    units = [list(unit) for unit in units]
+    if all(len(unit) == 1 for unit in units):
+        return best_split([unit[0] for unit in units])
+
+    size = sum(len(unit) for unit in units)
+    team_size = (size + 1) // 2
+    total = sum(_mmr(p) for unit in units for p in unit)
+    best = None
+    for mask in range(1 << len(units)):
+        chosen = [unit for i, unit in enumerate(units) if mask >> i & 1]
+        if sum(len(unit) for unit in chosen) != team_size:
+            continue
+        orange_sum = sum(_mmr(p) for unit in chosen for p in unit)
+        difference = abs(total - 2 * orange_sum)
+        if best is None or difference < best[0]:
+            best = (difference, mask)
+
+    mask = best[1] if best else 0
+    orange = [p for i, unit in enumerate(units) if mask >> i & 1 for p in unit]
+    blue = [p for i, unit in enumerate(units) if not mask >> i & 1 for p in unit]
+    return describe_teams(orange, blue)
+
+def describe_teams(orange, blue):
+    """Team MMRs, predicted outcome and match quality (0-1) for two given teams"""
+    orange_mmr = _average(orange)
+    blue_mmr = _average(blue)
+    return {
+        "orange": orange,
+        "blue": blue,
+        "orange_mmr": round(orange_mmr),
+        "blue_mmr": round(blue_mmr),
+        "mmr_difference": abs(sum(_mmr(p) for p in orange) - sum(_mmr(p) for p in blue)),
+        "orange_win_probability": round(win_probability(orange_mmr, blue_mmr), 3),
+        "quality": round(match_quality(orange, blue), 3)
+    }
@@ -5,6 +5,9 @@ import json
 import random
 from datetime import datetime
 from data import load_data, save_data
+from utils import aload_player_stats
+from team_balance import best_split, describe_teams
+from rating import deviation_for
 
 class TeamBuilderView(discord.ui.View):
     def __init__(self, channel_id):
@@ -23,13 +26,14 @@ class TeamBuilderView(discord.ui.View):
             await interaction.response.send_message("❌ You're already in the team builder!", ephemeral=True)
             return
         
-        stats = load_data("stats.json")
-        player_mmr = stats.get(str(interaction.user.id), {}).get("mmr", 1000)
+        player_stats = await aload_player_stats(interaction.user.id) or {}
+        player_mmr = player_stats.get("mmr", 1000)
         
         self.players.append({
             "id": interaction.user.id,
             "name": interaction.user.display_name,
-            "mmr": player_mmr
+            "mmr": player_mmr,
+            "rating_deviation": deviation_for(player_stats)
         })
         
         await self.update_display(interaction)
@@ -40,19 +44,12 @@ class TeamBuilderView(discord.ui.View):
             await interaction.response.send_message("❌ Need at least 2 players!", ephemeral=True)
             return
         
-        # Sort players by MMR for balanced teams
-        sorted_players = sorted(self.players, key=lambda x: x["mmr"], reverse=True)
-        
-        self.teams = {"Orange": [], "Blue": []}
-        
-        # Distribute players alternately for balance
-        for i, player in enumerate(sorted_players):
-            if i % 2 == 0:
-                self.teams["Orange"].append(player)
-            else:
-                self.teams["Blue"].append(player)
+        # Pick the split with the closest total MMR
+        balance = best_split(self.players)
+        self.teams = {"Orange": balance["orange"], "Blue": balance["blue"]}
         
-        await self.update_display(interaction, "✅ Teams auto-balanced by MMR!")
+        win_chance = balance["orange_win_probability"] * 100
+        await self.update_display(interaction, f"✅ Teams auto-balanced by MMR! (Orange {win_chance:.0f}% / Blue {100 - win_chance:.0f}%, quality {balance['quality'] * 100:.0f}%)")
 
     @discord.ui.button(label="👑 Captain Mode", style=discord.ButtonStyle.secondary, emoji="🎖️")
     async def captain_mode_toggle(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -130,6 +127,9 @@ class TeamBuilderView(discord.ui.View):
             
             embed.add_field(name=f"🟠 Orange Team (Avg: {orange_mmr//len(self.teams['Orange']) if self.teams['Orange'] else 0})", value=orange_text or "No players", inline=True)
             embed.add_field(name=f"🔵 Blue Team (Avg: {blue_mmr//len(self.teams['Blue']) if self.teams['Blue'] else 0})", value=blue_text or "No players", inline=True)
+            if self.teams["Orange"] and self.teams["Blue"]:
+                quality = describe_teams(self.teams["Orange"], self.teams["Blue"])["quality"]
+                embed.add_field(name="🎯 Match Quality", value=f"{quality * 100:.0f}%", inline=False)
         
         # Show available players
         if self.players:
@@ -5,6 +5,7 @@ import random
 import asyncio
 from datetime import datetime, timedelta
 from utils import *
+import player_store
 from main import log_to_channel, update_player_stats, create_auto_match
 
 # Bot testing data
@@ -82,8 +83,9 @@ def initialize_bot_users():
     stats = load_stats()
     
     for user in BOT_USERS:
-        if user["id"] not in stats:
-            stats[user["id"]] = generate_realistic_stats(user)
+        player_id = player_store.stats_key(user["id"])
+        if player_id not in stats:
+            stats[player_id] = generate_realistic_stats(user)
     
     save_stats(stats)
 
@@ -93,10 +95,11 @@ def get_random_bot_users(count):
 
 async def simulate_queue_activity(channel, format_type, user_count=6):
     """Simulate queue activity with bot users"""
-    queue = load_queue()
+    guild_id = channel.guild.id
+    queue = load_queue(guild_id)
     
     # Clear existing queue for this format
-    queue = [p for p in queue if p["format"] != format_type]
+    queue = [p for p in queue if not (in_guild("queue.json", p, guild_id) and p["format"] == format_type)]
     
     # Add bot users to queue
     bot_users = get_random_bot_users(user_count)
@@ -110,7 +113,8 @@ async def simulate_queue_activity(channel, format_type, user_count=6):
             "username": user["username"],
             "format": format_type,
             "status": "searching",
-            "joined_at": datetime.now().isoformat()
+            "joined_at": datetime.now().isoformat(),
+            "guild_id": guild_id
         })
         
         # Update message with progress
@@ -118,7 +122,7 @@ async def simulate_queue_activity(channel, format_type, user_count=6):
         await message.edit(embed=embed)
         await asyncio.sleep(0.5)
     
-    save_queue(queue)
+    save_queue(queue, guild_id)
     
     # Final update
     embed.description = f"✅ Added {user_count} bot users to {format_type} queue!"
@@ -132,7 +136,8 @@ async def simulate_tournament_registration(channel, tournament_count=2):
     """Simulate tournament creation and registration"""
     from main import generate_tournament_matches
     
-    tournaments = load_tournaments()
+    guild_id = channel.guild.id
+    tournaments = load_tournaments(guild_id)
     
     embed = discord.Embed(title="🧪 Tournament Test Started", description="Creating test tournaments with bot users...", color=0xFFD700)
     message = await channel.send(embed=embed)
@@ -154,7 +159,8 @@ async def simulate_tournament_registration(channel, tournament_count=2):
             "created_by": "test_system",
             "prize_pool": random.randint(100, 1000),
             "current_round": 0,
-            "registration_deadline": (datetime.now() + timedelta(hours=1)).isoformat()
+            "registration_deadline": (datetime.now() + timedelta(hours=1)).isoformat(),
+            "guild_id": guild_id
         }
         
         # Register bot teams
@@ -195,7 +201,7 @@ async def simulate_tournament_registration(channel, tournament_count=2):
         await message.edit(embed=embed)
         await asyncio.sleep(1)
     
-    save_tournaments(tournaments)
+    save_tournaments(tournaments, guild_id)
     
     # Final update
     embed.description = f"✅ Created {tournament_count} test tournaments with bot teams!"
@@ -209,8 +215,7 @@ async def simulate_match_results(channel, match_count=5):
     """Simulate match results with bot users"""
     from main import load_matches, save_matches
     
-    matches = load_matches()
-    history = load_match_history()
+    matches = load_matches(channel.guild.id)
     
     embed = discord.Embed(title="🧪 Match Simulation Started", description="Generating realistic match results...", color=0xff6600)
     message = await channel.send(embed=embed)
@@ -257,7 +262,7 @@ async def simulate_match_results(channel, match_count=5):
             update_player_stats(user["id"], win=won, goals=team2_goals[j], saves=random.randint(1, 4), assists=random.randint(0, 3), match_id=match_id)
         
         # Save to history
-        history.append({
+        append_match_history({
             "match_id": match_id,
             "date": datetime.now().isoformat(),
             "orange_score": team1_score,
@@ -275,12 +280,10 @@ async def simulate_match_results(channel, match_count=5):
         await message.edit(embed=embed)
         await asyncio.sleep(0.5)
     
-    save_match_history(history)
-    
     # Final update
     embed.description = f"✅ Simulated {match_count} matches with realistic results!"
     embed.add_field(name="Features Tested", value="• Match result generation\n• Player stat updates\n• MMR calculations\n• Match history tracking", inline=False)
-    embed.add_field(name="Sample Results", value="\n".join([f"• {h['orange_players'][0]} vs {h['blue_players'][0]}: {h['orange_score']}-{h['blue_score']}" for h in history[-3:]]), inline=False)
+    embed.add_field(name="Sample Results", value="\n".join([f"• {h['orange_players'][0]} vs {h['blue_players'][0]}: {h['orange_score']}-{h['blue_score']}" for h in reversed(list(tail_match_history(3)))]), inline=False)
     await message.edit(embed=embed)
     
     await log_to_channel(f"🧪 Match simulation: {match_count} matches completed", "INFO")
@@ -328,8 +331,9 @@ async def run_full_system_test(channel):
     # Final summary
     stats = load_stats()
     history = load_match_history()
-    tournaments = load_tournaments()
-    queue = load_queue()
+    guild_id = channel.guild.id
+    tournaments = guild_records("tournaments.json", load_tournaments(guild_id), guild_id)
+    queue = guild_records("queue.json", load_queue(guild_id), guild_id)
     
     embed.title = "✅ Full System Test Complete"
     embed.description = "All bot systems tested successfully!"
@@ -426,29 +430,29 @@ class TestingView(discord.ui.View):
             return
         
         # Clear all test data
+        guild_id = interaction.guild_id
         stats = load_stats()
-        queue = load_queue()
+        queue = load_queue(guild_id)
         history = load_match_history()
-        tournaments = load_tournaments()
+        tournaments = load_tournaments(guild_id)
         
         # Remove bot users
         for user in BOT_USERS:
-            if user["id"] in stats:
-                del stats[user["id"]]
+            stats.pop(player_store.stats_key(user["id"]), None)
         
         # Remove bot users from queue
-        queue = [p for p in queue if not p["user_id"].startswith("bot_user_")]
+        queue = [p for p in queue if not (in_guild("queue.json", p, guild_id) and str(p["user_id"]).startswith("bot_user_"))]
         
         # Remove test matches
         history = [h for h in history if not h["match_id"].startswith("test_match_")]
         
         # Remove test tournaments
-        tournaments = [t for t in tournaments if not t["id"].startswith("test_tournament_")]
+        tournaments = [t for t in tournaments if not (in_guild("tournaments.json", t, guild_id) and t["id"].startswith("test_tournament_"))]
         
         save_stats(stats)
-        save_queue(queue)
+        save_queue(queue, guild_id)
         save_match_history(history)
-        save_tournaments(tournaments)
+        save_tournaments(tournaments, guild_id)
         
         await interaction.response.send_message("✅ Test data cleared!", ephemeral=True)
 
@@ -0,0 +1,38 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Run in an empty directory with every in-memory data cache cleared, like a fresh process"""
+    import data
+    import leaderboards
+    import player_store
+
+    monkeypatch.chdir(tmp_path)
+    data.flush_writes()
+    data._cache.clear()
+    data._indexes.clear()
+    player_store._digests.clear()
+    player_store._state.update({"version": 0, "merged": None, "merged_key": None})
+    leaderboards._boards.clear()
+    leaderboards._sources["economy"] = None
+    yield tmp_path
+    data.flush_writes()
+    data._cache.clear()
+
+@pytest.fixture
+def sqlite_backend(data_dir, monkeypatch):
+    """data_dir with STORAGE_BACKEND=sqlite and a fresh database in it"""
+    import data
+    import sqlite_store
+
+    monkeypatch.setattr(data, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(sqlite_store, "_conn", None)
+    sqlite_store.invalidate()
+    yield data_dir
+    if sqlite_store._conn is not None:
+        sqlite_store._conn.close()
+    sqlite_store.invalidate()
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import stat
+import pytest
+import data
+
+def test_repeat_loads_are_served_from_the_cache(data_dir):
+    data.save_data("economy.json", {"1": {"credits": 5}})
+    hits = data.get_cache_stats()["hits"]
+    first = data.load_data("economy.json")
+    assert data.load_data("economy.json") is first
+    assert data.get_cache_stats()["hits"] == hits + 2
+
+def test_outside_edits_are_picked_up(data_dir):
+    data.save_data("economy.json", {"1": {"credits": 5}})
+    data.load_data("economy.json")
+    with open("economy.json", "w") as f:
+        json.dump({"1": {"credits": 500}}, f)
+    assert data.load_data("economy.json") == {"1": {"credits": 500}}
+
+def test_missing_files_load_empty(data_dir):
+    assert data.load_data("matches.json") == []
+    assert data.load_data("economy.json") == {}
+
+def test_save_replaces_the_file_and_keeps_its_mode(data_dir):
+    data.save_data("economy.json", {})
+    os.chmod("economy.json", 0o640)
+    data.save_data("economy.json", {"1": {"credits": 5}})
+    assert stat.S_IMODE(os.stat("economy.json").st_mode) == 0o640
+    assert os.listdir(data_dir) == ["economy.json"]
+
+def test_failed_write_leaves_the_old_file(data_dir, monkeypatch):
+    data.save_data("economy.json", {"1": {"credits": 5}})
+    def fail(fd):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "fsync", fail)
+    with pytest.raises(OSError):
+        data.save_data("economy.json", {"1": {"credits": 9}})
+    with open("economy.json") as f:
+        assert json.load(f) == {"1": {"credits": 5}}
+    assert os.listdir(data_dir) == ["economy.json"]
+
+def test_write_behind_coalesces_saves(data_dir, monkeypatch):
+    monkeypatch.setattr(data, "WRITE_BEHIND_DELAY", 60)
+    writes = data.get_cache_stats()["disk_writes"]
+    for credits in range(3):
+        data.save_data("economy.json", {"1": {"credits": credits}})
+    assert data.get_cache_stats()["disk_writes"] == writes
+    assert data.load_data("economy.json") == {"1": {"credits": 2}}
+
+    data.flush_writes()
+    assert data.get_cache_stats()["disk_writes"] == writes + 1
+    with open("economy.json") as f:
+        assert json.load(f) == {"1": {"credits": 2}}
+
+def test_transaction_saves_on_a_clean_exit(data_dir):
+    async def join():
+        async with data.transaction("queue.json") as queue:
+            queue.append({"user_id": 1})
+    asyncio.run(join())
+    with open("queue.json") as f:
+        assert json.load(f) == [{"user_id": 1}]
+
+def test_transaction_rolls_back_when_the_block_raises(data_dir):
+    data.save_data("queue.json", [{"user_id": 1}])
+    async def fail():
+        async with data.transaction("queue.json") as queue:
+            queue.append({"user_id": 2})
+            raise ValueError("half done")
+    with pytest.raises(ValueError):
+        asyncio.run(fail())
+    # The half-applied change is gone from the cache too, not just the disk
+    assert data.load_data("queue.json") == [{"user_id": 1}]
+
+def test_transaction_skip_save_writes_nothing(data_dir):
+    data.save_data("queue.json", [])
+    writes = data.get_cache_stats()["disk_writes"]
+    async def skip():
+        update = data.transaction("queue.json")
+        async with update:
+            update.skip_save()
+    asyncio.run(skip())
+    assert data.get_cache_stats()["disk_writes"] == writes
+
+def test_find_record_follows_appends_and_rewrites(data_dir):
+    matches = [{"id": f"m{i}"} for i in range(5)]
+    data.save_data("matches.json", matches)
+    matches = data.load_data("matches.json")
+    assert data.find_record("matches.json", "m3") is matches[3]
+
+    matches.append({"id": "m5"})
+    assert data.find_record("matches.json", "m5", matches) is matches[5]
+
+    # Rewritten in place, e.g. by a cleanup keeping only some records
+    matches[:] = [m for m in matches if m["id"] != "m1"]
+    data.save_data("matches.json", matches)
+    assert data.find_record("matches.json", "m3", matches)["id"] == "m3"
+    assert data.find_record("matches.json", "m1", matches) is None
+
+def test_replace_record_updates_or_appends(data_dir):
+    tournaments = [{"id": "t1", "status": "registration"}]
+    data.replace_record("tournaments.json", tournaments, {"id": "t1", "status": "active"})
+    data.replace_record("tournaments.json", tournaments, {"id": "t2", "status": "registration"})
+    assert tournaments == [{"id": "t1", "status": "active"}, {"id": "t2", "status": "registration"}]
@@ -0,0 +1,28 @@
+import os
+import data
+from utils import load_matches, save_matches, load_tournaments, save_tournaments, load_all_matches
+
+def test_guilds_get_their_own_partition(data_dir):
+    save_matches([{"id": "a"}], 1)
+    save_matches([{"id": "b"}], 2)
+    assert data.guild_file("matches.json", 1) == os.path.join(data.GUILD_DIR, "1", "matches.json")
+    assert load_matches(1) == [{"id": "a"}] and load_matches(2) == [{"id": "b"}]
+    assert data.guild_partitions("matches.json") == [None, 1, 2]
+    assert [m["id"] for m in load_all_matches()] == ["a", "b"]
+
+def test_migrate_to_guild_moves_records_by_their_guild(data_dir):
+    save_tournaments([{"id": "a"}, {"id": "b", "guild_id": 2}])
+    data.migrate_to_guild(1, ["tournaments.json"])
+    assert load_tournaments() == []
+    assert load_tournaments(1) == [{"id": "a", "guild_id": 1}]
+    assert load_tournaments(2) == [{"id": "b", "guild_id": 2}]
+
+def test_sqlite_files_are_shared_and_filtered_by_guild(sqlite_backend):
+    assert data.guild_file("tournaments.json", 1) == "tournaments.json"
+    save_tournaments([{"id": "a", "guild_id": 1}, {"id": "b", "guild_id": 2}], 1)
+    tournaments = load_tournaments(2)
+    assert len(tournaments) == 2
+    assert data.guild_records("tournaments.json", tournaments, 2) == [{"id": "b", "guild_id": 2}]
+    assert data.guild_records("tournaments.json", tournaments, None) is tournaments
+    # Partition files hold only their own guild's records
+    assert data.in_guild("queue.json", {"guild_id": 1}, 2)
@@ -0,0 +1,60 @@
+import asyncio
+import random
+import pytest
+import leaderboards
+import player_store
+from leaderboards import SortedIndex, Leaderboard, board_key
+from settlement import settle_match
+
+def test_sorted_index_tracks_a_sorted_list():
+    rng = random.Random(7)
+    index = SortedIndex(rng.sample(range(10000), 300))
+    expected = sorted(index.items())
+    for _ in range(2000):
+        key = rng.randrange(10000)
+        if key in expected and rng.random() < 0.5:
+            index.remove(key)
+            expected.remove(key)
+        elif key not in expected:
+            index.insert(key)
+            expected.append(key)
+            expected.sort()
+    assert len(index) == len(expected)
+    assert index.items() == expected
+    for position in (0, len(expected) // 2, len(expected) - 1):
+        assert index.position(expected[position]) == position
+        assert index.items(position, 5) == expected[position:position + 5]
+
+def test_sorted_index_misses():
+    index = SortedIndex([1, 3, 5])
+    assert index.position(2) is None
+    assert index.items(10) == []
+    with pytest.raises(KeyError):
+        index.remove(4)
+
+def test_leaderboard_orders_by_value_then_id():
+    board = Leaderboard("mmr", {"b": {"mmr": 1200}, "a": {"mmr": 1200}, "c": {"mmr": 900}})
+    assert board.top() == [("a", 1200), ("b", 1200), ("c", 900)]
+    board.update("c", 1500)
+    board.remove("a")
+    assert board.top(2) == [("c", 1500), ("b", 1200)]
+    assert board.position("b") == 2 and board.position("a") is None
+
+def _settle(orange_ids, blue_ids, orange_score, blue_score):
+    match = {"id": "m", "orange_players": [f"user{i}" for i in orange_ids], "blue_players": [f"user{i}" for i in blue_ids],
+             "orange_ids": orange_ids, "blue_ids": blue_ids}
+    asyncio.run(settle_match(match, orange_score, blue_score))
+
+def test_position_after_settle_match(data_dir):
+    player_store.save_player("player_9", {"mmr": 2000, "matches_played": 500})
+    assert leaderboards.position("mmr", board_key("mmr", 9)) == (1, 1)
+
+    # The boards are already built, so the settlement updates them in place
+    _settle([1], [2], 3, 0)
+    assert leaderboards.position("mmr", board_key("mmr", 1)) == (2, 3)
+    assert leaderboards.position("mmr", board_key("mmr", 2)) == (3, 3)
+    assert leaderboards.position("matches_played", board_key("matches_played", 9))[0] == 1
+    assert leaderboards.position("credits", board_key("credits", 1))[0] == 1
+
+    top = leaderboards.top("mmr", 3)
+    assert [leaderboards.board_user_id("mmr", player_id) for player_id, _ in top] == [9, 1, 2]
@@ -0,0 +1,51 @@
+import json
+import os
+import match_journal
+
+def _fresh_journal():
+    match_journal._index.update({"size": 0, "offsets": {}})
+    match_journal._records.update({"size": -1, "records": []})
+
+def test_load_all_picks_up_an_append_made_while_reading(data_dir, monkeypatch):
+    _fresh_journal()
+    for match_id in range(3):
+        match_journal.append_record({"match_id": match_id})
+    match_journal._records["size"] = -1
+
+    journal_size = match_journal._journal_size
+    def size_then_append():
+        # The event loop appends right after the pool thread took the size
+        size = journal_size()
+        match_journal.append_record({"match_id": 3})
+        return size
+
+    monkeypatch.setattr(match_journal, "_journal_size", size_then_append)
+    assert [r["match_id"] for r in match_journal.load_all()] == [0, 1, 2]
+    monkeypatch.setattr(match_journal, "_journal_size", journal_size)
+    assert [r["match_id"] for r in match_journal.load_all()] == [0, 1, 2, 3]
+
+def test_tail_reads_newest_first_across_blocks(data_dir):
+    _fresh_journal()
+    for match_id in range(20):
+        match_journal.append_record({"match_id": match_id, "note": "x" * match_id})
+    newest = [r["match_id"] for r in match_journal.tail(block_size=16)]
+    assert newest == list(reversed(range(20)))
+    assert [r["match_id"] for r in match_journal.tail(limit=3, block_size=16)] == [19, 18, 17]
+
+def test_find_record_returns_the_latest_and_follows_rewrites(data_dir):
+    _fresh_journal()
+    match_journal.append_record({"match_id": "a", "orange_score": 1})
+    match_journal.append_record({"match_id": "b"})
+    match_journal.append_record({"match_id": "a", "orange_score": 2})
+    assert match_journal.find_record("a")["orange_score"] == 2
+    assert match_journal.find_record("missing") is None
+
+    match_journal.rewrite([{"match_id": "b"}, {"match_id": "a", "orange_score": 3}])
+    assert match_journal.find_record("a")["orange_score"] == 3
+
+def test_legacy_history_is_migrated(data_dir):
+    _fresh_journal()
+    with open(match_journal.LEGACY_FILE, "w") as f:
+        json.dump([{"match_id": "old"}], f)
+    assert [r["match_id"] for r in match_journal.iter_records()] == ["old"]
+    assert os.path.exists(match_journal.LEGACY_FILE + ".migrated")
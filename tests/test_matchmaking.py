@@ -0,0 +1,50 @@
+from matchmaking import find_matches, allowed_spread, STARVATION_WAIT
+
+NOW = 1_000_000.0
+
+def _entry(user_id, mmr, waited=0, party=None):
+    entry = {"user_id": user_id, "mmr": mmr, "joined_ts": NOW - waited}
+    if party:
+        entry["party"] = [{"user_id": member, "mmr": mmr} for member in party]
+    return entry
+
+def _ids(match):
+    group, _ = match
+    return sorted(entry["user_id"] for entry in group)
+
+def test_close_players_are_matched():
+    matches = find_matches([_entry(1, 1000), _entry(2, 1050)], 2, now=NOW)
+    assert [_ids(m) for m in matches] == [[1, 2]]
+    assert matches[0][1] == 50
+
+def test_fresh_players_far_apart_wait():
+    assert find_matches([_entry(1, 1000), _entry(2, 1000 + allowed_spread(0) + 1)], 2, now=NOW) == []
+
+def test_every_member_must_accept_the_spread():
+    # The veteran would accept 400 MMR, the player who just queued wouldn't
+    entries = [_entry(1, 1000, waited=600), _entry(2, 1400)]
+    assert allowed_spread(600) >= 400 > allowed_spread(0)
+    assert find_matches(entries, 2, now=NOW) == []
+    entries[1]["joined_ts"] = NOW - 600
+    assert [_ids(m) for m in find_matches(entries, 2, now=NOW)] == [[1, 2]]
+
+def test_groups_are_disjoint():
+    entries = [_entry(i, 1000 + i) for i in range(5)]
+    matches = find_matches(entries, 2, now=NOW)
+    used = [user_id for match in matches for user_id in _ids(match)]
+    assert len(matches) == 2 and len(used) == len(set(used))
+
+def test_party_fills_one_team():
+    entries = [_entry("p", 1000, party=["p", "q"]), _entry("s1", 1010), _entry("s2", 1020)]
+    matches = find_matches(entries, 4, now=NOW)
+    assert [_ids(m) for m in matches] == [["p", "s1", "s2"]]
+
+def test_party_that_cant_be_packed_is_skipped():
+    # Three players in a party can't fit a 2v2 team
+    assert find_matches([_entry("p", 1000, party=["p", "q", "r"]), _entry("s", 1000)], 4, now=NOW) == []
+
+def test_starving_players_go_first():
+    entries = [_entry(1, 1000), _entry(2, 1001), _entry(3, 1002, waited=STARVATION_WAIT)]
+    # Only one disjoint pair fits; the starving player must be in it
+    matches = find_matches(entries, 2, now=NOW)
+    assert 3 in _ids(matches[0])
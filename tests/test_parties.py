@@ -0,0 +1,33 @@
+import asyncio
+import parties
+import player_store
+
+def _party_of(*user_ids):
+    for user_id in user_ids[1:]:
+        assert parties.invite_to_party(user_ids[0], f"u{user_ids[0]}", user_id)[0]
+        assert parties.accept_party_invite(user_id, f"u{user_id}", user_ids[0])[0]
+
+def test_invite_accept_and_limits(data_dir):
+    _party_of(1, 2, 3)
+    assert [m["user_id"] for m in parties.get_party(3)["members"]] == [1, 2, 3]
+    assert parties.invite_to_party(1, "u1", 4) == (False, f"Parties are limited to {parties.MAX_PARTY_SIZE} players!")
+    assert not parties.invite_to_party(2, "u2", 4)[0]
+    assert not parties.accept_party_invite(4, "u4", 1)[0]
+
+def test_leaving(data_dir):
+    _party_of(1, 2, 3)
+    assert parties.leave_party(3)[:2] == (True, "Left the party!")
+    assert parties.get_party(3) is None and len(parties.get_party(1)["members"]) == 2
+    # Down to two players, or the leader leaving, disbands the party
+    assert parties.leave_party(1)[:2] == (True, "Party disbanded!")
+    assert parties.get_party(2) is None
+
+def test_party_queues_as_one_unit(data_dir):
+    player_store.save_players({player_store.stats_key(1): {"mmr": 1000}, player_store.stats_key(2): {"mmr": 1200}})
+    _party_of(1, 2)
+    entry, error = asyncio.run(parties.queue_unit(1, "u1", "2v2"))
+    assert error is None and entry["mmr"] == 1100
+    assert [m["mmr"] for m in entry["party"]] == [1000, 1200]
+
+    assert asyncio.run(parties.queue_unit(2, "u2", "2v2")) == (None, "Only the party leader can queue the party!")
+    assert asyncio.run(parties.queue_unit(1, "u1", "1v1"))[0] is None
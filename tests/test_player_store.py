@@ -0,0 +1,106 @@
+import asyncio
+import json
+import os
+import threading
+import data
+import player_store
+
+def _fresh_process():
+    # What a restarted bot knows: nothing but the files
+    data._cache.clear()
+    player_store._digests.clear()
+    player_store._state.update({"version": 0, "merged": None, "merged_key": None})
+
+def _on_disk(player_id):
+    with open(player_store.shard_for(player_id)) as f:
+        return json.load(f).get(player_id)
+
+def test_save_all_writes_in_place_edits_after_restart(data_dir):
+    player_store.save_all({f"player_{i}": {"mmr": 1000} for i in range(20)})
+    _fresh_process()
+
+    stats = player_store.load_all()
+    stats["player_3"]["mmr"] = 1337
+    player_store.save_all(stats)
+
+    assert _on_disk("player_3") == {"mmr": 1337}
+    _fresh_process()
+    assert player_store.load_player("player_3") == {"mmr": 1337}
+
+def test_save_all_skips_unchanged_shards(data_dir):
+    stats = {f"player_{i}": {"mmr": 1000} for i in range(20)}
+    player_store.save_all(stats)
+    writes = data.get_cache_stats()["disk_writes"]
+
+    stats["player_3"]["mmr"] = 1100
+    player_store.save_all(stats)
+    assert data.get_cache_stats()["disk_writes"] == writes + 1
+
+def test_save_all_drops_removed_players(data_dir):
+    player_store.save_all({"player_1": {"mmr": 1000}, "player_2": {"mmr": 900}})
+    player_store.save_all({"player_1": {"mmr": 1000}})
+    _fresh_process()
+    assert player_store.load_all() == {"player_1": {"mmr": 1000}}
+
+def test_save_players_touches_only_given_records(data_dir):
+    player_store.save_all({"player_1": {"mmr": 1000}, "player_2": {"mmr": 900}})
+    player_store.save_players({"player_2": {"mmr": 950}})
+    _fresh_process()
+    assert player_store.load_players(["player_1", "player_2", "player_3"]) == {
+        "player_1": {"mmr": 1000}, "player_2": {"mmr": 950}}
+
+def test_players_transaction_serializes_on_the_event_loop(data_dir, monkeypatch):
+    player_store.save_all({"player_1": {"mmr": 1000}})
+    threads = []
+    dumps = json.dumps
+    def recording_dumps(obj, **kwargs):
+        threads.append(threading.current_thread())
+        return dumps(obj, **kwargs)
+    monkeypatch.setattr(json, "dumps", recording_dumps)
+
+    async def bump():
+        async with player_store.players_transaction(["player_1", "player_2"]) as stats:
+            stats["player_1"]["mmr"] = 1010
+            player_store.ensure_player(stats, "player_2")
+    asyncio.run(bump())
+
+    assert threads and set(threads) == {threading.main_thread()}
+    assert _on_disk("player_1") == {"mmr": 1010}
+    assert _on_disk("player_2")["matches_played"] == 0
+
+def test_asave_all_writes_only_changed_shards(data_dir):
+    stats = {f"player_{i}": {"mmr": 1000} for i in range(20)}
+    player_store.save_all(stats)
+    _fresh_process()
+    stats = player_store.load_all()
+    writes = data.get_cache_stats()["disk_writes"]
+
+    stats["player_3"]["mmr"] = 1100
+    asyncio.run(player_store.asave_all(stats))
+    assert data.get_cache_stats()["disk_writes"] == writes + 1
+    assert _on_disk("player_3") == {"mmr": 1100}
+
+def test_concurrent_loads_migrate_legacy_stats_once(data_dir):
+    stats = {f"player_{i}": {"mmr": 1000 + i} for i in range(200)}
+    with open(player_store.STATS_FILE, "w") as f:
+        json.dump(stats, f)
+
+    barrier = threading.Barrier(8)
+    results, errors = [], []
+    def load(player_id):
+        barrier.wait()
+        try:
+            results.append(player_store.load_player(player_id))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=load, args=(f"player_{i * 20}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert sorted(record["mmr"] for record in results) == [1000 + i * 20 for i in range(8)]
+    assert os.path.exists(player_store.STATS_FILE + ".migrated")
+    _fresh_process()
+    assert player_store.load_all() == stats
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+from data import save_data
+from matchmaking import find_matches
+import queue_priority
+
+NOW = datetime(2026, 1, 1, 12, 0)
+
+def _iso(hours):
+    return (NOW + timedelta(hours=hours)).isoformat()
+
+def test_boosts_from_purchases_and_clan_perks(data_dir):
+    save_data("economy.json", {
+        "1": {"priority_until": _iso(2)},
+        "2": {"priority_until": _iso(-2)},
+        "4": {"purchases": [{"item_id": "queue_priority", "purchased_at": _iso(-1)}]}
+    })
+    save_data("clan_members.json", {"3": {"clan_id": "c"}, "5": {"clan_id": "d"}})
+    save_data("clans.json", {"c": {"perks": {"queue_priority": True}}, "d": {"perks": {}}})
+
+    boosts = queue_priority.priority_boosts([1, 2, 3, 4, 5], now=NOW.timestamp())
+    assert boosts == {1: queue_priority.PURCHASE_BOOST, 3: queue_priority.CLAN_BOOST,
+                      4: queue_priority.PURCHASE_BOOST}
+    # Purchased priority runs out without the economy being reloaded
+    assert 1 not in queue_priority.priority_boosts([1], now=NOW.timestamp() + 3 * 3600)
+
+def test_extend_priority_stacks_on_time_left():
+    player = {"priority_until": _iso(1)}
+    assert queue_priority.extend_priority(player, 24, now=NOW) == _iso(25)
+    assert queue_priority.extend_priority({"priority_until": _iso(-5)}, 24, now=NOW) == _iso(24)
+
+def test_boosted_player_is_matched_first():
+    now = NOW.timestamp()
+    entries = [{"user_id": user_id, "mmr": 1000 + user_id, "joined_ts": now} for user_id in (1, 2, 3)]
+    assert 3 not in [e["user_id"] for e in find_matches(entries, 2, now=now)[0][0]]
+    boosted = find_matches(entries, 2, now=now, boosts={3: queue_priority.PURCHASE_BOOST})
+    assert 3 in [e["user_id"] for e in boosted[0][0]]
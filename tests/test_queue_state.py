@@ -0,0 +1,54 @@
+from queue_state import QueueState, QUEUE_TIMEOUT, get_queue_state
+from utils import save_queue
+
+def _entry(user_id, joined, format_type="1v1", party=None):
+    entry = {"user_id": user_id, "format": format_type, "status": "searching", "joined_ts": joined}
+    if party:
+        entry["party"] = [{"user_id": member} for member in party]
+    return entry
+
+def test_membership_buckets_and_counts():
+    state = QueueState([_entry(1, 0), _entry("lead", 10, "2v2", party=["lead", "mate"])])
+    assert "mate" in state and state.get("mate")["user_id"] == "lead"
+    assert state.count("2v2") == 2 and state.count("1v1", "Soccar") == 1 and state.players() == 3
+    state.remove("mate")
+    assert "lead" not in state and state.count("2v2") == 0
+    assert state.bucket_keys() == [("1v1", "Soccar")] and state.searching() == 1
+
+def test_direct_save_queue_rebuilds_the_state(data_dir):
+    assert len(get_queue_state()) == 0
+    save_queue([_entry(1, 0), _entry(2, 0, "2v2")])
+    state = get_queue_state()
+    assert 1 in state and state.count("2v2") == 1
+
+def test_pop_expired_returns_only_timed_out_entries():
+    state = QueueState([_entry(1, 0), _entry(2, 100), _entry(3, 200)])
+    expired = state.pop_expired(100 + QUEUE_TIMEOUT)
+    assert sorted(e["user_id"] for e in expired) == [1, 2]
+    assert 3 in state and 1 not in state and 2 not in state
+    assert state.count("1v1") == 1
+
+def test_pop_expired_skips_removed_and_requeued_entries():
+    state = QueueState()
+    state.add(_entry(1, 0))
+    state.add(_entry(2, 0))
+    state.remove(1)
+    state.add(_entry(2, 500))  # requeued, its old deadline is stale
+    assert state.pop_expired(QUEUE_TIMEOUT) == []
+    assert [e["user_id"] for e in state.pop_expired(500 + QUEUE_TIMEOUT)] == [2]
+    assert len(state) == 0 and state.players() == 0
+
+def test_pop_expired_removes_whole_parties():
+    state = QueueState([_entry("lead", 0, "2v2", party=["lead", "mate"])])
+    assert state.players() == 2
+    state.pop_expired(QUEUE_TIMEOUT)
+    assert "mate" not in state and state.players() == 0 and state.count("2v2") == 0
+
+def test_pop_expired_compacts_stale_heap_items():
+    state = QueueState()
+    for user_id in range(200):
+        state.add(_entry(user_id, 1000))
+    state.remove_many(range(190))
+    state.pop_expired(0)
+    assert len(state.deadlines) == 10
+    assert len(state.pop_expired(1000 + QUEUE_TIMEOUT)) == 10
@@ -0,0 +1,35 @@
+from ranks import rank_for, rank_for_many, rank_progress, division_floors
+
+def _old_rank_for(mmr):
+    # The if/elif chain ranks.py replaced
+    for floor, rank in [(1500, "Grand Champion"), (1400, "Champion III"), (1300, "Champion II"),
+                        (1200, "Champion I"), (1100, "Diamond III"), (1000, "Diamond II"),
+                        (900, "Diamond I"), (800, "Platinum III"), (700, "Platinum II"),
+                        (600, "Platinum I"), (500, "Gold III"), (400, "Gold II"), (300, "Gold I"),
+                        (200, "Silver III"), (100, "Silver II"), (50, "Silver I")]:
+        if mmr >= floor:
+            return rank
+    return "Bronze I"
+
+def test_rank_for_matches_the_old_chain():
+    mmrs = list(range(-100, 2000)) + [49.5, 50.0, 1499.9]
+    assert [rank_for(mmr) for mmr in mmrs] == [_old_rank_for(mmr) for mmr in mmrs]
+
+def test_rank_for_many_matches_rank_for():
+    mmrs = [0, 75, 999, 1000, 1750]
+    assert rank_for_many(mmrs) == [rank_for(mmr) for mmr in mmrs]
+
+def test_rank_progress():
+    progress = rank_progress(1050)
+    assert progress["rank"] == "Diamond II" and progress["next_rank"] == "Diamond III"
+    assert progress["division"] == 3 and progress["progress"] == 50.0
+    assert rank_progress(1600)["next_rank"] is None
+
+def test_division_bounds():
+    assert division_floors("Diamond II") == [1000, 1025, 1050, 1075]
+    assert division_floors("Grand Champion") == [1500]
+    progress = rank_progress(1050)
+    assert (progress["division_floor"], progress["division_ceiling"]) == (1050, 1075)
+    assert rank_progress(1099)["division_ceiling"] == 1100
+    top = rank_progress(1600)
+    assert (top["division_floor"], top["division_ceiling"]) == (1500, None)
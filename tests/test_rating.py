@@ -0,0 +1,64 @@
+import pytest
+import rating
+
+def _new(**fields):
+    return {"mmr": rating.DEFAULT_RATING, "rating_deviation": rating.DEFAULT_DEVIATION, **fields}
+
+def test_glicko2_1v1_matches_reference():
+    # 1500/350 beats 1500/350: 1662.31 / 290.32 (ratings relative to the center)
+    new = _new(rating_volatility=0.06)
+    (winner,), (loser,) = rating.Glicko2().rate([[new], [dict(new)]], [1, 0])
+    assert winner["mmr"] - rating.DEFAULT_RATING == pytest.approx(162.31, abs=0.01)
+    assert loser["mmr"] - rating.DEFAULT_RATING == pytest.approx(-162.31, abs=0.01)
+    assert winner["rating_deviation"] == pytest.approx(290.32, abs=0.01)
+
+def test_glicko2_volatility_matches_paper_example():
+    # Glickman's Glicko-2 paper, step 5: sigma' = 0.05999
+    sigma = rating.Glicko2()._volatility(0.06, 200 / rating.Glicko2.SCALE, 1.7785, -0.4834)
+    assert sigma == pytest.approx(0.05999, abs=0.00001)
+
+def test_established_players_get_a_seeded_deviation():
+    veteran = {"mmr": 1450, "matches_played": 200}
+    newcomer = {"mmr": 1000, "matches_played": 200}
+    assert rating.deviation_for(veteran) == rating.MIN_DEVIATION
+    assert rating.deviation_for({"matches_played": 0}) == rating.DEFAULT_DEVIATION
+
+    stats = {"a": veteran, "b": newcomer}
+    changes = rating.rate_match(stats, ["a"], ["b"], 0, 1, system=rating.get_system("glicko2"))
+    assert abs(changes["a"]) < 50
+
+def test_seed_deviations_only_fills_missing():
+    stats = {"a": {"matches_played": 3}, "b": {"rating_deviation": 80.0}}
+    assert rating.seed_deviations(stats) == 1
+    assert stats["a"]["rating_deviation"] == pytest.approx(175.0)
+    assert stats["b"]["rating_deviation"] == 80.0
+
+def test_rate_match_records_history():
+    stats = {"a": _new(), "b": _new()}
+    changes = rating.rate_match(stats, ["a"], ["b"], 3, 1, match_id="m1", system=rating.get_system("elo"))
+    assert changes == {"a": 16, "b": -16}
+    assert stats["a"]["rating_history"][-1]["match_id"] == "m1"
+
+# TrueSkill reference values (mu 25, sigma 25/3, beta 25/6, tau 25/300, draw 10%)
+# in MMR units: 1 TrueSkill point is 42 MMR and mu 25 is DEFAULT_RATING
+TS_SCALE = 175 / (25 / 6)
+
+def _ts(mu):
+    return rating.DEFAULT_RATING + (mu - 25) * TS_SCALE
+
+def test_trueskill_1v1_win_matches_reference():
+    (winner,), (loser,) = rating.TrueSkill().rate([[_new()], [_new()]], [1, 0])
+    assert winner["mmr"] == pytest.approx(_ts(29.396), abs=0.5)
+    assert loser["mmr"] == pytest.approx(_ts(20.604), abs=0.5)
+    assert winner["rating_deviation"] == pytest.approx(7.171 * TS_SCALE, abs=0.5)
+
+def test_trueskill_1v1_draw_matches_reference():
+    (orange,), (blue,) = rating.TrueSkill().rate([[_new()], [_new()]], [0.5, 0.5])
+    assert orange["mmr"] == pytest.approx(rating.DEFAULT_RATING)
+    assert orange["rating_deviation"] == pytest.approx(6.458 * TS_SCALE, abs=0.5)
+
+def test_trueskill_quality_of_even_1v1():
+    assert rating.TrueSkill().quality([[_new()], [_new()]]) == pytest.approx(0.447, abs=0.001)
+
+def test_trueskill_quality_without_mmr():
+    assert rating.match_quality([{"user_id": 1}], [{"user_id": 2}]) == pytest.approx(0.447, abs=0.001)
@@ -0,0 +1,40 @@
+import asyncio
+from datetime import datetime, timedelta
+import player_store
+import retention
+
+def _history(days_ago):
+    return [{"match_id": f"m{days}", "date": (datetime.now() - timedelta(days=days)).isoformat()}
+            for days in days_ago]
+
+def _compact():
+    summary = {}
+    cutoff = datetime.now() - timedelta(days=90)
+    return asyncio.run(retention.compact_player_history(cutoff, summary)), summary
+
+def _check_compaction():
+    player_store.save_all({
+        "player_1": {"mmr": 1000, "match_history": _history([200, 100, 10])},
+        "player_2": {"mmr": 900, "match_history": _history([5])}
+    })
+    archived, summary = _compact()
+
+    assert archived == 2 and summary["player_history"]["archived"] == 2
+    record = player_store.load_player("player_1")
+    assert [m["match_id"] for m in record["match_history"]] == ["m10"]
+    assert record["archived_matches"] == 2
+    assert sorted(r["match_id"] for r in retention.read_archive("player_history")) == ["m100", "m200"]
+    # Nothing left to move, and the saved shards were recorded as such
+    assert _compact()[0] == 0
+
+def test_compact_player_history(data_dir):
+    _check_compaction()
+    before = dict(player_store._digests)
+    player_store.save_all(player_store.load_all())
+    assert player_store._digests == before
+
+def test_compact_player_history_with_sqlite(sqlite_backend):
+    _check_compaction()
+    import sqlite_store
+    sqlite_store.invalidate()
+    assert player_store.load_player("player_1")["archived_matches"] == 2
@@ -0,0 +1,27 @@
+import asyncio
+import player_store
+from parties import queue_unit
+from settlement import settle_match
+
+def _match(match_id="m1"):
+    return {"id": match_id, "orange_players": ["Ann", "Bob"], "blue_players": ["Cat", "Dan"],
+            "orange_ids": [1, 2], "blue_ids": [3, 4]}
+
+def test_settled_rating_reaches_the_queue(data_dir):
+    asyncio.run(settle_match(_match(), 3, 1, [2, 1], [1]))
+
+    winner = player_store.load_player("player_1")
+    loser = player_store.load_player("player_3")
+    assert winner["mmr"] > 1000 > loser["mmr"]
+    assert player_store.load_player("player_Ann") is None
+
+    entry, error = asyncio.run(queue_unit(1, "Ann", "2v2"))
+    assert error is None
+    assert entry["mmr"] == winner["mmr"]
+    assert entry["rating_deviation"] == winner["rating_deviation"]
+
+def test_old_matches_without_ids_keep_username_keys(data_dir):
+    match = _match()
+    del match["orange_ids"], match["blue_ids"]
+    asyncio.run(settle_match(match, 1, 3))
+    assert player_store.load_player("player_Dan")["wins"] == 1
@@ -0,0 +1,41 @@
+import json
+import sqlite3
+import data
+import sqlite_store
+
+def test_round_trip_through_load_and_save_data(sqlite_backend):
+    data.save_data("economy.json", {"1": {"credits": 5}, "2": {"credits": 7}})
+    data.save_data("matches.json", [{"id": "m1", "status": "scheduled"}])
+    sqlite_store.invalidate()
+    assert data.load_data("economy.json") == {"1": {"credits": 5}, "2": {"credits": 7}}
+    assert data.load_data("matches.json") == [{"id": "m1", "status": "scheduled"}]
+    assert sqlite_store.find_row("matches.json", "m1")["status"] == "scheduled"
+
+def test_save_writes_only_changed_rows(sqlite_backend):
+    economy = {str(i): {"credits": i} for i in range(10)}
+    sqlite_store.save("economy.json", economy)
+    economy["3"]["credits"] = 300
+    del economy["4"]
+    assert sqlite_store.save("economy.json", economy) == (1, 1)
+
+def test_save_rows_keeps_the_loaded_copy_current(sqlite_backend):
+    data.save_data("stats.json", {"player_1": {"mmr": 1000}})
+    stats = data.load_data("stats.json")
+    sqlite_store.save_rows("stats.json", {"player_2": {"mmr": 900}})
+    assert data.load_data("stats.json") is stats and stats["player_2"] == {"mmr": 900}
+    assert sqlite_store.load_row("stats.json", "player_2") == {"mmr": 900}
+
+def test_changes_from_another_connection_are_seen(sqlite_backend):
+    data.save_data("economy.json", {"1": {"credits": 5}})
+    data.load_data("economy.json")
+    other = sqlite3.connect(sqlite_store.DATABASE_PATH)
+    with other:
+        other.execute("UPDATE economy SET data = ? WHERE user_id = '1'", (json.dumps({"credits": 50}),))
+    other.close()
+    assert data.load_data("economy.json") == {"1": {"credits": 50}}
+
+def test_migrate_from_json(sqlite_backend):
+    with open("tournaments.json", "w") as f:
+        json.dump([{"id": "t1"}, {"id": "t2"}], f)
+    assert sqlite_store.migrate_from_json(["tournaments.json"]) == {"tournaments.json": 2}
+    assert [t["id"] for t in sqlite_store.iter_rows("tournaments.json", newest_first=True)] == ["t2", "t1"]
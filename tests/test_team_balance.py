@@ -0,0 +1,39 @@
+from itertools import combinations
+from team_balance import best_split, best_unit_split
+
+def _players(*mmrs):
+    return [{"user_id": i, "mmr": mmr} for i, mmr in enumerate(mmrs)]
+
+def _closest_difference(players):
+    total = sum(p["mmr"] for p in players)
+    size = (len(players) + 1) // 2
+    return min(abs(total - 2 * sum(p["mmr"] for p in team)) for team in combinations(players, size))
+
+def test_best_split_finds_the_closest_sums():
+    players = _players(1500, 1400, 1100, 1000, 900, 300)
+    split = best_split(players)
+    assert len(split["orange"]) == len(split["blue"]) == 3
+    assert split["mmr_difference"] == _closest_difference(players)
+    assert sorted(p["user_id"] for p in split["orange"] + split["blue"]) == list(range(6))
+
+def test_best_split_gives_orange_the_extra_player():
+    split = best_split(_players(1000, 1200, 800))
+    assert len(split["orange"]) == 2 and len(split["blue"]) == 1
+    assert split["mmr_difference"] == _closest_difference(_players(1000, 1200, 800))
+
+def test_best_split_reports_outcome_and_quality():
+    split = best_split(_players(1000, 1000))
+    assert split["orange_win_probability"] == 0.5
+    assert 0 < split["quality"] <= 1
+
+def test_best_unit_split_keeps_parties_together():
+    party = [{"user_id": "a", "mmr": 1500}, {"user_id": "b", "mmr": 1500}]
+    solos = [[{"user_id": "c", "mmr": 1500}], [{"user_id": "d", "mmr": 1500}]]
+    split = best_unit_split([party] + solos)
+    teams = [{p["user_id"] for p in split["orange"]}, {p["user_id"] for p in split["blue"]}]
+    assert {"a", "b"} in teams
+    assert split["mmr_difference"] == 0
+
+def test_best_unit_split_of_solos_matches_best_split():
+    players = _players(1300, 1250, 900, 700)
+    assert best_unit_split([[p] for p in players])["mmr_difference"] == best_split(players)["mmr_difference"]
@@ -0,0 +1,42 @@
+import pytest
+import wait_estimator
+from wait_estimator import DecayedRate, DecayedMean, HALF_LIFE
+
+@pytest.fixture(autouse=True)
+def fresh_buckets(monkeypatch):
+    monkeypatch.setattr(wait_estimator, "arrivals", {})
+    monkeypatch.setattr(wait_estimator, "match_waits", {})
+
+def test_steady_arrivals_give_their_rate():
+    rate = DecayedRate()
+    for minute in range(300):
+        rate.add(minute * 60.0)
+    assert rate.rate(300 * 60.0) == pytest.approx(1 / 60, rel=0.05)
+
+def test_old_waits_count_half_after_a_half_life():
+    mean = DecayedMean()
+    mean.add(100, 0)
+    mean.add(300, HALF_LIFE)
+    assert mean.mean() == pytest.approx((100 * 0.5 + 300) / 1.5)
+
+def test_estimate_waits_for_missing_players_then_uses_match_waits():
+    assert wait_estimator.estimate("2v2", queued=1, now=0) is None
+    for second in range(0, 6000, 60):
+        wait_estimator.record_join("2v2", now=second)
+    # 3 players missing at one join a minute
+    assert wait_estimator.estimate("2v2", queued=1, now=6000) == pytest.approx(180, rel=0.1)
+
+    wait_estimator.record_match("2v2", "Soccar", [400, 400], now=6000)
+    assert wait_estimator.estimate("2v2", queued=1, now=6000) == pytest.approx(400)
+    assert wait_estimator.estimate("2v2", queued=4, now=6000) == pytest.approx(400)
+
+def test_guilds_are_estimated_separately():
+    wait_estimator.record_match("1v1", "Soccar", [30], now=0, guild_id=1)
+    assert wait_estimator.estimate("1v1", queued=2, now=0, guild_id=1) == 30
+    assert wait_estimator.estimate("1v1", queued=2, now=0, guild_id=2) == 0.0
+
+def test_format_eta():
+    assert wait_estimator.format_eta(None, "2v2", 1) == "Waiting for 3 more players"
+    assert wait_estimator.format_eta(45, "2v2", 4) == "< 1 minute"
+    assert wait_estimator.format_eta(300, "2v2", 4) == "~5 minutes"
+    assert wait_estimator.format_eta(7200, "2v2", 4) == "Over an hour"
@@ -1,7 +1,9 @@
 
 import json
 import os
-from data import load_data, save_data
+from data import load_data, save_data, aload_data, asave_data, run_io, find_record, guild_file, guild_partitions, in_guild, guild_records
+import match_journal
+import player_store
 
 def load_teams():
     return load_data("teams.json")
@@ -9,29 +11,70 @@ def load_teams():
 def save_teams(teams):
     save_data("teams.json", teams)
 
-def load_matches():
-    return load_data("matches.json")
+# Queue, matches and tournaments are partitioned by guild, see data.guild_file;
+# guild_id None is the top-level file
 
-def save_matches(matches):
-    save_data("matches.json", matches)
+def load_matches(guild_id=None):
+    return load_data(guild_file("matches.json", guild_id))
 
-def load_queue():
-    return load_data("queue.json")
+def save_matches(matches, guild_id=None):
+    save_data(guild_file("matches.json", guild_id), matches)
 
-def save_queue(queue):
-    save_data("queue.json", queue)
+def find_match(match_id, matches=None, guild_id=None):
+    return find_record(guild_file("matches.json", guild_id), match_id, matches)
 
-def load_tournaments():
-    return load_data("tournaments.json")
+async def aload_matches(guild_id=None):
+    return await aload_data(guild_file("matches.json", guild_id))
 
-def save_tournaments(tournaments):
-    save_data("tournaments.json", tournaments)
+async def asave_matches(matches, guild_id=None):
+    await asave_data(guild_file("matches.json", guild_id), matches)
+
+def load_all_matches():
+    """Matches of every guild"""
+    return [m for guild_id in guild_partitions("matches.json") for m in load_matches(guild_id)]
+
+def load_queue(guild_id=None):
+    return load_data(guild_file("queue.json", guild_id))
+
+def save_queue(queue, guild_id=None):
+    save_data(guild_file("queue.json", guild_id), queue)
+
+async def aload_queue(guild_id=None):
+    return await aload_data(guild_file("queue.json", guild_id))
+
+def load_tournaments(guild_id=None):
+    return load_data(guild_file("tournaments.json", guild_id))
+
+def save_tournaments(tournaments, guild_id=None):
+    save_data(guild_file("tournaments.json", guild_id), tournaments)
+
+def find_tournament(tournament_id, tournaments=None, guild_id=None):
+    return find_record(guild_file("tournaments.json", guild_id), tournament_id, tournaments)
+
+async def aload_tournaments(guild_id=None):
+    return await aload_data(guild_file("tournaments.json", guild_id))
+
+def load_all_tournaments():
+    """Tournaments of every guild"""
+    return [t for guild_id in guild_partitions("tournaments.json") for t in load_tournaments(guild_id)]
 
 def load_stats():
-    return load_data("stats.json")
+    return player_store.load_all()
 
 def save_stats(stats):
-    save_data("stats.json", stats)
+    player_store.save_all(stats)
+
+async def aload_stats():
+    return await run_io(player_store.load_all)
+
+async def asave_stats(stats):
+    await player_store.asave_all(stats)
+
+def load_player_stats(player_id):
+    return player_store.load_player(player_store.stats_key(player_id))
+
+async def aload_player_stats(player_id):
+    return await run_io(player_store.load_player, player_store.stats_key(player_id))
 
 def load_mvp_votes():
     return load_data("mvp_votes.json")
@@ -40,10 +83,25 @@ def save_mvp_votes(votes):
     save_data("mvp_votes.json", votes)
 
 def load_match_history():
-    return load_data("match_history.json")
+    return match_journal.load_all()
 
 def save_match_history(history):
-    save_data("match_history.json", history)
+    match_journal.rewrite(history)
+
+async def aload_match_history():
+    return await run_io(match_journal.load_all)
+
+def append_match_history(record):
+    match_journal.append_record(record)
+
+def iter_match_history():
+    return match_journal.iter_records()
+
+def tail_match_history(limit=None):
+    return match_journal.tail(limit)
+
+def find_match_history(match_id):
+    return match_journal.find_record(match_id)
 
 def load_admin_settings():
     defaults = {
@@ -51,7 +109,8 @@ def load_admin_settings():
         "allow_tournaments": True,
         "max_tournament_teams": 32,
         "auto_mmr_updates": True,
-        "mvp_voting_enabled": True
+        "mvp_voting_enabled": True,
+        "queue_timeout_notice": True
     }
     settings = load_data("admin_settings.json")
     return {**defaults, **settings}
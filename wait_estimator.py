@@ -0,0 +1,121 @@
+
+import math
+import time
+import matchmaking
+
+# Queue wait estimates from what the queue has actually been doing. Each
+# (guild, format, mode) bucket keeps an exponentially decayed count of joins and a
+# decayed average of how long matched players waited, so recent activity
+# counts most and every update or estimate is O(1).
+HALF_LIFE = 600  # seconds for old observations to count half as much
+TAU = HALF_LIFE / math.log(2)
+
+def _decay(elapsed):
+    return math.exp(-max(0.0, elapsed) / TAU)
+
+class DecayedRate:
+    """Events per second over a decaying window"""
+
+    def __init__(self):
+        self.total = 0.0
+        self.updated = None
+        self.started = None
+
+    def add(self, now, amount=1):
+        self.total = self.value(now) + amount
+        self.updated = now
+        if self.started is None:
+            self.started = now
+
+    def value(self, now):
+        if self.updated is None:
+            return 0.0
+        return self.total * _decay(now - self.updated)
+
+    def rate(self, now):
+        if self.started is None:
+            return 0.0
+        # Decayed length of the time observed, so a young counter isn't
+        # read as a slow one
+        window = TAU * (1 - _decay(now - self.started))
+        return self.value(now) / max(window, 60.0)
+
+class DecayedMean:
+    """Average where older samples weigh exponentially less"""
+
+    def __init__(self):
+        self.total = 0.0
+        self.weight = 0.0
+        self.updated = None
+
+    def add(self, sample, now):
+        factor = _decay(now - self.updated) if self.updated is not None else 0.0
+        self.total = self.total * factor + sample
+        self.weight = self.weight * factor + 1
+        self.updated = now
+
+    def mean(self):
+        return self.total / self.weight if self.weight else None
+
+arrivals = {}    # (guild_id, format, mode) -> DecayedRate of joins
+match_waits = {} # (guild_id, format, mode) -> DecayedMean of join-to-match seconds
+
+def record_join(format_type, game_mode="Soccar", guild_id=None, now=None):
+    now = now if now is not None else time.time()
+    arrivals.setdefault((guild_id, format_type, game_mode), DecayedRate()).add(now)
+
+def record_match(format_type, game_mode, waits, now=None, guild_id=None):
+    now = now if now is not None else time.time()
+    mean = match_waits.setdefault((guild_id, format_type, game_mode), DecayedMean())
+    for wait in waits:
+        mean.add(wait, now)
+
+def estimate(format_type, game_mode="Soccar", queued=0, now=None, guild_id=None):
+    """Expected seconds until the next match in a bucket, or None when unknown.
+
+    Missing players are expected at the recent arrival rate; once enough are
+    queued, the recent average wait is the best guess for MMR to line up.
+    """
+    now = now if now is not None else time.time()
+    key = (guild_id, format_type, game_mode)
+    missing = max(0, matchmaking.players_needed(format_type) - queued)
+    typical = match_waits[key].mean() if key in match_waits else None
+
+    if missing:
+        rate = arrivals[key].rate(now) if key in arrivals else 0.0
+        if rate <= 0:
+            return None
+        fill = missing / rate
+        return max(fill, typical) if typical is not None else fill
+    return typical if typical is not None else 0.0
+
+def format_eta(seconds, format_type, queued):
+    if seconds is None:
+        missing = max(0, matchmaking.players_needed(format_type) - queued)
+        return f"Waiting for {missing} more players" if missing else "< 1 minute"
+    if seconds < 60:
+        return "< 1 minute"
+    if seconds < 3600:
+        return f"~{round(seconds / 60)} minutes"
+    return "Over an hour"
+
+def describe(format_type, game_mode="Soccar", queued=0, guild_id=None):
+    return format_eta(estimate(format_type, game_mode, queued, guild_id=guild_id), format_type, queued)
+
+def get_wait_stats(counts=None):
+    """Per-bucket arrival rates, recent waits and current ETAs for /api/status.
+    counts maps (guild_id, format, mode) to players queued."""
+    now = time.time()
+    counts = counts or {}
+    stats = {}
+    for key in set(arrivals) | set(match_waits) | set(counts):
+        guild_id, format_type, game_mode = key
+        typical = match_waits[key].mean() if key in match_waits else None
+        eta = estimate(format_type, game_mode, counts.get(key, 0), now, guild_id)
+        stats.setdefault(str(guild_id or "global"), {})[f"{format_type}_{game_mode}"] = {
+            "queued": counts.get(key, 0),
+            "arrivals_per_minute": round(arrivals[key].rate(now) * 60, 2) if key in arrivals else 0.0,
+            "avg_wait_s": round(typical, 1) if typical is not None else None,
+            "eta_s": round(eta, 1) if eta is not None else None
+        }
+    return stats